@@ -0,0 +1,69 @@
+"""Бенчмарк детекторов: стоимость одного тика (цикла сканирования) на N токенов.
+
+    python benchmarks/bench_detector.py --tokens 10000 --ticks 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector import ImpulseDetector
+from vector_detector import VectorImpulseDetector
+
+
+def make_ticks(tokens, ticks, seed=42):
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.002, size=(ticks, tokens))
+    return np.cumprod(1 + steps, axis=0) * rng.uniform(1e-6, 10, size=tokens)
+
+
+def bench_classic(symbols, ticks, threshold):
+    detector = ImpulseDetector(threshold=threshold)
+    rows = ticks.tolist()
+
+    start = time.perf_counter()
+    impulses = 0
+    for row in rows:
+        for symbol, price in zip(symbols, row):
+            if detector.update_price(symbol, price)[0]:
+                impulses += 1
+    return time.perf_counter() - start, impulses
+
+
+def bench_vector(symbols, ticks, threshold):
+    detector = VectorImpulseDetector(threshold=threshold, capacity=len(symbols))
+
+    start = time.perf_counter()
+    impulses = 0
+    for row in ticks:
+        impulses += len(detector.update_prices(symbols, row))
+    return time.perf_counter() - start, impulses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--threshold', type=float, default=0.01)
+    args = parser.parse_args()
+
+    symbols = [f"T{i}" for i in range(args.tokens)]
+    ticks = make_ticks(args.tokens, args.ticks)
+
+    print(f"Токенов: {args.tokens}, тиков: {args.ticks}, порог: {args.threshold:.2%}")
+    for name, bench in (('classic', bench_classic), ('vector', bench_vector)):
+        elapsed, impulses = bench(symbols, ticks, args.threshold)
+        per_tick = elapsed / args.ticks
+        per_token = per_tick / args.tokens
+        print(
+            f"  {name:8}: {per_tick * 1e3:8.3f} мс/тик | "
+            f"{per_token * 1e9:8.1f} нс/токен | импульсов: {impulses}"
+        )
+
+
+if __name__ == '__main__':
+    main()
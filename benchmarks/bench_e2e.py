@@ -0,0 +1,256 @@
+"""Сквозной нагрузочный бенчмарк: CryptoMonitor против локального mock_exchange.py.
+
+Сервер запускается отдельным процессом, чтобы CPU и память мерились только у бота.
+Отчет: время цикла, запросов в секунду, задержка импульс -> первый замер CEX, CPU, RSS.
+С --shards CPU и RSS складываются по координатору и процессам-шардам.
+Цены CEX после импульса идут через WebSocket mock (--no-stream - только REST),
+--ws-drop-every рвет соединения и проверяет переподключение.
+
+    python benchmarks/bench_e2e.py --tokens 500 --cycles 20 --scan-frequency 2
+    python benchmarks/bench_e2e.py --tokens 5000 --cycles 10 --shards 4
+    python benchmarks/bench_e2e.py --tokens 200 --latency 0.2 --error-rate 0.02 --burst-every 30 --json result.json
+    python benchmarks/bench_e2e.py --tokens 200 --ws-drop-every 5
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import clock
+from config import TOKENS, SETTINGS
+from logger import file_logger
+from mock_exchange import make_tokens
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(args, port):
+    command = [
+        sys.executable, os.path.join(ROOT, 'mock_exchange.py'),
+        '--port', str(port), '--tokens', str(args.tokens),
+        '--latency', str(args.latency), '--error-rate', str(args.error_rate),
+        '--slow-rate', str(args.slow_rate), '--slow-latency', str(args.slow_latency),
+        '--burst-every', str(args.burst_every), '--burst-length', str(args.burst_length),
+        '--impulse-every', str(args.impulse_every),
+        '--impulse-size', str(args.impulse_size),
+        '--ws-drop-every', str(args.ws_drop_every),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(('127.0.0.1', port), timeout=0.2):
+            return process
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("mock_exchange.py не запустился")
+
+
+def configure(args, port):
+    base = f"http://127.0.0.1:{port}"
+    SETTINGS['api_urls'] = {'dexscreener': base, 'gateio': base, 'lbank': base, 'jupiter': base}
+    SETTINGS['cex_stream_mode'] = not args.no_stream
+    ws_base = f"ws://127.0.0.1:{port}/ws"
+    SETTINGS['cex_ws_urls'] = {
+        'gateio_spot': f"{ws_base}/gateio/spot",
+        'gateio_futures': f"{ws_base}/gateio/futures",
+        'lbank_spot': f"{ws_base}/lbank",
+    }
+    SETTINGS['scan_frequency'] = args.scan_frequency
+    SETTINGS['impulse_threshold'] = args.threshold
+    SETTINGS['shards'] = args.shards
+    SETTINGS['dex_sources'] = args.sources
+    SETTINGS['dex_hedge'] = not args.no_hedge
+    SETTINGS['cex_check_intervals'] = args.intervals
+    if not args.real_limits:
+        # меряем бота, а не лимиты бирж
+        for limits in SETTINGS['rate_limits'].values():
+            limits.update(rate=10000, burst=10000, max_rate=10000)
+
+    TOKENS.clear()
+    TOKENS.update(make_tokens(args.tokens))
+
+
+async def run_bench(args, port):
+    # импорт после configure: мониторы читают SETTINGS при создании
+    from main import CryptoMonitor
+    from requiest_logger import logger as request_logger
+
+    monitor = CryptoMonitor()
+    cex = monitor.cex_monitor
+
+    # задержка импульс -> первый замер CEX
+    impulse_at = {}
+    first_sample = []
+    track = cex.track_cex_after_impulse
+    record = cex._record_sample
+
+    async def tracked(symbol, base_price, impulse_price):
+        impulse_at.setdefault(symbol, clock.monotonic())
+        await track(symbol, base_price, impulse_price)
+
+    def recorded(sample, cex_data):
+        started = impulse_at.pop(sample.symbol, None)
+        if started is not None:
+            first_sample.append(clock.monotonic() - started)
+        record(sample, cex_data)
+
+    cex.track_cex_after_impulse = tracked
+    cex._record_sample = recorded
+
+    async def cycle():
+        await monitor._scan_cycle()
+        if monitor.stats['total_cycles'] >= args.cycles:
+            monitor.scan_scheduler.stop()
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.monotonic()
+    if monitor.shards is not None:
+        shards = asyncio.create_task(monitor.shards.run())
+        while monitor.stats['total_cycles'] < args.cycles and not shards.done():
+            await asyncio.sleep(0.05)
+    else:
+        await monitor.scan_scheduler.run(cycle)
+    # даем трекингу последних импульсов сделать первый замер
+    await asyncio.sleep(min(args.intervals) + 1)
+    elapsed = time.monotonic() - started
+    if monitor.shards is not None:
+        # шарды отдают статистику и завершаются (mock-сервер еще жив и не входит в RUSAGE_CHILDREN)
+        await monitor.shards.close()
+    usage_end = resource.getrusage(resource.RUSAGE_SELF)
+    children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    async with monitor.http_client.session.get(f"{SETTINGS['api_urls']['dexscreener']}/__stats") as response:
+        server = await response.json()
+
+    ws_reconnects = sum(stream.reconnects for stream in cex.stream.streams.values()) if cex.stream else None
+
+    await monitor.scan_scheduler.close()
+    await cex.close()
+    await monitor.http_client.close()
+
+    scan = monitor.scan_scheduler.get_stats()
+    dex_requests = request_logger.total_count
+    hedge = monitor.dex_monitor.price_fetcher.get_stats()
+    if monitor.shards is not None:
+        shards = monitor.shards.get_stats()
+        per_shard = [shard['scan'] for shard in shards['shards'].values() if shard['scan']['runs']]
+        # время прохода по всем токенам определяет самый медленный шард
+        scan = {
+            'runs': monitor.stats['total_cycles'],
+            'duration_p50': max((s['duration_p50'] for s in per_shard), default=None),
+            'duration_p99': max((s['duration_p99'] for s in per_shard), default=None),
+            'duration_max': max((s['duration_max'] for s in per_shard), default=None),
+            'skipped': sum(s['skipped'] for s in per_shard),
+        }
+        dex_requests = shards['requests']
+        hedge = {'hedged': shards['hedged'], 'hedge_wins': shards['hedge_wins']}
+
+    first_sample.sort()
+    cpu = (usage_end.ru_utime - usage_start.ru_utime) + (usage_end.ru_stime - usage_start.ru_stime)
+    cpu += (children_end.ru_utime - children_start.ru_utime) + (children_end.ru_stime - children_start.ru_stime)
+    return {
+        'tokens': args.tokens,
+        'shards': args.shards,
+        'cycles': scan['runs'],
+        'elapsed_sec': elapsed,
+        'cycle_p50_sec': scan['duration_p50'],
+        'cycle_p99_sec': scan['duration_p99'],
+        'cycle_max_sec': scan['duration_max'],
+        'skipped_ticks': scan['skipped'],
+        'requests': server.get('requests', 0),
+        'requests_per_sec': server.get('requests', 0) / elapsed,
+        'dex_requests': dex_requests,
+        'server_429': server.get('429', 0),
+        'server_500': server.get('500', 0),
+        'server_slow': server.get('slow', 0),
+        'hedged': hedge['hedged'],
+        'hedge_wins': hedge['hedge_wins'],
+        'ws_connections': server.get('ws_connections', 0),
+        'ws_messages': server.get('ws_messages', 0),
+        'ws_drops': server.get('ws_drops', 0),
+        'ws_reconnects': ws_reconnects,
+        'impulses': monitor.stats['total_impulses'],
+        'impulse_to_cex_p50_sec': first_sample[len(first_sample) // 2] if first_sample else None,
+        'impulse_to_cex_max_sec': first_sample[-1] if first_sample else None,
+        'cpu_sec': cpu,
+        'cpu_percent': 100 * cpu / elapsed,
+        'max_rss_mb': usage_end.ru_maxrss / 1024,  # Linux: ru_maxrss в КБ
+        'max_child_rss_mb': children_end.ru_maxrss / 1024 if args.shards > 1 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--shards', type=int, default=1, help="процессов сканирования DEX")
+    parser.add_argument('--scan-frequency', type=float, default=2.0)
+    parser.add_argument('--threshold', type=float, default=0.05)
+    parser.add_argument('--intervals', type=lambda v: [int(i) for i in v.split(',')], default=[1, 3])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="доля очень медленных ответов mock")
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    parser.add_argument('--sources', type=lambda v: v.split(','), default=['dexscreener'],
+                        help="источники цен DEX через запятую (dexscreener,jupiter)")
+    parser.add_argument('--no-hedge', action='store_true', help="без хедж-запросов")
+    parser.add_argument('--burst-every', type=float, default=0.0)
+    parser.add_argument('--burst-length', type=float, default=1.0)
+    parser.add_argument('--impulse-every', type=float, default=3.0)
+    parser.add_argument('--impulse-size', type=float, default=0.08)
+    parser.add_argument('--real-limits', action='store_true', help="оставить лимиты запросов из config")
+    parser.add_argument('--no-stream', action='store_true', help="цены CEX только через REST (без WebSocket)")
+    parser.add_argument('--ws-drop-every', type=float, default=0.0, help="mock рвет WebSocket раз в N сек")
+    parser.add_argument('--console-mode', choices=('verbose', 'compact', 'silent'), default=SETTINGS['console_mode'],
+                        help="режим консоли бота (стоимость вывода входит в замер)")
+    parser.add_argument('--verbose', action='store_true', help="не глушить вывод бота")
+    parser.add_argument('--json', help="сохранить результат в файл")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_mock(args, port)
+    configure(args, port)
+    # логи бенчмарка - во временную папку, боевые не трогаем
+    logs_dir = tempfile.mkdtemp(prefix='bench_e2e_')
+    file_logger.set_logs_dir(logs_dir)
+    file_logger.set_console_mode(args.console_mode)
+
+    try:
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+            result = asyncio.run(run_bench(args, port))
+    finally:
+        server.terminate()
+        server.wait()
+        file_logger.close()
+
+    for key, value in result.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"  {key:24}: {value}")
+    print(f"  логи: {logs_dir}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
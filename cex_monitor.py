@@ -1,106 +1,106 @@
 import aiohttp
 import asyncio
+import time
+import clock
 from logger import file_logger
-from config import PROXIES, USE_PROXIES, SETTINGS, LBANK_SYMBOL_MAPPING
+from config import TOKENS, SETTINGS, LBANK_SYMBOL_MAPPING
+from cex_stream import CEXPriceStream
+from symbol_index import SymbolIndex
+from cex_scheduler import CEXSampleScheduler
+
+
+GATEIO_HOST = "api.gateio.ws"
+LBANK_HOST = "api.lbank.info"
 
 
 class CEXMonitor:
-    def __init__(self):
+    def __init__(self, http_client, proxy_pool, price_board=None):
+        self.http_client = http_client
+        self.proxy_pool = proxy_pool
+        self.price_board = price_board  # табло цен для других процессов (price_board.py)
         self.cex_prices = {}
         self.active_monitoring = {}
-        self.proxy_index = 0
-        self.failed_proxies = set()
         
-        # Кэш для символов LBank (чтобы не запрашивать каждый раз)
-        self.lbank_symbols_cache = None
         # Маппинг символов для LBank
         self.lbank_symbol_mapping = LBANK_SYMBOL_MAPPING
+        # Списки символов бирж (обновляются в фоне) и готовая таблица по нашим токенам
+        self.symbol_index = SymbolIndex(
+            {
+                "gateio_futures": self.fetch_gateio_futures_contracts,
+                "gateio_spot": self.fetch_gateio_spot_pairs,
+                "lbank_spot": self.fetch_lbank_symbols,
+            },
+            self.lbank_symbol_mapping
+        )
 
-    # ——————————————————————————————————————————
-    def get_proxy(self):
-        if not USE_PROXIES or not PROXIES:
-            return None
+        # Снимок всех тикеров бирж (cex_snapshot_mode)
+        self.ticker_snapshot = None
+        self.ticker_snapshot_at = 0.0
+        self._snapshot_inflight = None
 
-        if len(self.failed_proxies) >= len(PROXIES):
-            self.failed_proxies.clear()
-            file_logger.print_status("🔄 Сброс нерабочих прокси")
+        # Все замеры после импульсов идут через одно колесо таймеров
+        self.scheduler = CEXSampleScheduler(self._sample_round)
 
-        proxy = PROXIES[self.proxy_index]
-        self.proxy_index = (self.proxy_index + 1) % len(PROXIES)
-        return proxy
+        # WebSocket тикеры вместо REST опроса после импульса
+        self.stream = CEXPriceStream(http_client) if SETTINGS['cex_stream_mode'] else None
 
-    def mark_proxy_failed(self, proxy):
-        if proxy:
-            self.failed_proxies.add(proxy)
+    # ——————————————————————————————————————————
+    @staticmethod
+    def _error_status(error):
+        """Ошибка запроса -> статус для пула прокси"""
+        if isinstance(error, asyncio.TimeoutError):
+            return "TIMEOUT"
+        if isinstance(error, aiohttp.ClientProxyConnectionError):
+            return "PROXY_ERROR"
+        return "ERROR"
 
     # ——————————————————————————————————————————
     # LBank API методы
     # ——————————————————————————————————————————
     
-    async def fetch_lbank_symbols(self, session):
-        if self.lbank_symbols_cache:
-            return self.lbank_symbols_cache
-        
-        url = "https://api.lbank.info/v2/currencyPairs.do"
-    
+    async def _fetch_json(self, url, host, name, params=None, use_proxy=False, timeout=30):
+        """GET большой таблицы биржи (списки символов, все тикеры) -> JSON или None"""
+        proxy = self.proxy_pool.acquire(host) if use_proxy else None
+        await self.http_client.rate_limiter.acquire(host, proxy)
+        start_time = time.monotonic()
+
         try:
-            async with session.get(url, timeout=10, ssl=False) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if isinstance(data, dict) and 'data' in data:
-                        symbols = data['data']
-                    else:
-                        symbols = data
-                    
-                    self.lbank_symbols_cache = symbols
-                    file_logger.print_status(f"✅ Получено {len(symbols)} символов с LBank")
-                    return symbols
+            async with self.http_client.session.get(
+                url, params=params, timeout=timeout, proxy=proxy, ssl=False
+            ) as response:
+                self.proxy_pool.report(proxy, host, response.status, time.monotonic() - start_time)
+                self.http_client.rate_limiter.feedback(host, proxy, response.status, response.headers)
+                if response.status != 200:
+                    file_logger.print_status(f"❌ {name} HTTP {response.status}")
+                    return None
+                return await response.json(content_type=None)
         except Exception as e:
-            file_logger.print_status(f"❌ Ошибка получения символов LBank: {e}")
-        return []
-
-    def find_lbank_symbol(self, symbol, all_symbols):
-
-        # Пробуем маппинг из конфига
-        if symbol in self.lbank_symbol_mapping:
-            mapped_symbol = self.lbank_symbol_mapping[symbol]
-            if mapped_symbol in all_symbols:
-                file_logger.print_status(f"✅ Найден маппинг для {symbol} -> {mapped_symbol}")
-                return mapped_symbol
-            else:
-                file_logger.print_status(f"⚠️ Маппинг {mapped_symbol} не найден на LBank")
+            self.proxy_pool.report(proxy, host, self._error_status(e))
+            raise
 
-        # Пробуем автоматические варианты
-        variants = [
-            f"{symbol.lower()}_usdt",
-            f"{symbol.lower()}usdt",
-            symbol.lower()
-        ]
-        
-        for variant in variants:
-            if variant in all_symbols:
-                file_logger.print_status(f"✅ Автоматически найден символ {symbol} -> {variant}")
-                return variant
-                
-        file_logger.print_status(f"❌ Символ {symbol} не найден на LBank")
-        return None
+    async def fetch_lbank_symbols(self):
+        data = await self._fetch_json(
+            f"{SETTINGS['api_urls']['lbank']}/v2/currencyPairs.do", LBANK_HOST, "LBank символы"
+        )
+        if isinstance(data, dict) and 'data' in data:
+            return data['data']
+        return data
 
     async def fetch_lbank_spot(self, session, symbol):
 
-        all_symbols = await self.fetch_lbank_symbols(session)
-        if not all_symbols:
-            file_logger.print_status(f"❌ Не удалось получить список символов LBank для {symbol}")
-            return None
-        
-    # Ищем подходящий символ
-        lbank_symbol = self.find_lbank_symbol(symbol, all_symbols)
+        # Символ LBank из индекса (без поиска по списку)
+        lbank_symbol = await self.symbol_index.resolve(symbol, "lbank_spot")
         if not lbank_symbol:
+            if not self.symbol_index.is_loaded("lbank_spot"):
+                file_logger.print_status(f"❌ Не удалось получить список символов LBank для {symbol}")
             return None
 
-        url = "https://api.lbank.info/v2/ticker.do"
+        url = f"{SETTINGS['api_urls']['lbank']}/v2/ticker.do"
         params = {'symbol': lbank_symbol}
     
-        proxy = self.get_proxy() if USE_PROXIES else None
+        proxy = self.proxy_pool.acquire(LBANK_HOST)
+        await self.http_client.rate_limiter.acquire(LBANK_HOST, proxy)
+        start_time = time.monotonic()
     
         try:
             async with session.get(
@@ -110,14 +110,17 @@ class CEXMonitor:
                 proxy=proxy,
                 ssl=False
             ) as response:
+                self.proxy_pool.report(proxy, LBANK_HOST, response.status, time.monotonic() - start_time)
+                self.http_client.rate_limiter.feedback(LBANK_HOST, proxy, response.status, response.headers)
 
                 if response.status == 403:
-                    self.mark_proxy_failed(proxy)
-                    file_logger.print_status(f"❌ LBank 403 Forbidden для {symbol}")
+                    if file_logger.verbose:
+                        file_logger.print_status(f"❌ LBank 403 Forbidden для {symbol}")
                     return None
 
                 if response.status != 200:
-                    file_logger.print_status(f"❌ LBank HTTP {response.status} для {symbol}")
+                    if file_logger.verbose:
+                        file_logger.print_status(f"❌ LBank HTTP {response.status} для {symbol}")
                     return None
 
                 data = await response.json()
@@ -150,13 +153,17 @@ class CEXMonitor:
                     'latest' in data['data'][0]['ticker']):
                 
                     price = float(data['data'][0]['ticker']['latest'])
-                    file_logger.print_status(f"✅ LBank {symbol}: ${price:.8f}")
+                    if file_logger.verbose:
+                        file_logger.print_status(f"✅ LBank {symbol}: ${price:.8f}")
                     return price
                 else:
-                    file_logger.print_status(f"❌ Нет данных цены для {symbol} на LBank")
+                    if file_logger.verbose:
+                        file_logger.print_status(f"❌ Нет данных цены для {symbol} на LBank")
                     return None
         except Exception as e:
-            file_logger.print_status(f"❌ Ошибка LBank для {symbol}: {e}")
+            self.proxy_pool.report(proxy, LBANK_HOST, self._error_status(e))
+            if file_logger.verbose:
+                file_logger.print_status(f"❌ Ошибка LBank для {symbol}: {e}")
             return None
     # ——————————————————————————————————————————
     # Gate.io методы (остаются как были)
@@ -168,7 +175,9 @@ class CEXMonitor:
             "Accept": "application/json",
         }
 
-        proxy = self.get_proxy() if USE_PROXIES else None
+        proxy = self.proxy_pool.acquire(GATEIO_HOST)
+        await self.http_client.rate_limiter.acquire(GATEIO_HOST, proxy)
+        start_time = time.monotonic()
 
         try:
             async with session.get(
@@ -179,15 +188,17 @@ class CEXMonitor:
                 proxy=proxy,
                 ssl=False
             ) as response:
+                self.proxy_pool.report(proxy, GATEIO_HOST, response.status, time.monotonic() - start_time)
+                self.http_client.rate_limiter.feedback(GATEIO_HOST, proxy, response.status, response.headers)
 
                 if response.status == 403:
-                    self.mark_proxy_failed(proxy)
                     return None
 
                 if response.status != 200:
-                    file_logger.print_status(
-                        f"❌ Gate.io {api_name} HTTP {response.status} — {symbol}"
-                    )
+                    if file_logger.verbose:
+                        file_logger.print_status(
+                            f"❌ Gate.io {api_name} HTTP {response.status} — {symbol}"
+                        )
                     return None
 
                 data = await response.json()
@@ -200,28 +211,56 @@ class CEXMonitor:
                     return None
 
                 price = float(last)
-                file_logger.print_status(f"✅ Gate.io {api_name} {symbol}: ${price:.8f}")
+                if file_logger.verbose:
+                    file_logger.print_status(f"✅ Gate.io {api_name} {symbol}: ${price:.8f}")
                 return price
 
         except Exception as e:
-            file_logger.print_status(f"❌ Ошибка Gate.io {api_name} для {symbol}: {e}")
+            self.proxy_pool.report(proxy, GATEIO_HOST, self._error_status(e))
+            if file_logger.verbose:
+                file_logger.print_status(f"❌ Ошибка Gate.io {api_name} для {symbol}: {e}")
+            return None
+
+    async def fetch_gateio_spot_pairs(self):
+        pairs = await self._fetch_json(
+            f"{SETTINGS['api_urls']['gateio']}/api/v4/spot/currency_pairs", GATEIO_HOST, "Gate.io Spot символы"
+        )
+        if pairs is None:
             return None
+        return [p["id"] for p in pairs if p.get("trade_status", "tradable") == "tradable"]
+
+    async def fetch_gateio_futures_contracts(self):
+        contracts = await self._fetch_json(
+            f"{SETTINGS['api_urls']['gateio']}/api/v4/futures/usdt/contracts", GATEIO_HOST, "Gate.io Futures символы"
+        )
+        if contracts is None:
+            return None
+        return [c["name"] for c in contracts if not c.get("in_delisting")]
+
+    async def _gateio_listed(self, symbol, exchange):
+        """False только если список биржи загружен и символа в нем нет"""
+        resolved = await self.symbol_index.resolve(symbol, exchange)
+        return resolved is not None or not self.symbol_index.is_loaded(exchange)
 
     async def fetch_gateio_futures(self, session, symbol):
+        if not await self._gateio_listed(symbol, "gateio_futures"):
+            return None
         gate_symbol = f"{symbol}_USDT"
         return await self._fetch_gateio_price(
             session,
-            "https://api.gateio.ws/api/v4/futures/usdt/tickers",
+            f"{SETTINGS['api_urls']['gateio']}/api/v4/futures/usdt/tickers",
             {"contract": gate_symbol},
             symbol,
             "Futures"
         )
 
     async def fetch_gateio_spot(self, session, symbol):
+        if not await self._gateio_listed(symbol, "gateio_spot"):
+            return None
         gate_symbol = f"{symbol}_USDT"
         return await self._fetch_gateio_price(
             session,
-            "https://api.gateio.ws/api/v4/spot/tickers",
+            f"{SETTINGS['api_urls']['gateio']}/api/v4/spot/tickers",
             {"currency_pair": gate_symbol},
             symbol,
             "Spot"
@@ -232,44 +271,178 @@ class CEXMonitor:
     # ——————————————————————————————————————————
     
     async def check_symbol_availability(self, symbol):
-        """Проверяет доступность символа на всех CEX"""
-        file_logger.print_status(f"🔍 Проверка доступности {symbol}...")
-
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            # Запускаем все проверки параллельно
-            tasks = [
-                self.fetch_gateio_futures(session, symbol),
-                self.fetch_gateio_spot(session, symbol),
-                self.fetch_lbank_spot(session, symbol)
-            ]
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        """Проверяет доступность символа на всех CEX.
+        По загруженным спискам бирж - без запросов, иначе пробуем получить цену"""
+        if file_logger.verbose:
+            file_logger.print_status(f"🔍 Проверка доступности {symbol}...")
+
+        session = self.http_client.session
+        fetchers = {
+            "gateio_futures": self.fetch_gateio_futures,
+            "gateio_spot": self.fetch_gateio_spot,
+            "lbank_spot": self.fetch_lbank_spot,
+        }
 
-        # Обрабатываем результаты
-        result = {
-            "gateio_futures": not isinstance(results[0], Exception) and results[0] is not None,
-            "gateio_spot": not isinstance(results[1], Exception) and results[1] is not None,
-            "lbank_spot": not isinstance(results[2], Exception) and results[2] is not None
+        result = {}
+        fallback = {}
+        for exchange, fetch in fetchers.items():
+            resolved = await self.symbol_index.resolve(symbol, exchange)
+            if self.symbol_index.is_loaded(exchange):
+                result[exchange] = resolved is not None
+            else:
+                fallback[exchange] = fetch(session, symbol)
+
+        # Запускаем оставшиеся проверки параллельно
+        if fallback:
+            prices = await asyncio.gather(*fallback.values(), return_exceptions=True)
+            for exchange, price in zip(fallback, prices):
+                result[exchange] = not isinstance(price, Exception) and price is not None
+
+        return result
+
+    # ——————————————————————————————————————————
+    # Снимок всех тикеров (один запрос на биржу за тик)
+    # ——————————————————————————————————————————
+
+    async def _fetch_gateio_all(self, url, symbol_key, name):
+        tickers = await self._fetch_json(url, GATEIO_HOST, name, use_proxy=True, timeout=10)
+        return self._parse_gateio_tickers(tickers, symbol_key)
+
+    @staticmethod
+    def _parse_gateio_tickers(tickers, symbol_key):
+        """Таблица тикеров Gate.io -> {символ: цена}"""
+        prices = {}
+        for ticker in tickers or []:
+            last = ticker.get("last")
+            if last:
+                prices[ticker.get(symbol_key)] = float(last)
+        return prices
+
+    async def _fetch_lbank_all(self):
+        data = await self._fetch_json(
+            f"{SETTINGS['api_urls']['lbank']}/v2/ticker.do", LBANK_HOST, "LBank тикеры",
+            params={"symbol": "all"}, use_proxy=True, timeout=10
+        )
+        prices = {}
+        if isinstance(data, dict) and data.get("result") in ("true", True):
+            for item in data.get("data") or []:
+                latest = (item.get("ticker") or {}).get("latest")
+                if latest is not None:
+                    prices[item.get("symbol")] = float(latest)
+        return prices
+
+    async def _load_ticker_snapshot(self):
+        try:
+            futures, spot, lbank = await asyncio.gather(
+                self._fetch_gateio_all(
+                    f"{SETTINGS['api_urls']['gateio']}/api/v4/futures/usdt/tickers", "contract", "Gate.io Futures тикеры"
+                ),
+                self._fetch_gateio_all(
+                    f"{SETTINGS['api_urls']['gateio']}/api/v4/spot/tickers", "currency_pair", "Gate.io Spot тикеры"
+                ),
+                self._fetch_lbank_all(),
+                return_exceptions=True
+            )
+
+            snapshot = {}
+            for exchange, prices in (("gateio_futures", futures), ("gateio_spot", spot), ("lbank_spot", lbank)):
+                if isinstance(prices, Exception):
+                    file_logger.print_status(f"❌ Ошибка снимка тикеров {exchange}: {prices}")
+                    prices = {}
+                snapshot[exchange] = prices
+
+            self.ticker_snapshot = snapshot
+            self.ticker_snapshot_at = time.monotonic()
+            # каждый загруженный снимок - в тики один раз (в том числе снимки для трекинга импульсов)
+            if SETTINGS['record_ticks'] or SETTINGS['tick_store']:
+                await self._log_snapshot_ticks(snapshot)
+            return snapshot
+        finally:
+            self._snapshot_inflight = None
+
+    async def get_ticker_snapshot(self):
+        """{exchange: {символ биржи: цена}} - не старше cex_snapshot_ttl, общий на всех"""
+        if (self.ticker_snapshot is not None
+                and time.monotonic() - self.ticker_snapshot_at < SETTINGS['cex_snapshot_ttl']):
+            return self.ticker_snapshot
+
+        if self._snapshot_inflight is None:
+            self._snapshot_inflight = asyncio.create_task(self._load_ticker_snapshot())
+        return await asyncio.shield(self._snapshot_inflight)
+
+    async def prices_from_snapshot(self, symbol):
+        snapshot = await self.get_ticker_snapshot()
+
+        session = self.http_client.session
+        fetchers = {
+            "gateio_futures": self.fetch_gateio_futures,
+            "gateio_spot": self.fetch_gateio_spot,
+            "lbank_spot": self.fetch_lbank_spot,
         }
 
+        result = {}
+        fallback = {}
+        for exchange, prices in snapshot.items():
+            if not prices:
+                # таблица биржи не загрузилась - спрашиваем символ отдельно
+                fallback[exchange] = fetchers[exchange](session, symbol)
+                continue
+
+            exchange_symbol = await self.symbol_index.resolve(symbol, exchange)
+            if exchange_symbol is None and exchange != "lbank_spot":
+                exchange_symbol = f"{symbol}_USDT"
+            price = prices.get(exchange_symbol)
+            if price:
+                result[exchange] = price
+
+        if fallback:
+            prices = await asyncio.gather(*fallback.values(), return_exceptions=True)
+            for exchange, price in zip(fallback, prices):
+                if not isinstance(price, Exception) and price is not None:
+                    result[exchange] = price
         return result
 
+    async def record_ticks(self):
+        """Свежий снимок тикеров каждый цикл (record_ticks, для replay) - пишется при загрузке"""
+        await self.get_ticker_snapshot()
+
+    async def _log_snapshot_ticks(self, snapshot):
+        """Цены всех токенов из снимка тикеров -> log_ticks"""
+        for exchange, prices in snapshot.items():
+            if not prices:
+                continue
+            ticks = {}
+            for token in TOKENS:
+                exchange_symbol = await self.symbol_index.resolve(token, exchange)
+                price = prices.get(exchange_symbol) if exchange_symbol else None
+                if price:
+                    ticks[token] = price
+            file_logger.log_ticks(exchange, ticks)
+
+    def _set_cex_prices(self, symbol, prices):
+        self.cex_prices[symbol] = prices
+        if self.price_board is not None:
+            self.price_board.publish_symbol(symbol, prices)
+
     async def monitor_cex_prices(self, symbol):
         """Получает цены со всех CEX бирж"""
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-
-        async with aiohttp.ClientSession(connector=connector) as session:
-            # Запускаем все запросы параллельно
-            tasks = [
-                self.fetch_gateio_futures(session, symbol),
-                self.fetch_gateio_spot(session, symbol),
-                self.fetch_lbank_spot(session, symbol)
-            ]
-            
-            futures_price, spot_price, lbank_price = await asyncio.gather(
-                *tasks, return_exceptions=True
-            )
+        if SETTINGS['cex_snapshot_mode']:
+            result = await self.prices_from_snapshot(symbol)
+            self._set_cex_prices(symbol, result)
+            return result
+
+        session = self.http_client.session
+
+        # Запускаем все запросы параллельно
+        tasks = [
+            self.fetch_gateio_futures(session, symbol),
+            self.fetch_gateio_spot(session, symbol),
+            self.fetch_lbank_spot(session, symbol)
+        ]
+
+        futures_price, spot_price, lbank_price = await asyncio.gather(
+            *tasks, return_exceptions=True
+        )
 
         # Собираем результаты
         result = {}
@@ -280,80 +453,152 @@ class CEXMonitor:
         if not isinstance(lbank_price, Exception) and lbank_price is not None:
             result["lbank_spot"] = lbank_price
 
-        self.cex_prices[symbol] = result
+        self._set_cex_prices(symbol, result)
+        return result
+
+    async def _stream_symbols(self, symbol, available):
+        """Символы бирж для WebSocket подписки (только там, где монета есть)"""
+        exchange_symbols = {}
+        for exchange in available:
+            exchange_symbols[exchange] = await self.symbol_index.resolve(symbol, exchange)
+        # gate.io без загруженного списка - формат символа известен
+        for exchange in ("gateio_spot", "gateio_futures"):
+            if exchange in available and not exchange_symbols[exchange]:
+                exchange_symbols[exchange] = f"{symbol}_USDT"
+        return exchange_symbols
+
+    async def sample_cex_prices(self, symbol, available):
+        """Цены для трекера: из таблицы WebSocket, недостающие биржи - через REST"""
+        if self.stream is None:
+            return await self.monitor_cex_prices(symbol)
+
+        result = self.stream.get_prices(symbol)
+        if any(ex not in result for ex in available):
+            rest = await self.monitor_cex_prices(symbol)
+            for ex, price in rest.items():
+                result.setdefault(ex, price)
+
+        self._set_cex_prices(symbol, result)
         return result
 
+    async def _sample_round(self, samples):
+        """Один раунд замеров для всех (символ, смещение), попавших в тик планировщика"""
+        symbols = {}
+        for sample in samples:
+            symbols.setdefault(sample.symbol, sample.available)
+
+        # один запрос цен на символ (в snapshot режиме - один снимок на всех)
+        results = await asyncio.gather(
+            *(self.sample_cex_prices(symbol, available) for symbol, available in symbols.items()),
+            return_exceptions=True
+        )
+        sampled_at = clock.monotonic()
+        prices = dict(zip(symbols, results))
+
+        for sample in samples:
+            sample.lag = sampled_at - sample.due
+            cex_data = prices[sample.symbol]
+            if isinstance(cex_data, Exception):
+                file_logger.print_status(f"❌ Ошибка замера CEX {sample.symbol}: {cex_data}")
+                continue
+            self._record_sample(sample, cex_data)
+
+    def _record_sample(self, sample, cex_data):
+        interval = sample.interval
+        base_price = sample.base_price
+        impulse_price = sample.impulse_price
+
+        if not cex_data:
+            if file_logger.verbose:
+                file_logger.print_status(f"{sample.symbol} {interval} сек — ❌ нет данных")
+            return
+
+        # Собираем данные для записи
+        record = {}
+        for ex, price in cex_data.items():
+            change_base = (price - base_price) / base_price
+            change_imp = (price - impulse_price) / impulse_price
+
+            record[ex] = {
+                "price": price,
+                "change_from_base": change_base,
+                "change_from_impulse": change_imp
+            }
+
+        # Запись в лог
+        file_logger.log_cex_data(
+            sample.symbol,
+            base_price,
+            impulse_price,
+            record,
+            interval,
+            lag=sample.lag
+        )
+
+        # Вывод в консоль (в silent строку даже не собираем)
+        if not file_logger.console:
+            return
+        line = f"{sample.symbol} {interval} сек (+{sample.lag:.2f}s): "
+        for ex, d in record.items():
+            line += (
+                f"{ex} {d['change_from_base']:+.2%}  "
+                f"({d['change_from_impulse']:+.2%})  "
+            )
+
+        print(line)
+
     async def track_cex_after_impulse(self, symbol, base_price, impulse_price):
         """Трекинг цен на CEX после импульса"""
         if symbol in self.active_monitoring:
             return
 
         self.active_monitoring[symbol] = True
+        impulse_at = clock.monotonic()
 
         try:
             intervals = SETTINGS["cex_check_intervals"]
 
-            file_logger.print_status(
-                f"🎯 CEX мониторинг {symbol}, "
-                f"импульс: {(impulse_price - base_price) / base_price:+.2%}"
-            )
+            if file_logger.verbose:
+                file_logger.print_status(
+                    f"🎯 CEX мониторинг {symbol}, "
+                    f"импульс: {(impulse_price - base_price) / base_price:+.2%}"
+                )
 
             # Проверяем доступность
             availability = await self.check_symbol_availability(symbol)
             available = [ex for ex, ok in availability.items() if ok]
 
             if not available:
-                file_logger.print_status(f"❌ {symbol} не найден на CEX биржах")
+                if file_logger.verbose:
+                    file_logger.print_status(f"❌ {symbol} не найден на CEX биржах")
                 return
 
-            file_logger.print_status("📊 Доступно на: " + ", ".join(available))
-
-            # Цикл мониторинга
-            for interval in intervals:
-                await asyncio.sleep(interval)
-
-                cex_data = await self.monitor_cex_prices(symbol)
-                if not cex_data:
-                    file_logger.print_status(f"{interval} сек — ❌ нет данных")
-                    continue
-
-                # Собираем данные для записи
-                record = {}
-                for ex, price in cex_data.items():
-                    change_base = (price - base_price) / base_price
-                    change_imp = (price - impulse_price) / impulse_price
-
-                    record[ex] = {
-                        "price": price,
-                        "change_from_base": change_base,
-                        "change_from_impulse": change_imp
-                    }
-
-                # Запись в лог
-                file_logger.log_cex_data(
-                    symbol,
-                    base_price,
-                    impulse_price,
-                    record,
-                    interval
-                )
+            if file_logger.verbose:
+                file_logger.print_status("📊 Доступно на: " + ", ".join(available))
 
-                # Вывод в консоль
-                line = f"{interval} сек: "
-                for ex, d in record.items():
-                    line += (
-                        f"{ex} {d['change_from_base']:+.2%}  "
-                        f"({d['change_from_impulse']:+.2%})  "
-                    )
+            if self.stream is not None:
+                await self.stream.track(symbol, await self._stream_symbols(symbol, available))
 
-                print(line)
+            # Замеры через intervals сек после импульса - в общем планировщике
+            await self.scheduler.schedule(
+                symbol, base_price, impulse_price, intervals, available, impulse_at
+            )
 
-            file_logger.print_status(f"✅ Мониторинг CEX завершен: {symbol}")
+            if file_logger.verbose:
+                file_logger.print_status(f"✅ Мониторинг CEX завершен: {symbol}")
 
         finally:
+            if self.stream is not None:
+                await self.stream.untrack(symbol)
             if symbol in self.active_monitoring:
                 del self.active_monitoring[symbol]
 
+    async def close(self):
+        await self.scheduler.close()
+        await self.symbol_index.close()
+        if self.stream is not None:
+            await self.stream.close()
+
     # ——————————————————————————————————————————
     # Дополнительные методы для отладки
     # ——————————————————————————————————————————
@@ -362,32 +607,29 @@ class CEXMonitor:
         """Проверяет доступность всех монет из маппинга на LBank"""
         file_logger.print_status("🔍 Проверка доступности монет на LBank...")
         
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
+        all_symbols = await self.symbol_index.sets["lbank_spot"].get()
+        if not all_symbols:
+            file_logger.print_status("❌ Не удалось получить список символов LBank")
+            return []
+            
+        available = []
+        unavailable = []
         
-        async with aiohttp.ClientSession(connector=connector) as session:
-            all_symbols = await self.fetch_lbank_symbols(session)
-            if not all_symbols:
-                file_logger.print_status("❌ Не удалось получить список символов LBank")
-                return []
+        for symbol in self.lbank_symbol_mapping.keys():
+            lbank_symbol = self.symbol_index.find_lbank_symbol(symbol, all_symbols)
+            if lbank_symbol:
+                available.append(f"{symbol} -> {lbank_symbol}")
+            else:
+                unavailable.append(symbol)
                 
-            available = []
-            unavailable = []
+        file_logger.print_status(f"\n📊 Доступность монет на LBank:")
+        file_logger.print_status(f"✅ Доступно ({len(available)}):")
+        for item in available:
+            file_logger.print_status(f"   {item}")
             
-            for symbol in self.lbank_symbol_mapping.keys():
-                lbank_symbol = self.find_lbank_symbol(symbol, all_symbols)
-                if lbank_symbol:
-                    available.append(f"{symbol} -> {lbank_symbol}")
-                else:
-                    unavailable.append(symbol)
-                    
-            file_logger.print_status(f"\n📊 Доступность монет на LBank:")
-            file_logger.print_status(f"✅ Доступно ({len(available)}):")
-            for item in available:
-                file_logger.print_status(f"   {item}")
+        if unavailable:
+            file_logger.print_status(f"❌ Недоступно ({len(unavailable)}):")
+            for symbol in unavailable:
+                file_logger.print_status(f"   {symbol}")
                 
-            if unavailable:
-                file_logger.print_status(f"❌ Недоступно ({len(unavailable)}):")
-                for symbol in unavailable:
-                    file_logger.print_status(f"   {symbol}")
-                    
-            return available
\ No newline at end of file
+        return available
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import math
+
+import clock
+import metrics
+from config import SETTINGS
+from requiest_logger import LatencyHistogram
+
+
+class TimingWheel:
+    """Хешированное колесо таймеров: выборка готовых - по слотам тиков.
+    Куча занятых тиков (по одному на тик) говорит, когда ближайший - спать до него, а не до каждого тика"""
+
+    def __init__(self, tick, slots):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.origin = clock.monotonic()
+        self.cursor = 0  # следующий необработанный тик
+        self.size = 0
+        self.busy_ticks = []  # куча тиков, в которых есть элементы (прошедшие убираем лениво)
+        self.busy_set = set()
+
+    def add(self, due, item):
+        tick = max(self.cursor, math.ceil((due - self.origin) / self.tick))
+        self.slots[tick % len(self.slots)].append((tick, item))
+        self.size += 1
+        if tick not in self.busy_set:
+            self.busy_set.add(tick)
+            heapq.heappush(self.busy_ticks, tick)
+
+    def next_due_time(self):
+        """Время ближайшего тика с элементами (None - колесо пустое)"""
+        busy = self.busy_ticks
+        while busy and busy[0] < self.cursor:
+            self.busy_set.discard(heapq.heappop(busy))
+        return self.origin + busy[0] * self.tick if busy else None
+
+    def pop_due(self, now):
+        """Все элементы, чей тик уже наступил"""
+        # допуск на погрешность float: now == next_tick_time() должен выдать этот тик
+        target = math.floor((now - self.origin) / self.tick + 1e-9)
+        if self.cursor > target:
+            return []
+        # после простоя не проходим каждый пропущенный тик: пустое колесо - сразу к target,
+        # отставание больше оборота - один проход по всем слотам
+        if not self.size or target - self.cursor >= len(self.slots):
+            due = self._collect(range(len(self.slots)), target)
+            self.cursor = target + 1
+            return due
+
+        due = []
+        while self.cursor <= target:
+            due.extend(self._collect((self.cursor % len(self.slots),), self.cursor))
+            self.cursor += 1
+        return due
+
+    def _collect(self, indexes, limit):
+        """Элементы слотов indexes с тиком <= limit"""
+        due = []
+        for index in indexes:
+            slot = self.slots[index]
+            if not slot:
+                continue
+            # в слоте могут лежать элементы следующих оборотов колеса
+            keep = []
+            for entry in slot:
+                if entry[0] <= limit:
+                    due.append(entry[1])
+                else:
+                    keep.append(entry)
+            self.slots[index] = keep
+        self.size -= len(due)
+        return due
+
+
+class ScheduledSample:
+    """Один замер CEX: символ и смещение от момента импульса"""
+
+    __slots__ = ('symbol', 'base_price', 'impulse_price', 'interval', 'due', 'available', 'tracking', 'lag')
+
+    def __init__(self, symbol, base_price, impulse_price, interval, due, available, tracking):
+        self.symbol = symbol
+        self.base_price = base_price
+        self.impulse_price = impulse_price
+        self.interval = interval
+        self.due = due
+        self.available = available
+        self.tracking = tracking
+        self.lag = None
+
+
+class CEXSampleScheduler:
+    """Общий планировщик замеров CEX после импульсов.
+    Все (символ, смещение) лежат в одном колесе; замеры, попавшие в один тик,
+    обрабатываются одним раундом запросов (sample_round)"""
+
+    def __init__(self, sample_round):
+        self.sample_round = sample_round  # async (список ScheduledSample) -> None, проставляет lag
+        self.wheel = TimingWheel(SETTINGS['cex_scheduler_tick'], SETTINGS['cex_scheduler_slots'])
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self._rounds = set()
+
+        self.lag = LatencyHistogram()
+        self.samples = 0
+        self.rounds = 0
+
+    def schedule(self, symbol, base_price, impulse_price, intervals, available, impulse_at):
+        """Планирует замеры через intervals сек после impulse_at (monotonic).
+        Возвращает future, который завершится после последнего замера"""
+        loop = asyncio.get_running_loop()
+        tracking = {'remaining': len(intervals), 'done': loop.create_future()}
+
+        for interval in intervals:
+            sample = ScheduledSample(
+                symbol, base_price, impulse_price, interval, impulse_at + interval, available, tracking
+            )
+            self.wheel.add(sample.due, sample)
+
+        if not intervals:
+            tracking['done'].set_result(None)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wakeup.set()
+        return tracking['done']
+
+    async def _run(self):
+        while self.wheel.size:
+            wait = self.wheel.next_due_time() - clock.monotonic()
+            if wait > 0:
+                # спим до ближайшего замера; schedule() будит раньше - новый замер может быть ближе
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self.wheel.pop_due(clock.monotonic())
+            if due:
+                # раунд в отдельной задаче: медленная биржа не задерживает следующие тики
+                task = asyncio.create_task(self._process(due))
+                self._rounds.add(task)
+                task.add_done_callback(self._rounds.discard)
+
+    async def _process(self, samples):
+        self.rounds += 1
+        try:
+            await self.sample_round(samples)
+        finally:
+            for sample in samples:
+                self.samples += 1
+                if sample.lag is not None:
+                    self.lag.add(max(0.0, sample.lag))
+                    metrics.CEX_SAMPLE_LAG_SECONDS.observe(max(0.0, sample.lag))
+
+                tracking = sample.tracking
+                tracking['remaining'] -= 1
+                if tracking['remaining'] == 0 and not tracking['done'].done():
+                    tracking['done'].set_result(None)
+
+    def get_stats(self):
+        return {
+            'pending': self.wheel.size,
+            'samples': self.samples,
+            'rounds': self.rounds,
+            'lag_p50': self.lag.percentile(0.5),
+            'lag_p99': self.lag.percentile(0.99),
+            'lag_max': self.lag.max if self.lag.count else None,
+        }
+
+    async def close(self):
+        for task in [self._task, *self._rounds]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in [self._task, *self._rounds] if t is not None), return_exceptions=True)
+        self._task = None
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from config import SETTINGS
+from logger import file_logger
+
+
+class ExchangeStream:
+    """Одно WebSocket подключение к бирже: подписки, разбор тикеров, переподключение.
+    Наследники описывают формат подписки и разбор сообщений"""
+
+    def __init__(self, name, url, http_client, on_price):
+        self.name = name
+        self.url = url
+        self.http_client = http_client
+        self.on_price = on_price
+
+        # символ биржи -> наш символ
+        self.symbols = {}
+        self._ws = None
+        self._task = None
+        self._has_symbols = asyncio.Event()
+        self.reconnects = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def subscribe(self, symbol, exchange_symbol):
+        self.symbols[exchange_symbol] = symbol
+        self._has_symbols.set()
+        await self._send(self._subscribe_message([exchange_symbol]))
+
+    async def unsubscribe(self, exchange_symbol):
+        if self.symbols.pop(exchange_symbol, None) is None:
+            return
+        if not self.symbols:
+            self._has_symbols.clear()
+        await self._send(self._unsubscribe_message([exchange_symbol]))
+
+    async def _send(self, message):
+        if self._ws is None or self._ws.closed:
+            # не подключены - подпишемся при переподключении
+            return
+        try:
+            await self._ws.send_str(json.dumps(message))
+        except Exception as e:
+            file_logger.print_status(f"⚠️ WS {self.name}: ошибка отправки: {e}")
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            await self._has_symbols.wait()
+            try:
+                async with self.http_client.session.ws_connect(
+                    self.url,
+                    heartbeat=SETTINGS['cex_ws_heartbeat'],
+                    ssl=False
+                ) as ws:
+                    self._ws = ws
+                    backoff = 1
+                    file_logger.print_status(f"🔌 WS {self.name}: подключено ({len(self.symbols)} символов)")
+
+                    if self.symbols:
+                        await self._send(self._subscribe_message(list(self.symbols)))
+
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            await self._handle_text(msg.data)
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                file_logger.print_status(f"⚠️ WS {self.name}: {e}")
+            finally:
+                self._ws = None
+
+            self.reconnects += 1
+            file_logger.print_status(f"🔄 WS {self.name}: переподключение через {backoff} сек")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, SETTINGS['cex_ws_max_backoff'])
+
+    async def _handle_text(self, text):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+
+        if await self._handle_control(message):
+            return
+
+        for exchange_symbol, price in self._parse(message):
+            symbol = self.symbols.get(exchange_symbol)
+            if symbol is not None and price:
+                self.on_price(symbol, self.name, price)
+
+    async def _handle_control(self, message):
+        """Служебные сообщения (пинги и т.п.). True - сообщение обработано"""
+        return False
+
+    def _subscribe_message(self, exchange_symbols):
+        raise NotImplementedError
+
+    def _unsubscribe_message(self, exchange_symbols):
+        raise NotImplementedError
+
+    def _parse(self, message):
+        """Возвращает список (символ биржи, цена)"""
+        raise NotImplementedError
+
+
+class GateioStream(ExchangeStream):
+    """Gate.io v4: каналы spot.tickers и futures.tickers"""
+
+    def __init__(self, name, url, http_client, on_price, channel, symbol_key):
+        super().__init__(name, url, http_client, on_price)
+        self.channel = channel
+        self.symbol_key = symbol_key
+
+    def _subscribe_message(self, exchange_symbols):
+        return {
+            "time": int(time.time()),
+            "channel": self.channel,
+            "event": "subscribe",
+            "payload": exchange_symbols
+        }
+
+    def _unsubscribe_message(self, exchange_symbols):
+        message = self._subscribe_message(exchange_symbols)
+        message["event"] = "unsubscribe"
+        return message
+
+    def _parse(self, message):
+        if message.get("channel") != self.channel or message.get("event") != "update":
+            return []
+
+        # spot присылает один тикер, futures - список
+        result = message.get("result")
+        if isinstance(result, dict):
+            result = [result]
+
+        prices = []
+        for ticker in result or []:
+            last = ticker.get("last")
+            if last:
+                prices.append((ticker.get(self.symbol_key), float(last)))
+        return prices
+
+
+class LBankStream(ExchangeStream):
+    """LBank v2: канал tick, пары вида bonk_usdt, пинг на уровне приложения"""
+
+    def _subscribe_message(self, exchange_symbols):
+        # LBank подписывает по одной паре за сообщение
+        return [{"action": "subscribe", "subscribe": "tick", "pair": pair} for pair in exchange_symbols]
+
+    def _unsubscribe_message(self, exchange_symbols):
+        return [{"action": "unsubscribe", "subscribe": "tick", "pair": pair} for pair in exchange_symbols]
+
+    async def _send(self, message):
+        for item in message:
+            await super()._send(item)
+
+    async def _handle_control(self, message):
+        if message.get("action") == "ping":
+            await super()._send({"action": "pong", "pong": message.get("ping")})
+            return True
+        return False
+
+    def _parse(self, message):
+        if message.get("type") != "tick":
+            return []
+
+        latest = (message.get("tick") or {}).get("latest")
+        if latest is None:
+            return []
+        return [(message.get("pair"), float(latest))]
+
+
+class CEXPriceStream:
+    """Стриминг тикеров CEX по WebSocket.
+    Держит в памяти таблицу последних цен, которую трекер читает без сетевых задержек"""
+
+    def __init__(self, http_client):
+        urls = SETTINGS['cex_ws_urls']
+
+        # symbol -> {exchange: (price, monotonic ts)}
+        self.prices = {}
+        self._tracked = {}
+
+        self.streams = {
+            "gateio_spot": GateioStream(
+                "gateio_spot", urls['gateio_spot'], http_client, self._on_price,
+                "spot.tickers", "currency_pair"
+            ),
+            "gateio_futures": GateioStream(
+                "gateio_futures", urls['gateio_futures'], http_client, self._on_price,
+                "futures.tickers", "contract"
+            ),
+            "lbank_spot": LBankStream(
+                "lbank_spot", urls['lbank_spot'], http_client, self._on_price
+            ),
+        }
+
+    def _on_price(self, symbol, exchange, price):
+        self.prices.setdefault(symbol, {})[exchange] = (price, time.monotonic())
+
+    async def track(self, symbol, exchange_symbols):
+        """Подписка на символ. exchange_symbols: {exchange: символ на бирже}"""
+        count = self._tracked.get(symbol, (0, {}))[0]
+        self._tracked[symbol] = (count + 1, exchange_symbols)
+        if count:
+            return
+
+        for exchange, exchange_symbol in exchange_symbols.items():
+            stream = self.streams.get(exchange)
+            if stream is None or not exchange_symbol:
+                continue
+            stream.start()
+            await stream.subscribe(symbol, exchange_symbol)
+
+    async def untrack(self, symbol):
+        count, exchange_symbols = self._tracked.get(symbol, (0, {}))
+        if count > 1:
+            self._tracked[symbol] = (count - 1, exchange_symbols)
+            return
+
+        self._tracked.pop(symbol, None)
+        self.prices.pop(symbol, None)
+        for exchange, exchange_symbol in exchange_symbols.items():
+            stream = self.streams.get(exchange)
+            if stream is not None and exchange_symbol:
+                await stream.unsubscribe(exchange_symbol)
+
+    def get_prices(self, symbol, max_age=None):
+        """Последние цены символа {exchange: price}, старше max_age сек не берем"""
+        if max_age is None:
+            max_age = SETTINGS['cex_ws_max_age']
+
+        now = time.monotonic()
+        return {
+            exchange: price
+            for exchange, (price, ts) in self.prices.get(symbol, {}).items()
+            if now - ts <= max_age
+        }
+
+    async def close(self):
+        for stream in self.streams.values():
+            await stream.stop()
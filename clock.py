@@ -0,0 +1,94 @@
+"""Часы бота: реальные или виртуальные (replay).
+
+Код, которому важно "сколько сейчас", берет время отсюда (clock.time(), clock.monotonic(),
+clock.now()), а не из time/datetime напрямую. В replay ставится SimClock и SimEventLoop:
+asyncio.sleep не ждет, а сдвигает виртуальное время к ближайшему таймеру.
+Задержки реальных запросов по-прежнему меряются time.monotonic().
+"""
+import asyncio
+import selectors
+import time as _time
+from datetime import datetime
+
+
+class RealClock:
+    def time(self):
+        return _time.time()
+
+    def monotonic(self):
+        return _time.monotonic()
+
+    def now(self):
+        return datetime.now()
+
+
+class SimClock:
+    """Виртуальное время. Двигается только event loop'ом, когда ему нечего делать.
+    monotonic() считаем от старта: у маленьких чисел float точнее, чем у unix времени"""
+
+    def __init__(self, start):
+        self.start = float(start)
+        self.elapsed = 0.0
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        return self.elapsed
+
+    def now(self):
+        return datetime.fromtimestamp(self.time())
+
+    def advance(self, seconds):
+        self.elapsed += seconds
+
+
+class _SimSelector(selectors.DefaultSelector):
+    """select() не спит: если событий нет, сдвигаем часы на таймаут до ближайшего таймера"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events:
+            return events
+        if timeout is None:
+            # ни таймеров, ни готовых задач - в replay это значит, что кто-то ждет реального IO
+            raise RuntimeError("Виртуальные часы: event loop ждет без таймеров (реальный IO в replay?)")
+        if timeout > 0:
+            self.clock.advance(timeout)
+        return events
+
+
+class SimEventLoop(asyncio.SelectorEventLoop):
+    """Event loop на виртуальном времени: asyncio.sleep(60) выполняется мгновенно"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        super().__init__(_SimSelector(clock))
+
+    def time(self):
+        return self.clock.monotonic()
+
+
+_clock = RealClock()
+
+
+def install(clock):
+    """Подменить часы всего бота (None - вернуть реальные)"""
+    global _clock
+    _clock = clock if clock is not None else RealClock()
+
+
+def time():
+    return _clock.time()
+
+
+def monotonic():
+    return _clock.monotonic()
+
+
+def now():
+    return _clock.now()
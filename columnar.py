@@ -0,0 +1,343 @@
+"""Колоночное хранилище импульсов и CEX замеров.
+
+Каждая таблица - типизированные записи NumPy (общая схема для логгера и анализатора),
+партиции по дням: logs/columnar/<таблица>/<YYYY-MM-DD>.v1.bin. Логгер дописывает
+сырые байты записей, анализатор читает партицию целиком через np.fromfile.
+
+Конвертация JSONL логов (строки, которых еще нет в партициях; повторный запуск
+дописывает только новое, см. columnar/converted.json):
+    python columnar.py convert [папка с логами]
+"""
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+IMPULSE_DTYPE = np.dtype([
+    ('ts', '<f8'),  # unix время импульса
+    ('token', 'S24'),
+    ('base_price', '<f8'),
+    ('impulse_price', '<f8'),
+    ('change', '<f8'),  # доля, 0.05 = +5%
+    ('window', '<f4'),  # окно детектора (сек), NaN если детектор без окон
+])
+
+CEX_DTYPE = np.dtype([
+    ('ts', '<f8'),  # unix время замера
+    ('token', 'S24'),
+    ('exchange', 'S16'),
+    ('interval', '<i4'),  # сек после импульса
+    ('base_price', '<f8'),
+    ('impulse_price', '<f8'),  # цена DEX в момент импульса
+    ('price', '<f8'),  # цена на CEX
+    ('change_from_base', '<f8'),
+    ('change_from_impulse', '<f8'),
+])
+
+TABLES = {
+    'impulses': IMPULSE_DTYPE,
+    'cex': CEX_DTYPE,
+}
+
+
+def partition_name(table, ts):
+    """Относительный путь партиции (от папки логов) для записи с временем ts"""
+    day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+    return os.path.join('columnar', table, f"{day}.v{SCHEMA_VERSION}.bin")
+
+
+def impulse_rows(ts, token, base_price, impulse_price, change, window=None):
+    rows = np.zeros(1, dtype=IMPULSE_DTYPE)
+    rows[0] = (
+        ts, token.encode(), base_price, impulse_price, change,
+        np.nan if window is None else window
+    )
+    return rows
+
+
+def cex_rows(ts, token, base_price, impulse_price, cex_prices, interval):
+    """cex_prices: {exchange: {'price', 'change_from_base', 'change_from_impulse'}} - строка на биржу"""
+    rows = np.zeros(len(cex_prices), dtype=CEX_DTYPE)
+    for i, (exchange, data) in enumerate(cex_prices.items()):
+        rows[i] = (
+            ts, token.encode(), exchange.encode(), interval, base_price, impulse_price,
+            data['price'], data['change_from_base'], data['change_from_impulse']
+        )
+    return rows
+
+
+def open_partition(path):
+    """Партиция на дозапись. Недописанный хвост (падение посреди записи) сначала обрезаем,
+    иначе все следующие записи дня сдвинутся и прочитаются мусором"""
+    table = os.path.basename(os.path.dirname(path))
+    itemsize = TABLES[table].itemsize
+    if os.path.exists(path):
+        size = os.path.getsize(path)
+        if size % itemsize:
+            os.truncate(path, size - size % itemsize)
+    return open(path, 'ab')
+
+
+def load_table(logs_dir, table, start_day=None, end_day=None):
+    """Все записи таблицы (опционально по диапазону дней 'YYYY-MM-DD') одним массивом"""
+    dtype = TABLES[table]
+    table_dir = os.path.join(logs_dir, 'columnar', table)
+    if not os.path.isdir(table_dir):
+        return np.zeros(0, dtype=dtype)
+
+    suffix = f".v{SCHEMA_VERSION}.bin"
+    parts = []
+    for name in sorted(os.listdir(table_dir)):
+        if not name.endswith(suffix):
+            continue
+        day = name[:-len(suffix)]
+        if (start_day and day < start_day) or (end_day and day > end_day):
+            continue
+
+        path = os.path.join(table_dir, name)
+        # недописанный хвост (падение посреди записи) отбрасываем
+        count = os.path.getsize(path) // dtype.itemsize
+        parts.append(np.fromfile(path, dtype=dtype, count=count))
+
+    if not parts:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(parts)
+
+
+# ——————————————————————————————————————————
+# Конвертер JSONL логов
+# ——————————————————————————————————————————
+
+JSONL_FILES = {
+    'impulses': 'impulses.jsonl',
+    'cex': 'cex_comparison.jsonl',
+}
+
+# поля, по которым запись из JSONL узнается в партиции (логгер пишет в оба места один ts)
+ROW_KEYS = {
+    'impulses': ['ts', 'token'],
+    'cex': ['ts', 'token', 'exchange', 'interval'],
+}
+
+MANIFEST = 'converted.json'
+
+
+def _manifest_path(logs_dir):
+    return os.path.join(logs_dir, 'columnar', MANIFEST)
+
+
+def read_manifest(logs_dir):
+    """{файл JSONL: {'head', 'offset'}} - до какого байта файл уже перенесен в партиции"""
+    try:
+        with open(_manifest_path(logs_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_manifest(logs_dir, manifest):
+    path = _manifest_path(logs_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _file_head(path):
+    """Отпечаток файла - хеш первой строки: после clear_old_logs файл новый, смещение не годится"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.readline()).hexdigest()
+
+
+def _read_jsonl(path, offset=0):
+    """Полные строки после offset -> (записи, смещение за последней полной строкой).
+    Недописанную последнюю строку оставляем до следующего раза"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    records = [json.loads(line) for line in data[:end].decode('utf-8').split('\n') if line.strip()]
+    return records, offset + end
+
+
+_DAY_STARTS = {}
+
+
+def _day_start(ts):
+    """Начало суток (локальное время) для ts; строки идут подряд днями - кешируем по 15-минуткам"""
+    bucket = ts // 900
+    start = _DAY_STARTS.get(bucket)
+    if start is None:
+        start = datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        if len(_DAY_STARTS) > 4096:
+            _DAY_STARTS.clear()
+        _DAY_STARTS[bucket] = start
+    return start
+
+
+def _impulse_times(records, anchor):
+    """ts каждой записи. В строках до появления поля ts есть только время суток: день берем
+    от следующей записи (последняя - anchor, время изменения файла), идя от конца файла,
+    и отступаем на день, если время суток стало больше следующего (переход через полночь)"""
+    times = [0.0] * len(records)
+    next_ts = anchor
+    for i in range(len(records) - 1, -1, -1):
+        data = records[i]
+        if 'ts' in data:
+            times[i] = next_ts = data['ts']
+            continue
+        h, m, s = (int(x) for x in data.get('time', '0:0:0').split(':'))
+        seconds = h * 3600 + m * 60 + s
+        ts = _day_start(next_ts) + seconds
+        if ts > next_ts:
+            ts = _day_start(_day_start(next_ts) - 1) + seconds
+        times[i] = next_ts = ts
+    return times
+
+
+def _cex_times(records, anchor):
+    """ts каждой записи. В строках до появления поля ts времени нет совсем: день следующей
+    записи (последняя - anchor) + номер строки в мкс, чтобы разные замеры не склеивались"""
+    times = [0.0] * len(records)
+    next_ts = anchor
+    for i in range(len(records) - 1, -1, -1):
+        data = records[i]
+        if 'ts' in data:
+            times[i] = next_ts = data['ts']
+        else:
+            times[i] = _day_start(next_ts) + i * 1e-6
+    return times
+
+
+def impulse_records_to_rows(records, anchor):
+    """Записи impulses.jsonl -> строки IMPULSE_DTYPE"""
+    rows = []
+    for ts, data in zip(_impulse_times(records, anchor), records):
+        rows.append((
+            ts,
+            data['token'].encode(),
+            data['base_price'],
+            data['impulse_price'],
+            data['change_percent'] / 100,
+            data.get('window_sec', np.nan),
+        ))
+    return np.array(rows, dtype=IMPULSE_DTYPE)
+
+
+def cex_records_to_rows(records, anchor):
+    """Записи cex_comparison.jsonl -> строки CEX_DTYPE (строка на биржу)"""
+    rows = []
+    for ts, data in zip(_cex_times(records, anchor), records):
+        interval = int(''.join(ch for ch in data['time_after_impulse'] if ch.isdigit()) or 0)
+        for exchange, ex_data in data['cex_prices'].items():
+            price = ex_data['price']
+            change_from_base = ex_data['vs_base_percent'] / 100
+            # базовой цены в JSONL нет - восстанавливаем из процента
+            base_price = price / (1 + change_from_base) if change_from_base > -1 else np.nan
+            rows.append((
+                ts, data['token'].encode(), exchange.encode(), interval,
+                base_price, data['dex_price'], price,
+                change_from_base, ex_data['vs_impulse_percent'] / 100,
+            ))
+    return np.array(rows, dtype=CEX_DTYPE)
+
+
+RECORDS_TO_ROWS = {
+    'impulses': impulse_records_to_rows,
+    'cex': cex_records_to_rows,
+}
+
+
+def _split_by_partition(table, rows):
+    """(партиция, маска строк). Имя партиции считаем на 15-минутку, а не на строку:
+    полночь любого часового пояса попадает на границу 15 минут"""
+    buckets = (rows['ts'] // 900).astype(np.int64)
+    unique, inverse = np.unique(buckets, return_inverse=True)
+    names = np.array([partition_name(table, bucket * 900) for bucket in unique])
+    days = names[inverse]
+    for name in np.unique(names):
+        yield name, days == name
+
+
+def _drop_existing(logs_dir, table, rows):
+    """Убирает строки, которые уже лежат в партициях (их записал логгер или прошлая конвертация)"""
+    if not len(rows):
+        return rows
+    dtype = TABLES[table]
+    keys = ROW_KEYS[table]
+    keep = np.ones(len(rows), dtype=bool)
+    for name, mask in _split_by_partition(table, rows):
+        path = os.path.join(logs_dir, name)
+        if not os.path.exists(path):
+            continue
+        existing = np.fromfile(path, dtype=dtype, count=os.path.getsize(path) // dtype.itemsize)
+        seen = set(existing[keys].tolist())
+        keep[mask] = [key not in seen for key in rows[mask][keys].tolist()]
+    return rows[keep]
+
+
+def _pending(logs_dir, table, manifest):
+    """Строки JSONL таблицы после уже перенесенного смещения, которых нет в партициях
+    -> (строки, прочитано строк, запись манифеста или None)"""
+    filename = JSONL_FILES[table]
+    path = os.path.join(logs_dir, filename)
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=TABLES[table]), 0, None
+
+    head = _file_head(path)
+    done = manifest.get(filename)
+    offset = 0
+    if done and done['head'] == head and done['offset'] <= os.path.getsize(path):
+        offset = done['offset']
+
+    records, end = _read_jsonl(path, offset)
+    rows = RECORDS_TO_ROWS[table](records, os.path.getmtime(path))
+    return _drop_existing(logs_dir, table, rows), len(rows), {'head': head, 'offset': end}
+
+
+def pending_rows(logs_dir, table):
+    """Строки JSONL, которых еще нет в партициях (логи до колоночного формата или columnar_logs=False)"""
+    return _pending(logs_dir, table, read_manifest(logs_dir))[0]
+
+
+def _append_partitions(logs_dir, table, rows):
+    for name, mask in _split_by_partition(table, rows):
+        path = os.path.join(logs_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open_partition(path) as f:
+            f.write(rows[mask].tobytes())
+
+
+def convert_jsonl(logs_dir):
+    """Дописывает в партиции строки impulses.jsonl и cex_comparison.jsonl, которых там еще нет.
+    Докуда файлы перенесены - в columnar/converted.json: повторный запуск читает только новый хвост.
+    Запускать при остановленном боте (те же партиции дописывает логгер)"""
+    manifest = read_manifest(logs_dir)
+    written, skipped = {}, {}
+    for table, filename in JSONL_FILES.items():
+        rows, read, done = _pending(logs_dir, table, manifest)
+        _append_partitions(logs_dir, table, rows)
+        written[table], skipped[table] = len(rows), read - len(rows)
+        if done is not None:
+            manifest[filename] = done
+    _save_manifest(logs_dir, manifest)
+
+    print(f"✅ Сконвертировано: импульсов {written['impulses']}, CEX строк {written['cex']}")
+    if skipped['impulses'] or skipped['cex']:
+        print(f"⏭️  Уже в партициях: импульсов {skipped['impulses']}, CEX строк {skipped['cex']}")
+    return written['impulses'], written['cex']
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'convert':
+        print(__doc__)
+        sys.exit(1)
+
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+    convert_jsonl(sys.argv[2] if len(sys.argv) > 2 else default_dir)
@@ -17,8 +17,87 @@ LBANK_SYMBOL_MAPPING = {
 
 SETTINGS = {
     'scan_frequency': 10, # повторная попытка ловли импульса тайминг
+    'scan_overrun_policy': 'skip', # цикл дольше периода: skip - ждем следующий тик сетки, catch_up - догоняем пропущенные, overlap - запускаем параллельно
+    'scan_overrun_cap': 1, # catch_up: сколько пропущенных тиков догоняем; overlap: сколько циклов одновременно
+    'scan_start_jitter': 0, # до скольких сек сдвигать старт запросов каждой прокси от тика цикла (свой случайный сдвиг на прокси), чтобы прокси не били в API синхронно
+    'token_universe': None, # файл со списком токенов (.json или .sqlite), изменения применяются между циклами без перезапуска (None - TOKENS из config)
+    'token_universe_check': 5, # как часто проверяем, изменился ли файл со списком токенов (сек)
+    'shards': 1, # процессов сканирования DEX: TOKENS делится между ними, CEX мониторинг и логи остаются в главном процессе (1 - без шардов)
     'impulse_threshold': 0.000001, # при каком проценте импульс ловим
-    'cex_check_intervals': [5, 10, 30, 60] # тайминг по которому на сех бирже смотрим после импульса
+    'cex_check_intervals': [5, 10, 30, 60], # тайминг по которому на сех бирже смотрим после импульса
+    'detector_backend': 'classic', # 'classic' - deque на токен, 'vector' - NumPy буферы для тысяч токенов, 'windows' - окна по времени
+    'impulse_windows': [10, 60, 300], # окна детектора 'windows' (сек), движение от мин/макс окна
+    'dex_max_concurrency': 10, # сколько запросов к DexScreener одновременно
+    'dex_token_timeout': 8, # дедлайн на один токен (сек)
+    'dex_cycle_timeout': 9, # дедлайн на весь цикл сканирования, дальше берем что успело (сек)
+    'dex_batch_mode': True, # один запрос к DexScreener на пачку адресов вместо запроса на токен
+    'dex_batch_size': 30, # адресов в одном запросе (лимит DexScreener - 30)
+    'dex_sources': ['dexscreener'], # источники цен DEX: dexscreener, jupiter. Первый - основной, второй - для хеджа
+    'dex_hedge': True, # основной источник не ответил за p95 своей задержки - дублируем запрос (другая прокси или второй источник), берем первый ответ
+    'dex_hedge_percentile': 0.95, # по какому перцентилю задержки основного источника хеджируем
+    'dex_hedge_initial_delay': 1.0, # задержка хеджа, пока замеров мало (сек)
+    'dex_hedge_min_samples': 20, # сколько ответов нужно, чтобы считать перцентиль
+    'dex_hedge_min_delay': 0.2, # раньше этого не хеджируем, даже если источник очень быстрый (сек)
+    'dex_hedge_budget': 0.05, # не больше этой доли запросов дублируем (при общей деградации хеджи не удваивают нагрузку)
+    'cex_snapshot_mode': True, # один запрос всех тикеров на биржу за тик вместо запроса на символ
+    'cex_snapshot_ttl': 1.0, # сколько снимок тикеров считается свежим (сек)
+    'cex_scheduler_tick': 0.1, # шаг колеса таймеров замеров CEX: замеры одного тика идут одним раундом (сек)
+    'cex_scheduler_slots': 1024, # слотов в колесе (оборот = tick * slots, ~100 сек)
+    'cex_stream_mode': True, # после импульса берем цены CEX из WebSocket тикеров, REST - запасной вариант
+    'api_urls': { # базовые адреса REST API (для нагрузочных тестов - локальный mock_exchange.py)
+        'dexscreener': 'https://api.dexscreener.com',
+        'gateio': 'https://api.gateio.ws',
+        'lbank': 'https://api.lbank.info',
+        'jupiter': 'https://lite-api.jup.ag',
+    },
+    'cex_ws_urls': {
+        'gateio_spot': 'wss://api.gateio.ws/ws/v4/',
+        'gateio_futures': 'wss://fx-ws.gateio.ws/v4/ws/usdt',
+        'lbank_spot': 'wss://www.lbkex.net/ws/V2/',
+    },
+    'cex_ws_heartbeat': 15, # ping WebSocket (сек)
+    'cex_ws_max_backoff': 30, # максимальная пауза между переподключениями (сек)
+    'cex_ws_max_age': 10, # цена из WebSocket старше этого считается устаревшей (сек)
+    'log_queue_size': 10000, # записей в очереди фонового писателя логов
+    'log_batch_size': 500, # записей за одну пачку
+    'log_flush_interval': 1.0, # как часто сбрасываем файлы на диск (сек)
+    'log_fsync': False, # fsync после каждого сброса (надежнее, но медленнее)
+    'columnar_logs': True, # дублируем импульсы и CEX замеры в колоночные партиции logs/columnar (нужен numpy)
+    'tick_store': None, # SQLite база цен (DEX каждого цикла + загруженные снимки CEX) для ретроспективы и replay, например 'logs/ticks.sqlite' (None - выключено)
+    'tick_store_queue_size': 10000, # пачек цен в очереди фонового писателя базы тиков
+    'tick_store_batch_size': 20000, # тиков в одной транзакции
+    'tick_store_flush_interval': 0.5, # как долго писатель ждет новые тики (сек)
+    'price_board': None, # файл табло текущих цен DEX и CEX для других процессов (mmap, читать через price_board_reader.py), например '/dev/shm/impulse_bot_prices' (None - выключено)
+    'price_board_capacity': 16384, # строк (токенов) в табло цен
+    'record_ticks': False, # писать цены каждого цикла (DEX + CEX снимок) в logs/ticks.jsonl для replay.py
+    'proxy_ewma_alpha': 0.3, # вес нового замера в EWMA задержки прокси
+    'proxy_default_latency': 1.0, # задержка новой прокси без замеров (сек)
+    'proxy_max_failures': 3, # ошибок подряд до карантина
+    'proxy_cooldown_base': 10, # первый карантин (сек), дальше удваивается
+    'proxy_cooldown_max': 600, # максимальный карантин (сек)
+    'proxy_block_window': 300, # за какой период считаем недавние 403/429 (сек)
+    'rate_limits': { # стартовая скорость (запр/сек), всплеск и пределы AIMD по хостам
+        'api.dexscreener.com': {'rate': 5, 'burst': 10, 'max_rate': 10},
+        'api.gateio.ws': {'rate': 15, 'burst': 20, 'max_rate': 30},
+        'api.lbank.info': {'rate': 10, 'burst': 10, 'max_rate': 20},
+        'lite-api.jup.ag': {'rate': 1, 'burst': 5, 'max_rate': 2},
+        'default': {'rate': 5, 'burst': 5},
+    },
+    'rate_limit_per_proxy': False, # отдельный лимит на каждую прокси (у каждой свой IP)
+    'rate_limit_increase': 0.1, # рост скорости на успехах (запр/сек за секунду)
+    'rate_limit_decrease': 0.5, # множитель скорости на 429
+    'rate_limit_default_wait': 5, # пауза после 429 без Retry-After (сек)
+    'rate_limit_max_wait': 60, # больше этого не ждем, даже если просят (сек)
+    'symbol_index_ttl': 3600, # как часто перезагружаем списки символов бирж (сек)
+    'symbol_index_retry': 60, # пауза перед повтором после неудачной загрузки списка (сек)
+    'metrics_port': None, # порт HTTP эндпоинта /metrics в формате Prometheus (None - выключен)
+    'metrics_host': '127.0.0.1', # адрес эндпоинта метрик
+    'console_mode': 'verbose', # verbose - все строки как раньше, compact - сводка цикла + импульсы, silent - без вывода
+    'request_log_size': 1000, # сколько последних запросов держим в памяти для отладки
+    'http_pool_limit': 100, # всего соединений в общем пуле
+    'http_pool_limit_per_host': 20, # соединений на один хост (dexscreener, gateio, lbank)
+    'http_dns_cache_ttl': 300, # сколько держим DNS в кэше (сек)
+    'http_keepalive_timeout': 60, # сколько держим простаивающее соединение открытым (сек)
 }
 
 CEX_EXCHANGES = ['gateio_spot', 'gateio_futures']
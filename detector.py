@@ -1,3 +1,4 @@
+import clock
 from datetime import datetime
 from collections import deque
 
@@ -8,7 +9,7 @@ class ImpulseDetector:
         self.base_prices = {}  
     
     def update_price(self, token, new_price):
-        now = datetime.now()
+        now = clock.now()
         
         if token not in self.price_history:
             self.price_history[token] = deque(maxlen=10)
@@ -29,6 +30,16 @@ class ImpulseDetector:
                     return price_change, oldest_price, new_price
         
         return None, None, None
+
+    def add_token(self, token):
+        """Буфер под новый токен заранее, чтобы первый цикл его не выделял"""
+        if token not in self.price_history:
+            self.price_history[token] = deque(maxlen=10)
+
+    def remove_token(self, token):
+        """Токен убрали из списка - освобождаем историю"""
+        self.price_history.pop(token, None)
+        self.base_prices.pop(token, None)
     
     def get_base_price(self, token):
         return self.base_prices.get(token)
@@ -36,4 +47,104 @@ class ImpulseDetector:
     def get_recent_prices(self, token):
         if token in self.price_history:
             return list(self.price_history[token])
-        return []
\ No newline at end of file
+        return []
+
+class RollingExtrema:
+    """Минимум и максимум цены за последние window секунд.
+    Монотонные очереди: каждое обновление O(1) амортизированно"""
+
+    def __init__(self, window):
+        self.window = window
+        self.min_queue = deque()  # (ts, price), цены возрастают
+        self.max_queue = deque()  # (ts, price), цены убывают
+
+    def update(self, ts, price):
+        min_queue, max_queue = self.min_queue, self.max_queue
+
+        while min_queue and min_queue[-1][1] >= price:
+            min_queue.pop()
+        min_queue.append((ts, price))
+
+        while max_queue and max_queue[-1][1] <= price:
+            max_queue.pop()
+        max_queue.append((ts, price))
+
+        expired = ts - self.window
+        while min_queue[0][0] < expired:
+            min_queue.popleft()
+        while max_queue[0][0] < expired:
+            max_queue.popleft()
+
+        return min_queue[0][1], max_queue[0][1]
+
+
+class MultiWindowImpulseDetector:
+    """Импульс по нескольким окнам реального времени (например 10 сек, 1 мин, 5 мин).
+    Движение меряем от минимума/максимума окна, а не от самой старой цены,
+    поэтому окно не "плывет" от неудачных запросов и медленных циклов"""
+
+    def __init__(self, threshold=0.15, windows=(10, 60, 300)):
+        self.threshold = threshold
+        # от короткого к длинному: срабатывает самое короткое окно
+        self.windows = sorted(windows)
+        self.extrema = {}
+        self.price_history = {}
+        self.base_prices = {}
+        self.impulse_windows = {}
+
+    def update_price(self, token, new_price, ts=None):
+        if ts is None:
+            ts = clock.time()
+
+        if token not in self.extrema:
+            self.add_token(token)
+
+        self.price_history[token].append({
+            'timestamp': datetime.fromtimestamp(ts),
+            'price': new_price
+        })
+
+        fired = None
+        for extrema in self.extrema[token]:
+            low, high = extrema.update(ts, new_price)
+            if fired is not None:
+                # остальные окна все равно обновляем, чтобы не терять точки
+                continue
+
+            rise = (new_price - low) / low if low > 0 else 0
+            fall = (new_price - high) / high if high > 0 else 0
+            change, base = (rise, low) if rise >= -fall else (fall, high)
+
+            if abs(change) >= self.threshold:
+                fired = (change, base, extrema.window)
+
+        if fired is None:
+            return None, None, None
+
+        change, base, window = fired
+        self.base_prices[token] = base
+        self.impulse_windows[token] = window
+        return change, base, new_price
+
+    def add_token(self, token):
+        if token not in self.extrema:
+            self.extrema[token] = [RollingExtrema(window) for window in self.windows]
+            self.price_history[token] = deque(maxlen=10)
+
+    def remove_token(self, token):
+        self.extrema.pop(token, None)
+        self.price_history.pop(token, None)
+        self.base_prices.pop(token, None)
+        self.impulse_windows.pop(token, None)
+
+    def get_base_price(self, token):
+        return self.base_prices.get(token)
+
+    def get_impulse_window(self, token):
+        """Окно (сек), на котором сработал последний импульс токена"""
+        return self.impulse_windows.get(token)
+
+    def get_recent_prices(self, token):
+        if token in self.price_history:
+            return list(self.price_history[token])
+        return []
@@ -1,215 +1,266 @@
-import aiohttp
 import asyncio
 import time
-import random
+from functools import partial
 
-from config import TOKENS, PROXIES, USE_PROXIES
+import metrics
+from config import TOKENS, SETTINGS
 from logger import file_logger  # << основной логгер (импульсы, cex)
+from price_sources import create_sources, HedgedFetcher
 from requiest_logger import logger as request_logger  # << лог запросов
 
+
 class DexMonitor:
-    def __init__(self, impulse_detector, cex_monitor):
+    def __init__(self, impulse_detector, cex_monitor, http_client, proxy_pool, price_board=None):
         self.impulse_detector = impulse_detector
         self.cex_monitor = cex_monitor
+        self.http_client = http_client
+        self.proxy_pool = proxy_pool
+        self.price_board = price_board  # табло цен для других процессов (price_board.py)
 
         self.current_prices = {}
         self.last_update = {}
         self.request_count = 0
-
-        self.proxy_index = 0
-        self.failed_proxies = set()
-        self.working_proxies = set()
-
-    def get_proxy(self):
-        """Выдаёт прокси по кругу + учитывает нерабочие"""
-        if not USE_PROXIES or not PROXIES:
+        self.last_cycle = {}
+        # фоновые задачи (трекинг CEX, запись снимка тикеров): loop держит на задачи только слабые ссылки
+        self._background = set()
+
+        # источники цен: первый основной, остальные для хеджа
+        self.sources = create_sources(http_client, proxy_pool)
+        self.price_fetcher = HedgedFetcher(self.sources)
+        # пачка не больше, чем примет каждый источник
+        self.batch_size = min(source.batch_size for source in self.sources)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            file_logger.print_status(f"❌ Ошибка фоновой задачи: {task.exception()}")
+
+    def update_tokens(self, changes):
+        """TOKENS уже изменен: освобождаем буферы удаленных токенов и выделяем под новые"""
+        for symbol in changes.removed:
+            self.impulse_detector.remove_token(symbol)
+            self.current_prices.pop(symbol, None)
+            self.last_update.pop(symbol, None)
+        for symbol in changes.added:
+            self.impulse_detector.add_token(symbol)
+
+    async def fetch_prices(self, session, chunk):
+        """Пачка токенов [(symbol, address), ...] -> {symbol: price}.
+        Основной источник + хедж при медленном ответе (price_sources.HedgedFetcher)"""
+        prices = await self.price_fetcher.fetch(session, chunk)
+        if prices is None:
             return None
 
-        if len(self.failed_proxies) >= len(PROXIES):
-            self.failed_proxies.clear()
-            file_logger.print_status("🔄 Сброс черного списка прокси")
-
-        proxy = PROXIES[self.proxy_index]
-        self.proxy_index = (self.proxy_index + 1) % len(PROXIES)
-        return proxy
-
-    async def fetch_price_dexscreener(self, session, token_address, symbol):
-        start_time = time.time()
-        random_param = random.random()
-
-        url = f"https://api.dexscreener.com/latest/dex/tokens/{token_address}?r={random_param}"
-
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "application/json",
-            "Accept-Language": "en-US,en;q=0.9",
-        }
-
-        proxy_url = self.get_proxy() if USE_PROXIES else None
-
-        try:
-            timeout = aiohttp.ClientTimeout(total=20)
-
-            async with session.get(
-                url,
-                headers=headers,
-                timeout=timeout,
-                proxy=proxy_url,
-                ssl=False
-            ) as response:
-
-                response_time = time.time() - start_time
-                status_code = int(response.status)
-
-                # лог запроса (успех)
-                request_logger.log_request(
-                    url=url,
-                    proxy=proxy_url,
-                    status=status_code,
-                    response_time=response_time
-                )
-
-                if status_code == 200:
-                    data = await response.json()
-
-                    if data.get("pairs"):
-                        price_str = data["pairs"][0].get("priceUsd")
-                        if price_str:
-                            price = float(price_str)
-                            file_logger.print_status(f"✅ {symbol}: ${price:.8f}")
-                            return price
-
+        if file_logger.verbose:
+            for symbol, _ in chunk:
+                if symbol in prices:
+                    file_logger.print_status(f"✅ {symbol}: ${prices[symbol]:.8f}")
+                else:
                     file_logger.print_status(f"❌ Нет данных о цене для {symbol}")
-                    return None
-
-                # Ошибки (403, 429 и т.п.)
-                if status_code == 403:
-                    file_logger.print_status(f"❌ 403 Forbidden - IP не в белом списке")
-
-                if status_code == 429:
-                    file_logger.print_status(f"⏳ Rate Limit — задержка")
-
-                return None
-
-        except asyncio.TimeoutError:
-            response_time = time.time() - start_time
 
-            request_logger.log_request(
-                url=url,
-                proxy=proxy_url,
-                status="TIMEOUT",
-                response_time=response_time,
-                error="Таймаут"
-            )
-
-            file_logger.print_status(f"⏰ Таймаут для {symbol}")
-            return None
-
-        except aiohttp.ClientProxyConnectionError:
-            response_time = time.time() - start_time
+        return prices
+
+    @staticmethod
+    def _chunk_label(chunk):
+        if len(chunk) == 1:
+            return chunk[0][0]
+        return f"{chunk[0][0]}..{chunk[-1][0]} ({len(chunk)})"
+
+    def _build_jobs(self, session):
+        """Задачи цикла: по токену или по пачке адресов (dex_batch_mode)"""
+        items = list(TOKENS.items())
+        size = min(SETTINGS['dex_batch_size'], self.batch_size) if SETTINGS['dex_batch_mode'] else 1
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+
+        return [
+            (self._chunk_label(chunk), partial(self.fetch_prices, session, chunk))
+            for chunk in chunks
+        ]
+
+    async def _run_scan_job(self, semaphore, key, job):
+        """Один запрос под семафором + дедлайн на токен. Возвращает (результат, время)"""
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(job(), timeout=SETTINGS['dex_token_timeout'])
+            except asyncio.TimeoutError:
+                if file_logger.verbose:
+                    file_logger.print_status(f"⏰ Общий таймаут для {key}")
+                result = None
+            except Exception as e:
+                if file_logger.verbose:
+                    file_logger.print_status(f"❌ Ошибка задачи для {key}: {e}")
+                result = None
+            return result, time.monotonic() - started
+
+    async def scan(self, jobs):
+        """Запускает все задачи цикла сразу (с ограничением параллельности).
+        По дедлайну цикла недоделанные задачи отменяются, возвращаем что успело"""
+        cycle_start = time.monotonic()
+        semaphore = asyncio.Semaphore(SETTINGS['dex_max_concurrency'])
+
+        tasks = {
+            asyncio.create_task(self._run_scan_job(semaphore, key, job)): key
+            for key, job in jobs
+        }
 
-            request_logger.log_request(
-                url=url,
-                proxy=proxy_url,
-                status="PROXY_ERROR",
-                response_time=response_time,
-                error="Ошибка подключения к прокси"
-            )
+        results = {}
+        slowest_key, slowest_time = None, 0.0
+        pending = set()
+
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=SETTINGS['dex_cycle_timeout'])
+
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                file_logger.print_status(f"⏰ Дедлайн цикла: не успели {len(pending)} из {len(tasks)}")
+
+            for task in done:
+                key = tasks[task]
+                result, elapsed = task.result()
+                results[key] = result
+                if elapsed > slowest_time:
+                    slowest_key, slowest_time = key, elapsed
+
+        self.last_cycle = {
+            'wall_time': time.monotonic() - cycle_start,
+            'slowest': slowest_key,
+            'slowest_time': slowest_time,
+            'completed': len(tasks) - len(pending),
+            'timed_out': len(pending),
+        }
+        return results
+
+    def _detect_impulses(self, prices):
+        """{symbol: price} -> {symbol: (change, base_price, impulse_price)} только для импульсов"""
+        if hasattr(self.impulse_detector, 'update_prices'):
+            symbols = list(prices)
+            hits = self.impulse_detector.update_prices(symbols, [prices[s] for s in symbols])
+            return {symbol: (change, base, price) for symbol, change, base, price in hits}
+
+        impulses = {}
+        for symbol, price in prices.items():
+            impulse, base_price, impulse_price = self.impulse_detector.update_price(symbol, price)
+            if impulse:
+                impulses[symbol] = (impulse, base_price, impulse_price)
+        return impulses
+
+    def _publish_prices(self, prices, cex=True):
+        """Цены цикла наружу: табло цен и запись тиков (если включены)"""
+        if self.price_board is not None:
+            self.price_board.publish('dex', prices)
+        if SETTINGS['record_ticks'] or SETTINGS['tick_store']:
+            self._record_ticks(prices, cex)
+
+    def _record_ticks(self, prices, cex=True):
+        """Запись цен: DEX цикла + (только record_ticks) CEX из снимка тикеров каждый цикл.
+        Для базы тиков снимки каждый цикл не качаем - она получает снимки, загруженные для трекинга"""
+        file_logger.log_ticks('dex', prices)
+        if cex and SETTINGS['record_ticks'] and SETTINGS['cex_snapshot_mode']:
+            self._spawn(self.cex_monitor.record_ticks())
+
+    def _on_impulse(self, symbol, impulse, price, base_price, impulse_price, window=None):
+        """Лог импульса и запуск трекинга CEX (общий для боевого цикла, replay и шардов)"""
+        # логируем импульс (в процентах тоже) + каким окном пойман
+        if window is None and hasattr(self.impulse_detector, 'get_impulse_window'):
+            window = self.impulse_detector.get_impulse_window(symbol)
+        file_logger.log_impulse(symbol, impulse, price, base_price, impulse_price, window)
+        metrics.IMPULSES.inc(symbol)
+
+        if file_logger.verbose:
+            print(f"⚡ IMPULSE {symbol}: ${price:.8f} ({impulse:+.2%})")
+            print(f"   База: ${base_price:.8f} → Импульс: ${impulse_price:.8f}")
+
+        # запускаем CEX мониторинг
+        return self._spawn(
+            self.cex_monitor.track_cex_after_impulse(symbol, base_price, impulse_price)
+        )
 
-            file_logger.print_status(f"🔌 Ошибка подключения к прокси для {symbol}")
+    async def monitor_all_tokens(self):
+        verbose = file_logger.verbose
+        if verbose:
+            print(f"\n🎯 ЗАПУСК СКАНИРОВАНИЯ {len(TOKENS)} ТОКЕНОВ")
+            print("=" * 80)
 
-            if proxy_url:
-                self.failed_proxies.add(proxy_url)
+        session = self.http_client.session
 
-            return None
+        # все запросы планируем сразу, ждем не дольше дедлайна цикла
+        results = await self.scan(self._build_jobs(session))
 
-        except Exception as e:
-            response_time = time.time() - start_time
+        merged = {}
+        for chunk_prices in results.values():
+            if chunk_prices:
+                merged.update(chunk_prices)
+        results = merged
 
-            request_logger.log_request(
-                url=url,
-                proxy=proxy_url,
-                status="ERROR",
-                response_time=response_time,
-                error=str(e)
-            )
-
-            file_logger.print_status(f"❌ Неизвестная ошибка для {symbol}: {e}")
-            return None
-
-    async def monitor_all_tokens(self):
-        print(f"\n🎯 ЗАПУСК СКАНИРОВАНИЯ {len(TOKENS)} ТОКЕНОВ")
-        print("=" * 80)
-
-        connector = aiohttp.TCPConnector(limit=10, ssl=False)
-
-        async with aiohttp.ClientSession(connector=connector) as session:
-            tasks = []
-
-            # создаём задачи
-            for symbol, address in TOKENS.items():
-                tasks.append((symbol, self.fetch_price_dexscreener(session, address, symbol)))
-
-            # собираем результаты
-            results = []
-            for symbol, task in tasks:
-                try:
-                    result = await asyncio.wait_for(task, timeout=25.0)
-                    results.append(result)
-                except asyncio.TimeoutError:
-                    file_logger.print_status(f"⏰ Общий таймаут для {symbol}")
-                    results.append(None)
-                except Exception as e:
-                    file_logger.print_status(f"❌ Ошибка задачи для {symbol}: {e}")
-                    results.append(None)
-
-            impulses_detected = 0
-            successful_tokens = 0
+        impulses_detected = 0
+        successful_tokens = 0
 
+        if verbose:
             print(f"\n📊 РЕЗУЛЬТАТЫ СКАНИРОВАНИЯ:")
             print("-" * 50)
 
-            for (symbol, address), result in zip(TOKENS.items(), results):
-                if result is None:
-                    print(f"  {symbol}: ❌ Нет данных")
-                    continue
+        # сначала прогоняем все цены цикла через детектор (пачкой, если умеет)
+        prices = {symbol: results[symbol] for symbol in TOKENS if results.get(symbol) is not None}
+        impulses = self._detect_impulses(prices)
 
-                successful_tokens += 1
-                old_price = self.current_prices.get(symbol)
-                self.current_prices[symbol] = result
+        self._publish_prices(prices)
 
-                # проверка на импульс
-                impulse, base_price, impulse_price = self.impulse_detector.update_price(symbol, result)
+        for symbol in TOKENS:
+            result = prices.get(symbol)
+            if result is None:
+                if verbose:
+                    print(f"  {symbol}: ❌ Нет данных")
+                continue
 
-                if impulse:
-                    impulses_detected += 1
+            successful_tokens += 1
+            old_price = self.current_prices.get(symbol)
+            self.current_prices[symbol] = result
 
-                    # логируем импульс (в процентах тоже)
-                    file_logger.log_impulse(symbol, impulse, result, base_price, impulse_price)
+            impulse, base_price, impulse_price = impulses.get(symbol, (None, None, None))
 
-                    print(f"⚡ IMPULSE {symbol}: ${result:.8f} ({impulse:+.2%})")
-                    print(f"   База: ${base_price:.8f} → Импульс: ${impulse_price:.8f}")
+            if impulse:
+                impulses_detected += 1
+                self._on_impulse(symbol, impulse, result, base_price, impulse_price)
 
-                    # запускаем CEX мониторинг
-                    asyncio.create_task(
-                        self.cex_monitor.track_cex_after_impulse(symbol, base_price, impulse_price)
-                    )
+            elif verbose:
+                # обычное обновление
+                if old_price and old_price > 0:
+                    change = ((result - old_price) / old_price) * 100
+                    arrow = "🔼" if change > 0 else "🔻"
 
-                else:
-                    # обычное обновление
-                    if old_price and old_price > 0:
-                        change = ((result - old_price) / old_price) * 100
-                        arrow = "🔼" if change > 0 else "🔻"
-
-                        if abs(change) >= 0.5:
-                            print(f"  {symbol}: ${result:.8f} ({change:+.2f}% {arrow})")
-                        else:
-                            print(f"  {symbol}: ${result:.8f}")
+                    if abs(change) >= 0.5:
+                        print(f"  {symbol}: ${result:.8f} ({change:+.2f}% {arrow})")
                     else:
                         print(f"  {symbol}: ${result:.8f}")
+                else:
+                    print(f"  {symbol}: ${result:.8f}")
 
+        cycle = self.last_cycle
+        cycle['successful'] = successful_tokens
+        cycle['impulses'] = impulses_detected
+        if verbose:
             print(f"\n📈 ИТОГИ: Успешно {successful_tokens}/{len(TOKENS)} | Импульсы: {impulses_detected}")
-
+            print(
+                f"⏱️  Цикл: {cycle['wall_time']:.2f}s | "
+                f"Самый медленный: {cycle['slowest'] or '-'} ({cycle['slowest_time']:.2f}s) | "
+                f"Не успели: {cycle['timed_out']}"
+            )
             request_logger.print_summary()
+        elif file_logger.console:
+            # compact: одна строка на цикл вместо строки на токен
+            file_logger.print_status(
+                f"📈 {successful_tokens}/{len(TOKENS)} | Импульсы: {impulses_detected} | "
+                f"Цикл: {cycle['wall_time']:.2f}s | Не успели: {cycle['timed_out']} | "
+                f"Запросы: ✅{request_logger.success_count} ❌{request_logger.fail_count}"
+            )
 
-            return impulses_detected
+        return impulses_detected
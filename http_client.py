@@ -0,0 +1,38 @@
+import aiohttp
+
+import metrics
+from config import SETTINGS
+from rate_limiter import RateLimiter
+
+
+class HttpClient:
+    """Общий HTTP клиент на весь процесс.
+    Держит keep-alive пулы соединений по хостам и кэш DNS, чтобы после импульса
+    не тратить время на новые TCP/TLS рукопожатия"""
+
+    def __init__(self):
+        # сессию создаем лениво: в __init__ event loop может быть еще не запущен
+        self._session = None
+        self.rate_limiter = RateLimiter()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=SETTINGS['http_pool_limit'],
+                limit_per_host=SETTINGS['http_pool_limit_per_host'],
+                use_dns_cache=True,
+                ttl_dns_cache=SETTINGS['http_dns_cache_ttl'],
+                keepalive_timeout=SETTINGS['http_keepalive_timeout'],
+                ssl=False
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[metrics.trace_config()]
+            )
+        return self._session
+
+    async def close(self):
+        """Закрываем пул соединений (вызывается из shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -1,38 +1,217 @@
 # logger.py (упрощенная версия)
 import os
 import json
-from datetime import datetime
+import queue
+import threading
+import time
+
+import clock
+from config import SETTINGS
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 
+_STOP = object()
+_CLOSE_FILES = object()
+
+
+class LogWriter(threading.Thread):
+    """Фоновый писатель JSONL: записи копятся в очереди и пишутся пачками,
+    файлы держим открытыми. Event loop на диск не ждет.
+    block=False (боевой цикл): при полной очереди запись теряется, а не держит цикл.
+    block=True (replay, офлайн прогоны): ждем места в очереди - записи не теряются"""
+
+    def __init__(self, logs_dir, block=False):
+        super().__init__(name="log-writer", daemon=True)
+        self.logs_dir = logs_dir
+        self.block = block
+        self.queue = queue.Queue(maxsize=SETTINGS['log_queue_size'])
+        self.files = {}
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def put(self, filename, data):
+        """Без block из event loop не ждем: при полной очереди запись теряется (счетчик dropped и метрика)"""
+        if self.block:
+            self.queue.put((filename, data))
+            return
+        try:
+            self.queue.put_nowait((filename, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def close_files(self):
+        """Дожидаемся записи очереди и закрываем файлы (например, перед удалением)"""
+        self.queue.put(_CLOSE_FILES)
+        self.queue.join()
+
+    def stop(self):
+        """Дописываем все, что в очереди, и останавливаем поток"""
+        self.queue.put(_STOP)
+        self.join()
+
+    def run(self):
+        last_flush = time.monotonic()
+        batch_size = SETTINGS['log_batch_size']
+        flush_interval = SETTINGS['log_flush_interval']
+
+        while True:
+            try:
+                items = [self.queue.get(timeout=flush_interval)]
+            except queue.Empty:
+                items = []
+
+            while items and len(items) < batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for item in items:
+                if item is _STOP:
+                    stop = True
+                elif item is _CLOSE_FILES:
+                    self._flush()
+                    self._close_files()
+                else:
+                    self._write(*item)
+
+            if items:
+                self.batches += 1
+
+            if stop or time.monotonic() - last_flush >= flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+
+            for _ in items:
+                self.queue.task_done()
+
+            if stop:
+                self._close_files()
+                return
+
+    def _write(self, filename, data):
+        try:
+            f = self.files.get(filename)
+            if f is None:
+                path = os.path.join(self.logs_dir, filename)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # строки - JSONL, байты - колоночные партиции
+                if isinstance(data, bytes):
+                    import columnar
+                    f = columnar.open_partition(path)
+                else:
+                    f = open(path, 'a', encoding='utf-8')
+                self.files[filename] = f
+            f.write(data)
+            self.written += 1
+        except Exception as e:
+            print(f"❌ Ошибка записи в {filename}: {e}")
+
+    def _flush(self):
+        for filename, f in self.files.items():
+            try:
+                f.flush()
+                if SETTINGS['log_fsync']:
+                    os.fsync(f.fileno())
+            except Exception as e:
+                print(f"❌ Ошибка сброса {filename} на диск: {e}")
+
+    def _close_files(self):
+        for f in self.files.values():
+            try:
+                f.close()
+            except Exception:
+                pass
+        self.files = {}
+
+
 class Logger:
-    def __init__(self):
-        os.makedirs(LOGS_DIR, exist_ok=True)
+    def __init__(self, logs_dir=LOGS_DIR):
+        # режим консоли: строки, которые не покажем, даже не форматируем
+        self.set_console_mode(SETTINGS['console_mode'])
+        self.logs_dir = logs_dir
+        os.makedirs(logs_dir, exist_ok=True)
+        self.writer = LogWriter(logs_dir)
+        self.writer.start()
+
+        # колоночные партиции для StatsAnalyzer (нужен numpy)
+        self.columnar = None
+        if SETTINGS['columnar_logs']:
+            import columnar
+            self.columnar = columnar
+
+        # база всех цен (SQLite), пишет свой фоновый поток
+        self.tick_store = None
+        self.set_tick_store(SETTINGS['tick_store'])
+
+    def set_console_mode(self, mode):
+        """verbose - построчный вывод, compact - сводки и импульсы, silent - ничего"""
+        self.verbose = mode == 'verbose'
+        self.console = mode != 'silent'
 
     def _get_path(self, filename):
-        return os.path.join(LOGS_DIR, filename)
+        return os.path.join(self.logs_dir, filename)
+
+    def set_logs_dir(self, logs_dir, block=False):
+        """Писать логи в другую папку (replay пишет отдельно от боевых логов).
+        block=True - при полной очереди ждать, а не терять записи (см. LogWriter).
+        База тиков остается прежней (ее меняет set_tick_store)"""
+        if self.writer.is_alive():
+            self.writer.stop()
+        self.logs_dir = logs_dir
+        os.makedirs(logs_dir, exist_ok=True)
+        self.writer = LogWriter(logs_dir, block)
+        self.writer.start()
+
+    def set_tick_store(self, path):
+        """Другая база тиков или None - не писать (replay не пишет в боевую базу)"""
+        if self.tick_store is not None:
+            self.tick_store.close()
+            self.tick_store = None
+        if path:
+            import tick_store
+            self.tick_store = tick_store.TickStore(path)
 
-    def log_impulse(self, token, price_change, curr_price, base_price, impulse_price):
-        """Упрощенный лог импульса: время, монета, цена до/после, % изменения"""
+    def log_impulse(self, token, price_change, curr_price, base_price, impulse_price, window=None):
+        """Упрощенный лог импульса: время, монета, цена до/после, % изменения
+        (+ окно детектора в секундах, если детектор по окнам)"""
+        ts = clock.time()
         log = {
-            'time': datetime.now().strftime("%H:%M:%S"),
+            'time': clock.now().strftime("%H:%M:%S"),
+            'ts': ts,  # тот же ts, что в партиции: конвертер по нему узнает уже перенесенные строки
             'token': token,
             'base_price': base_price,
             'impulse_price': impulse_price,
             'change_percent': round(price_change * 100, 2)  # Проценты с 2 знаками
         }
+        if window is not None:
+            log['window_sec'] = window
         self._write_to_file('impulses.jsonl', log)
-        self.print_status(f"⚡ ИМПУЛЬС: {token} {price_change:+.2%}")
 
-    def log_cex_data(self, token, base_price, impulse_price, cex_prices, interval):
-        """Упрощенный лог CEX: время после импульса, монета, данные с бирж"""
+        if self.columnar is not None:
+            rows = self.columnar.impulse_rows(ts, token, base_price, impulse_price, price_change, window)
+            self._write_to_file(self.columnar.partition_name('impulses', ts), rows.tobytes())
+        if self.console:
+            window_info = f" (окно {window}сек)" if window is not None else ""
+            self.print_status(f"⚡ ИМПУЛЬС: {token} {price_change:+.2%}{window_info}")
+
+    def log_cex_data(self, token, base_price, impulse_price, cex_prices, interval, lag=None):
+        """Упрощенный лог CEX: время после импульса, монета, данные с бирж
+        (+ на сколько замер опоздал относительно цели, сек)"""
+        ts = clock.time()
         log = {
             'time_after_impulse': f"{interval}сек",
+            'ts': ts,
             'token': token,
             'dex_price': impulse_price,  # Цена на DEX в момент импульса
             'cex_prices': {}
         }
+        if lag is not None:
+            log['lag_sec'] = round(lag, 3)
         
         for exchange, data in cex_prices.items():
             log['cex_prices'][exchange] = {
@@ -42,21 +221,76 @@ class Logger:
             }
 
         self._write_to_file('cex_comparison.jsonl', log)
-        self.print_status(f"📊 CEX данные: {token} через {interval}сек")
+
+        if self.tick_store is not None and cex_prices:
+            for exchange, data in cex_prices.items():
+                self.tick_store.put(exchange, {token: data['price']})
+
+        if self.columnar is not None and cex_prices:
+            rows = self.columnar.cex_rows(ts, token, base_price, impulse_price, cex_prices, interval)
+            self._write_to_file(self.columnar.partition_name('cex', ts), rows.tobytes())
+        if self.verbose:
+            self.print_status(f"📊 CEX данные: {token} через {interval}сек")
+
+    def log_ticks(self, source, prices):
+        """Цены за цикл ({token: price}) от источника (dex или биржа) - запись для replay:
+        в базу тиков и/или в ticks.jsonl (record_ticks)"""
+        if not prices:
+            return
+        if self.tick_store is not None:
+            self.tick_store.put(source, prices)
+        if SETTINGS['record_ticks']:
+            self._write_to_file('ticks.jsonl', {'ts': clock.time(), 'source': source, 'prices': prices})
 
     def _write_to_file(self, filename, data):
+        if isinstance(data, bytes):
+            line = data
+        else:
+            line = json.dumps(data, ensure_ascii=False) + '\n'
+
+        if self.writer.is_alive():
+            self.writer.put(filename, line)
+            return
+
+        # писатель уже остановлен (после close) - пишем напрямую
         path = self._get_path(filename)
         try:
-            with open(path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(data, ensure_ascii=False) + '\n')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if isinstance(line, bytes):
+                with self.columnar.open_partition(path) as f:
+                    f.write(line)
+            else:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(line)
         except Exception as e:
             self.print_status(f"❌ Ошибка записи в {filename}: {e}")
 
+    def get_queue_stats(self):
+        """Счетчики фонового писателя"""
+        return {
+            'queue_depth': self.writer.queue.qsize(),
+            'written': self.writer.written,
+            'dropped': self.writer.dropped,
+            'batches': self.writer.batches,
+        }
+
+    def close(self):
+        """Дописываем очередь на диск (вызывается из shutdown)"""
+        if self.writer.is_alive():
+            self.writer.stop()
+        if self.tick_store is not None:
+            self.tick_store.close()
+            self.tick_store = None
+
     def print_status(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        if not self.console:
+            return
+        timestamp = clock.now().strftime("%H:%M:%S")
         print(f"[{timestamp}] {message}")
 
     def clear_old_logs(self):
+        if self.writer.is_alive():
+            self.writer.close_files()
         try:
             files = ['impulses.jsonl', 'cex_comparison.jsonl', 'arbitrage.jsonl']
             for f in files:
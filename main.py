@@ -1,17 +1,51 @@
 import asyncio
 import time
-from detector import ImpulseDetector
+from detector import ImpulseDetector, MultiWindowImpulseDetector
 from dex_monitor import DexMonitor
 from cex_monitor import CEXMonitor
 from stats_analyzer import StatsAnalyzer
+from http_client import HttpClient
+from proxy_pool import ProxyPool
+from scan_scheduler import ScanScheduler
+import metrics
 from logger import file_logger as logger
-from config import SETTINGS, CEX_EXCHANGES
+from config import TOKENS, SETTINGS, CEX_EXCHANGES
 
 class CryptoMonitor:
     def __init__(self):
-        self.impulse_detector = ImpulseDetector(threshold=SETTINGS['impulse_threshold'])
-        self.cex_monitor = CEXMonitor()
-        self.dex_monitor = DexMonitor(self.impulse_detector, self.cex_monitor)
+        self.http_client = HttpClient()
+        self.proxy_pool = ProxyPool()
+        self.impulse_detector = self._create_detector()
+        self.price_board = None
+        if SETTINGS['price_board']:
+            from price_board import PriceBoard
+            self.price_board = PriceBoard(SETTINGS['price_board'], SETTINGS['price_board_capacity'])
+        self.cex_monitor = CEXMonitor(self.http_client, self.proxy_pool, self.price_board)
+        self.dex_monitor = DexMonitor(
+            self.impulse_detector, self.cex_monitor, self.http_client, self.proxy_pool, self.price_board
+        )
+        self.scan_scheduler = ScanScheduler(
+            SETTINGS['scan_frequency'],
+            policy=SETTINGS['scan_overrun_policy'],
+            overrun_cap=SETTINGS['scan_overrun_cap'],
+            jitter=SETTINGS['scan_start_jitter']
+        )
+        self.token_universe = None
+        if SETTINGS['token_universe']:
+            # список токенов из файла заменяет TOKENS из config еще до запуска шардов
+            from token_universe import TokenUniverse
+            self.token_universe = TokenUniverse(SETTINGS['token_universe'])
+            self.token_universe.check(force=True)
+
+        self.shards = None
+        if SETTINGS['shards'] > 1:
+            # DEX сканируют процессы-шарды, здесь остаются CEX, логи и консоль
+            from sharding import ShardPool
+            self.shards = ShardPool(
+                SETTINGS['shards'], self._on_shard_impulse, self._on_shard_cycle, self._on_shard_ticks
+            )
+        self.metrics_server = None
+        self._register_metrics()
         
         self.stats = {
             'start_time': None,
@@ -20,44 +54,136 @@ class CryptoMonitor:
         }
         self.is_running = True
     
+    @staticmethod
+    def _create_detector():
+        if SETTINGS['detector_backend'] == 'vector':
+            from vector_detector import VectorImpulseDetector
+            return VectorImpulseDetector(threshold=SETTINGS['impulse_threshold'])
+        if SETTINGS['detector_backend'] == 'windows':
+            return MultiWindowImpulseDetector(
+                threshold=SETTINGS['impulse_threshold'],
+                windows=SETTINGS['impulse_windows']
+            )
+        return ImpulseDetector(threshold=SETTINGS['impulse_threshold'])
+
+    def _register_metrics(self):
+        """Метрики, которые считаются в момент запроса /metrics"""
+        metrics.CEX_ACTIVE_MONITORING.set_function(lambda: len(self.cex_monitor.active_monitoring))
+        metrics.LOG_QUEUE_DEPTH.set_function(lambda: logger.writer.queue.qsize())
+        metrics.LOG_DROPPED.set_function(lambda: logger.writer.dropped)
+
+        def proxies():
+            pool = self.proxy_pool.get_stats()
+            return {
+                ('total',): pool['total'],
+                ('quarantined',): pool['quarantined'],
+                ('quarantined_for_host',): pool['quarantined_for_host'],
+            }
+
+        metrics.PROXIES.set_function(proxies)
+        metrics.PROXY_MEDIAN_LATENCY_SECONDS.set_function(lambda: self.proxy_pool.get_stats()['median_latency'])
+
     async def run(self):
         self.stats['start_time'] = time.time()
         logger.print_status("🚀 Старт мониторинга (публичные API)")
         logger.print_status(f"⚙️  Скорость сканирования: {SETTINGS['scan_frequency']} сек")
         logger.print_status(f"⚙️  Порог импульса: {SETTINGS['impulse_threshold']*100}%")
         logger.print_status(f"⚙️  CEX бирж: {len(CEX_EXCHANGES)}")
+        if self.shards is not None:
+            logger.print_status(f"⚙️  Шардов: {self.shards.count}")
         logger.print_status("💡 Для остановки нажмите Ctrl+C")
-        
+
+        if SETTINGS['metrics_port']:
+            self.metrics_server = metrics.MetricsServer(SETTINGS['metrics_host'], SETTINGS['metrics_port'])
+            await self.metrics_server.start()
+            logger.print_status(
+                f"📈 Метрики: http://{SETTINGS['metrics_host']}:{SETTINGS['metrics_port']}/metrics"
+            )
+
         try:
-            while self.is_running:
-                cycle_start = time.time()
-                self.stats['total_cycles'] += 1
-                
-                impulses = await self.dex_monitor.monitor_all_tokens()
-                self.stats['total_impulses'] += impulses
-                
-                execution_time = time.time() - cycle_start
-                wait_time = SETTINGS['scan_frequency'] - execution_time
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-  
-                    
+            if self.shards is not None:
+                await self.shards.run()
+            else:
+                # циклы по сетке времени: медленный цикл не сдвигает расписание
+                await self.scan_scheduler.run(self._scan_cycle)
+
         except KeyboardInterrupt:
             await self.shutdown(" Остановка по Ctrl+C")
         except Exception as e:
             await self.shutdown(f"❌ Ошибка: {e}")
     
+    def _reload_tokens(self):
+        """Между циклами: подтягиваем изменения списка токенов. Идущий трекинг CEX не трогаем"""
+        if self.token_universe is None:
+            return
+        changes = self.token_universe.check()
+        if not changes:
+            return
+
+        self.dex_monitor.update_tokens(changes)
+        self.cex_monitor.symbol_index.update_tokens(
+            list(changes.added) + changes.remapped, changes.removed
+        )
+        if self.shards is not None:
+            self.shards.update_tokens(changes)
+        logger.print_status(
+            f"🔄 Список токенов: +{len(changes.added)} -{len(changes.removed)} "
+            f"(LBank ~{len(changes.remapped)}) | всего {len(TOKENS)}"
+        )
+
+    async def _scan_cycle(self):
+        self._reload_tokens()
+        self.stats['total_cycles'] += 1
+        impulses = await self.dex_monitor.monitor_all_tokens()
+        self.stats['total_impulses'] += impulses
+
+    def _on_shard_impulse(self, symbol, impulse, price, base_price, impulse_price, window):
+        # лог, метрика и трекинг CEX - как у импульса из своего цикла
+        self.dex_monitor._on_impulse(symbol, impulse, price, base_price, impulse_price, window)
+
+    def _on_shard_cycle(self, index, cycle):
+        # полный проход по всем токенам - когда цикл закончили все шарды
+        self.stats['total_cycles'] = min(self.shards.cycles)
+        self.stats['total_impulses'] += cycle['impulses']
+        metrics.SCAN_CYCLE_SECONDS.observe(cycle['duration'])
+        # шард применит изменения перед следующим циклом
+        self._reload_tokens()
+
+        if logger.console:
+            logger.print_status(
+                f"🧩 Шард {index}: {cycle['successful']}/{cycle['tokens']} | "
+                f"Импульсы: {cycle['impulses']} | Цикл: {cycle['wall_time']:.2f}s | "
+                f"Не успели: {cycle['timed_out']} | Запросы: ✅{cycle['requests_ok']} ❌{cycle['requests_fail']}"
+            )
+
+    def _on_shard_ticks(self, index, prices):
+        # снимок CEX пишем один раз за проход - по ценам шарда 0
+        self.dex_monitor.current_prices.update(prices)
+        self.dex_monitor._publish_prices(prices, cex=index == 0)
+
     async def shutdown(self, message):
         """Корректное завершение работы"""
         logger.print_status(message)
         self.is_running = False
-        
-        
+
+        await self.scan_scheduler.close()
+        if self.shards is not None:
+            await self.shards.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        await self.cex_monitor.close()
+        await self.http_client.close()
+        if self.token_universe is not None:
+            self.token_universe.close()
+        if self.price_board is not None:
+            self.price_board.close()
+
         self._print_final_stats()
+        logger.close()
         
         try:
-            analyzer = StatsAnalyzer()
-            analyzer.generate_report()
+            with StatsAnalyzer() as analyzer:
+                analyzer.generate_report()
         except Exception as e:
             logger.print_status(f"⚠️  Ошибка при генерации отчета: {e}")
     
@@ -69,6 +195,91 @@ class CryptoMonitor:
             logger.print_status(f"  Циклов: {self.stats['total_cycles']}")
             logger.print_status(f"  Импульсов: {self.stats['total_impulses']}")
 
+        scan = self.scan_scheduler.get_stats()
+        if scan['runs']:
+            logger.print_status(
+                f"  Сетка: тиков {scan['ticks']}, пропущено {scan['skipped']} | "
+                f"частота {scan['rate']:.3f}/сек (цель {scan['target_rate']:.3f}) | "
+                f"цикл p50 {scan['duration_p50']:.2f}s, p99 {scan['duration_p99']:.2f}s, max {scan['duration_max']:.2f}s | "
+                f"опоздание p50 {scan['lateness_p50']:.3f}s, p99 {scan['lateness_p99']:.3f}s"
+            )
+
+        if self.proxy_pool.enabled:
+            pool = self.proxy_pool.get_stats()
+            median = f"{pool['median_latency']:.2f}s" if pool['median_latency'] is not None else "-"
+            logger.print_status(
+                f"  Прокси: {pool['total']} | в карантине {pool['quarantined']} "
+                f"(+{pool['quarantined_for_host']} по хостам) | 403/429: {pool['recent_blocks']} | "
+                f"медиана задержки {median}"
+            )
+
+        rate_limits = self.http_client.rate_limiter.get_stats()
+        if self.shards is not None:
+            shards = self.shards.get_stats()
+            for index, shard in sorted(shards['shards'].items()):
+                scan, requests = shard['scan'], shard['requests']
+                line = (
+                    f"  Шард {index}: токенов {shard['tokens']}, циклов {scan['runs']}, "
+                    f"пропущено {scan['skipped']}, импульсов {shard['impulses']} | "
+                    f"запросы ✅{requests['success']} ❌{requests['fail']}"
+                )
+                if scan['runs']:
+                    line += f" | цикл p50 {scan['duration_p50']:.2f}s, p99 {scan['duration_p99']:.2f}s"
+                if shard['hedge']['hedged']:
+                    line += f" | хеджей {shard['hedge']['hedged']} (первыми {shard['hedge']['hedge_wins']})"
+                logger.print_status(line)
+            logger.print_status(
+                f"  Шарды всего: {len(shards['shards'])}/{self.shards.count} | токенов {shards['tokens']} | "
+                f"импульсов {shards['impulses']} | запросов {shards['requests']} "
+                f"(✅{shards['requests_success']} ❌{shards['requests_fail']}) | ошибок {len(shards['errors'])}"
+            )
+            from sharding import merge_rate_limits
+            rate_limits = merge_rate_limits(rate_limits, shards['rate_limits'])
+
+        for host, limits in rate_limits.items():
+            logger.print_status(
+                f"  Лимит {host}: {limits['rate']:.2f} запр/сек | 429: {limits['throttled']} | "
+                f"ожидание {limits['waited']:.1f} сек"
+            )
+
+        hedge = self.dex_monitor.price_fetcher.get_stats()
+        if hedge['effective_p99'] is not None and hedge['primary_p99'] is not None:
+            saved = f"{hedge['saved_p99']:.2f}s" if hedge['saved_p99'] is not None else "-"
+            logger.print_status(
+                f"  Источники DEX: {', '.join(hedge['sources'])} | хеджей {hedge['hedged']} "
+                f"({hedge['hedge_rate']:.1%}), первыми {hedge['hedge_wins']}, вне бюджета {hedge['over_budget']} | "
+                f"задержка p50 {hedge['effective_p50']:.2f}s, p99 {hedge['effective_p99']:.2f}s "
+                f"(основной p99 {hedge['primary_p99']:.2f}s, выигрыш p99 ≥ {saved}) | "
+                f"порог хеджа {hedge['hedge_delay']:.2f}s"
+            )
+
+        sched = self.cex_monitor.scheduler.get_stats()
+        if sched['samples']:
+            logger.print_status(
+                f"  Замеры CEX: {sched['samples']} за {sched['rounds']} раундов | "
+                f"опоздание p50 {sched['lag_p50']:.2f}s, p99 {sched['lag_p99']:.2f}s, max {sched['lag_max']:.2f}s"
+            )
+
+        log_stats = logger.get_queue_stats()
+        logger.print_status(
+            f"  Логи: записано {log_stats['written']}, потеряно {log_stats['dropped']}, "
+            f"в очереди {log_stats['queue_depth']}"
+        )
+
+        if self.price_board is not None:
+            board = self.price_board.get_stats()
+            logger.print_status(
+                f"  Табло цен: {board['symbols']}/{board['capacity']} токенов, опубликовано {board['published']} цен, "
+                f"не поместилось {board['overflow']}"
+            )
+
+        if logger.tick_store is not None:
+            ticks = logger.tick_store.get_stats()
+            logger.print_status(
+                f"  База тиков: записано {ticks['written']}, потеряно {ticks['dropped']}, "
+                f"пачек {ticks['batches']}, в очереди {ticks['queue_depth']}"
+            )
+
 def main():
     monitor = CryptoMonitor()
     
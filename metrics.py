@@ -0,0 +1,268 @@
+"""Метрики в текстовом формате Prometheus.
+
+Счетчики и гистограммы обновляются на месте (словарь + bisect по корзинам), текст
+собирается только при запросе /metrics - поэтому инструментирование можно не выключать.
+Сервер включается настройкой SETTINGS['metrics_port']:
+
+    curl http://127.0.0.1:9108/metrics
+"""
+import asyncio
+import bisect
+import time
+
+import aiohttp
+from aiohttp import web
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# корзины по умолчанию (сек): от быстрых HTTP ответов до медленных циклов
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}  # кортеж значений меток -> значение
+        self.function = None
+
+    def set_function(self, function):
+        """Значение считается при запросе: function() -> число или {кортеж меток: число}"""
+        self.function = function
+
+    def _current(self):
+        if self.function is None:
+            return self.values
+        value = self.function()
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, value in self._current().items():
+            if value is not None:
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def merge(self, values):
+        for labels, value in values.items():
+            self.inc(*labels, amount=value)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            # [счетчики по корзинам (+ последняя для +Inf), сумма, количество]
+            state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self.values[labels] = state
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def merge(self, values):
+        for labels, (counts, total, count) in values.items():
+            state = self.values.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+            state[2] += count
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._add(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # одна сломанная метрика не роняет весь ответ
+                lines.append(f"# ошибка {metric.name}: {_escape(e)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+SCAN_CYCLE_SECONDS = registry.histogram(
+    'impulse_bot_scan_cycle_seconds', 'Длительность цикла сканирования DEX',
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 30, 60)
+)
+SCAN_SKIPPED_TICKS = registry.counter(
+    'impulse_bot_scan_skipped_ticks_total', 'Пропущенные тики сетки сканирования'
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'impulse_bot_http_request_seconds', 'Задержка HTTP запросов по хостам', labels=('host',)
+)
+HTTP_REQUESTS = registry.counter(
+    'impulse_bot_http_requests_total', 'HTTP запросы по хостам и статусам', labels=('host', 'status')
+)
+IMPULSES = registry.counter(
+    'impulse_bot_impulses_total', 'Пойманные импульсы по токенам', labels=('token',)
+)
+CEX_SAMPLE_LAG_SECONDS = registry.histogram(
+    'impulse_bot_cex_sample_lag_seconds', 'Опоздание замера CEX относительно целевого интервала',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+CEX_ACTIVE_MONITORING = registry.gauge(
+    'impulse_bot_cex_active_monitoring', 'Токены, которые сейчас трекаются на CEX'
+)
+PROXIES = registry.gauge(
+    'impulse_bot_proxies', 'Прокси по состоянию', labels=('state',)
+)
+PROXY_MEDIAN_LATENCY_SECONDS = registry.gauge(
+    'impulse_bot_proxy_median_latency_seconds', 'Медиана EWMA задержки прокси'
+)
+DEX_HEDGES = registry.counter(
+    'impulse_bot_dex_hedges_total', 'Хедж-запросы цен DEX: отправлено (fired) и ответили первыми (won)',
+    labels=('outcome',)
+)
+LOG_QUEUE_DEPTH = registry.gauge(
+    'impulse_bot_log_queue_depth', 'Записей в очереди фонового писателя логов'
+)
+LOG_DROPPED = registry.counter(
+    'impulse_bot_log_dropped_total', 'Записи логов, потерянные при полной очереди'
+)
+
+
+# метрики, которые в шардированном режиме копятся в процессах-шардах
+SHARD_METRICS = (HTTP_REQUEST_SECONDS, HTTP_REQUESTS, DEX_HEDGES)
+
+
+def drain(metrics=SHARD_METRICS):
+    """Накопленное с прошлого вызова и сброс: шард отдает приращения координатору"""
+    delta = {}
+    for metric in metrics:
+        if metric.values:
+            delta[metric.name] = metric.values
+            metric.values = {}
+    return delta
+
+
+def merge(delta, metrics=SHARD_METRICS):
+    """Приращения из drain() другого процесса -> метрики этого процесса"""
+    by_name = {metric.name: metric for metric in metrics}
+    for name, values in delta.items():
+        if name in by_name:
+            by_name[name].merge(values)
+
+
+def _request_status(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return 'TIMEOUT'
+    if isinstance(error, aiohttp.ClientProxyConnectionError):
+        return 'PROXY_ERROR'
+    return 'ERROR'
+
+
+async def _on_request_start(session, context, params):
+    context.started = time.monotonic()
+
+
+async def _on_request_end(session, context, params):
+    host = params.url.host
+    HTTP_REQUEST_SECONDS.observe(time.monotonic() - context.started, host)
+    HTTP_REQUESTS.inc(host, params.response.status)
+
+
+async def _on_request_exception(session, context, params):
+    HTTP_REQUESTS.inc(params.url.host, _request_status(params.exception))
+
+
+def trace_config():
+    """Хуки aiohttp: задержка и статус каждого запроса сессии без правок в мониторах"""
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(_on_request_start)
+    trace.on_request_end.append(_on_request_end)
+    trace.on_request_exception.append(_on_request_exception)
+    return trace
+
+
+class MetricsServer:
+    """GET /metrics на отдельном порту (aiohttp.web в том же event loop)"""
+
+    def __init__(self, host, port, metrics_registry=registry):
+        self.host = host
+        self.port = port
+        self.registry = metrics_registry
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def _handle(self, request):
+        return web.Response(body=self.registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
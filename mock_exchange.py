@@ -0,0 +1,403 @@
+"""Локальная замена DexScreener, Gate.io и LBank для нагрузочных тестов.
+
+Отдает те же формы ответов, что и настоящие API:
+    GET /latest/dex/tokens/{адреса через запятую}      - DexScreener
+    GET /api/v4/spot/currency_pairs, /api/v4/spot/tickers
+    GET /api/v4/futures/usdt/contracts, /api/v4/futures/usdt/tickers   - Gate.io
+    GET /v2/currencyPairs.do, /v2/ticker.do?symbol=...|all              - LBank
+    GET /price/v2?ids={адреса через запятую}            - Jupiter Price API
+    WS  /ws/gateio/spot, /ws/gateio/futures             - Gate.io spot.tickers / futures.tickers
+    WS  /ws/lbank                                       - LBank tick (с пингом на уровне приложения)
+    GET /__stats                                        - счетчики запросов (для бенчмарка)
+
+Цены - случайное блуждание со сценарием импульсов (резкий скачок случайного токена
+каждые impulse_every сек), CEX повторяет DEX с задержкой cex_lag. Задержка ответа,
+медленный хвост (доля slow_rate ответов с задержкой slow_latency), доля ошибок 500
+и окна 429 (с Retry-After) настраиваются. WebSocket шлет тикеры подписанных символов
+каждые step сек и рвет соединения раз в ws_drop_every сек (проверка переподключения).
+
+    python mock_exchange.py --tokens 500 --port 8900 --latency 0.05 --error-rate 0.01 --burst-every 60
+Бот направляется на него через SETTINGS['api_urls'] (см. benchmarks/bench_e2e.py).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+def make_tokens(count):
+    """{символ: адрес} - детерминированные, чтобы бот и сервер получили одинаковые"""
+    tokens = {}
+    for i in range(count):
+        digest = hashlib.sha256(f"mock-token-{i}".encode()).digest()
+        value = int.from_bytes(digest, 'big')
+        address = ""
+        while len(address) < 44:
+            value, rest = divmod(value, 58)
+            address += BASE58[rest]
+        tokens[f"MOCK{i}"] = address
+    return tokens
+
+
+class MockMarket:
+    """Сценарий цен: DEX блуждает и иногда прыгает, CEX отстает на cex_lag сек"""
+
+    def __init__(self, tokens, step=0.5, volatility=0.002, impulse_every=30.0,
+                 impulse_size=0.08, cex_lag=2.0, seed=42):
+        self.tokens = tokens
+        self.addresses = {address.lower(): symbol for symbol, address in tokens.items()}
+        self.step = step
+        self.volatility = volatility
+        self.impulse_every = impulse_every
+        self.impulse_size = impulse_size
+        self.cex_lag = cex_lag
+        self.random = random.Random(seed)
+
+        self.dex = {symbol: 10 ** self.random.uniform(-6, 1) for symbol in tokens}
+        self.cex = dict(self.dex)
+        self.history = deque()  # (время, копия цен DEX) для отставания CEX
+        self.next_impulse = time.monotonic() + impulse_every if impulse_every else None
+        self.impulses = 0
+
+    def advance(self):
+        now = time.monotonic()
+        for symbol, price in self.dex.items():
+            self.dex[symbol] = price * math.exp(self.random.gauss(0, self.volatility))
+
+        if self.next_impulse is not None and now >= self.next_impulse:
+            symbol = self.random.choice(list(self.dex))
+            sign = self.random.choice((1, -1))
+            self.dex[symbol] *= 1 + sign * self.impulse_size
+            self.impulses += 1
+            self.next_impulse = now + self.impulse_every
+
+        self.history.append((now, dict(self.dex)))
+        while self.history and self.history[0][0] <= now - self.cex_lag:
+            self.cex = self.history.popleft()[1]
+
+    async def run(self):
+        while True:
+            self.advance()
+            await asyncio.sleep(self.step)
+
+
+class FaultProfile:
+    """Задержка, медленный хвост, случайные 500 и периодические окна 429"""
+
+    def __init__(self, latency=0.0, jitter=0.5, error_rate=0.0, burst_every=0.0, burst_length=5.0,
+                 slow_rate=0.0, slow_latency=5.0, ws_drop_every=0.0):
+        self.latency = latency
+        self.jitter = jitter  # разброс задержки, доля от latency
+        self.slow_rate = slow_rate  # доля очень медленных ответов (хвост задержек)
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.ws_drop_every = ws_drop_every  # закрываем WebSocket соединения раз в N сек (0 - не рвем)
+        self.started = time.monotonic()
+
+    def burst_remaining(self):
+        """Сколько еще длится окно 429 (0 - окна нет)"""
+        if not self.burst_every:
+            return 0.0
+        phase = (time.monotonic() - self.started) % self.burst_every
+        start = self.burst_every - self.burst_length
+        return self.burst_every - phase if phase >= start else 0.0
+
+
+def _gate_symbol(symbol):
+    return f"{symbol}_USDT"
+
+
+def _lbank_symbol(symbol):
+    return f"{symbol.lower()}_usdt"
+
+
+def create_app(market, faults):
+    stats = Counter()
+    app = web.Application()
+
+    @web.middleware
+    async def inject_faults(request, handler):
+        if request.path == '/__stats' or request.path.startswith('/ws/'):
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else request.path
+        stats['requests'] += 1
+        stats[route] += 1
+
+        if faults.latency:
+            spread = faults.latency * faults.jitter
+            await asyncio.sleep(max(0.0, random.uniform(faults.latency - spread, faults.latency + spread)))
+        if faults.slow_rate and random.random() < faults.slow_rate:
+            stats['slow'] += 1
+            await asyncio.sleep(faults.slow_latency)
+
+        remaining = faults.burst_remaining()
+        if remaining:
+            stats['429'] += 1
+            return web.json_response(
+                {"label": "TOO_MANY_REQUESTS", "message": "Request Rate limit Exceeded"},
+                status=429, headers={"Retry-After": str(math.ceil(remaining))}
+            )
+        if faults.error_rate and random.random() < faults.error_rate:
+            stats['500'] += 1
+            return web.json_response({"message": "Internal Server Error"}, status=500)
+
+        return await handler(request)
+
+    app.middlewares.append(inject_faults)
+
+    async def dexscreener_tokens(request):
+        pairs = []
+        for address in request.match_info['addresses'].split(',')[:30]:
+            symbol = market.addresses.get(address.lower())
+            if symbol is None:
+                continue
+            price = market.dex[symbol]
+            pairs.append({
+                "chainId": "solana",
+                "dexId": "raydium",
+                "url": f"https://dexscreener.com/solana/{address.lower()}",
+                "pairAddress": address[::-1],
+                "baseToken": {"address": market.tokens[symbol], "name": symbol, "symbol": symbol},
+                "quoteToken": {"address": SOL_ADDRESS, "name": "Wrapped SOL", "symbol": "SOL"},
+                "priceNative": f"{price / 150:.12g}",
+                "priceUsd": f"{price:.12g}",
+                "liquidity": {"usd": 250000.0},
+                "volume": {"h24": 1000000.0},
+            })
+        return web.json_response({"schemaVersion": "1.0.0", "pairs": pairs or None})
+
+    def gate_tickers(key, symbols):
+        items = [(_gate_symbol(s), market.cex[s]) for s in symbols]
+        return [{key: name, "last": f"{price:.12g}", "change_percentage": "0"} for name, price in items]
+
+    async def gateio_spot_pairs(request):
+        return web.json_response([
+            {"id": _gate_symbol(s), "base": s, "quote": "USDT", "trade_status": "tradable"}
+            for s in market.tokens
+        ])
+
+    async def gateio_futures_contracts(request):
+        return web.json_response([{"name": _gate_symbol(s), "in_delisting": False} for s in market.tokens])
+
+    def requested(value, parse):
+        """Один символ из параметра запроса или все (таблица тикеров целиком)"""
+        if value is None:
+            return list(market.tokens)
+        symbol = parse(value)
+        return [symbol] if symbol in market.cex else []
+
+    def from_gate(value):
+        return value[:-len("_USDT")] if value.endswith("_USDT") else value
+
+    async def gateio_spot_tickers(request):
+        symbols = requested(request.query.get('currency_pair'), from_gate)
+        return web.json_response(gate_tickers("currency_pair", symbols))
+
+    async def gateio_futures_tickers(request):
+        symbols = requested(request.query.get('contract'), from_gate)
+        return web.json_response(gate_tickers("contract", symbols))
+
+    def lbank_response(data):
+        return web.json_response({
+            "result": "true", "data": data, "error_code": 0, "ts": int(time.time() * 1000)
+        })
+
+    async def lbank_pairs(request):
+        return lbank_response([_lbank_symbol(s) for s in market.tokens])
+
+    async def lbank_ticker(request):
+        value = request.query.get('symbol', 'all')
+        if value == 'all':
+            symbols = list(market.tokens)
+        else:
+            symbols = [s for s in market.tokens if _lbank_symbol(s) == value]
+        return lbank_response([
+            {"symbol": _lbank_symbol(s), "ticker": {"latest": market.cex[s], "change": 0, "vol": 0},
+             "timestamp": int(time.time() * 1000)}
+            for s in symbols
+        ])
+
+    async def jupiter_price(request):
+        data = {}
+        for address in request.query.get('ids', '').split(',')[:100]:
+            symbol = market.addresses.get(address.lower())
+            if symbol is not None:
+                data[address] = {"id": address, "type": "derivedPrice", "price": f"{market.dex[symbol]:.12g}"}
+        return web.json_response({"data": data, "timeTaken": 0.001})
+
+    async def ws_stream(request, subscribe, update, ping=None):
+        """Общий цикл WebSocket: subscribe(сообщение, подписки) разбирает подписки клиента,
+        update(символ) -> кадр тикера. Закрываем соединение раз в ws_drop_every сек"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        stats['ws_connections'] += 1
+        subscribed = set()
+        opened = time.monotonic()
+
+        async def push():
+            pings = 0
+            while not ws.closed:
+                await asyncio.sleep(market.step)
+                for symbol in list(subscribed):
+                    await ws.send_json(update(symbol))
+                    stats['ws_messages'] += 1
+                pings += 1
+                if ping is not None and pings % 10 == 0:
+                    await ws.send_json(ping())
+                if faults.ws_drop_every and time.monotonic() - opened >= faults.ws_drop_every:
+                    stats['ws_drops'] += 1
+                    await ws.close()
+
+        pusher = asyncio.create_task(push())
+        try:
+            async for msg in ws:
+                if msg.type != web.WSMsgType.TEXT:
+                    continue
+                try:
+                    message = json.loads(msg.data)
+                except ValueError:
+                    continue
+                reply = subscribe(message, subscribed)
+                if reply is not None:
+                    await ws.send_json(reply)
+        finally:
+            pusher.cancel()
+            await asyncio.gather(pusher, return_exceptions=True)
+        return ws
+
+    def gate_subscribe(channel):
+        def handle(message, subscribed):
+            if message.get('channel') != channel:
+                return None
+            symbols = {from_gate(value) for value in message.get('payload') or []} & set(market.cex)
+            if message.get('event') == 'subscribe':
+                subscribed.update(symbols)
+            elif message.get('event') == 'unsubscribe':
+                subscribed.difference_update(symbols)
+            else:
+                return None
+            return {"time": int(time.time()), "channel": channel, "event": message['event'],
+                    "result": {"status": "success"}}
+        return handle
+
+    async def gateio_spot_ws(request):
+        def update(symbol):
+            return {"time": int(time.time()), "channel": "spot.tickers", "event": "update",
+                    "result": gate_tickers("currency_pair", [symbol])[0]}
+        return await ws_stream(request, gate_subscribe("spot.tickers"), update)
+
+    async def gateio_futures_ws(request):
+        def update(symbol):
+            # futures присылает список тикеров
+            return {"time": int(time.time()), "channel": "futures.tickers", "event": "update",
+                    "result": gate_tickers("contract", [symbol])}
+        return await ws_stream(request, gate_subscribe("futures.tickers"), update)
+
+    async def lbank_ws(request):
+        by_pair = {_lbank_symbol(s): s for s in market.tokens}
+
+        def subscribe(message, subscribed):
+            if message.get('action') == 'pong':
+                stats['ws_pongs'] += 1
+                return None
+            if message.get('subscribe') != 'tick' or message.get('pair') not in by_pair:
+                return None
+            symbol = by_pair[message['pair']]
+            if message.get('action') == 'subscribe':
+                subscribed.add(symbol)
+            elif message.get('action') == 'unsubscribe':
+                subscribed.discard(symbol)
+            return None
+
+        def update(symbol):
+            return {"type": "tick", "pair": _lbank_symbol(symbol), "SERVER": "V2",
+                    "tick": {"latest": market.cex[symbol], "change": 0, "vol": 0},
+                    "TS": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+        def ping():
+            return {"action": "ping", "ping": f"{random.getrandbits(64):x}"}
+
+        return await ws_stream(request, subscribe, update, ping)
+
+    async def get_stats(request):
+        return web.json_response({**stats, 'impulses': market.impulses})
+
+    app.router.add_get('/latest/dex/tokens/{addresses}', dexscreener_tokens)
+    app.router.add_get('/api/v4/spot/currency_pairs', gateio_spot_pairs)
+    app.router.add_get('/api/v4/spot/tickers', gateio_spot_tickers)
+    app.router.add_get('/api/v4/futures/usdt/contracts', gateio_futures_contracts)
+    app.router.add_get('/api/v4/futures/usdt/tickers', gateio_futures_tickers)
+    app.router.add_get('/v2/currencyPairs.do', lbank_pairs)
+    app.router.add_get('/v2/ticker.do', lbank_ticker)
+    app.router.add_get('/price/v2', jupiter_price)
+    app.router.add_get('/ws/gateio/spot', gateio_spot_ws)
+    app.router.add_get('/ws/gateio/futures', gateio_futures_ws)
+    app.router.add_get('/ws/lbank', lbank_ws)
+    app.router.add_get('/__stats', get_stats)
+    return app
+
+
+async def serve(market, faults, host='127.0.0.1', port=8900):
+    """Запускает сервер и сценарий цен до отмены"""
+    runner = web.AppRunner(create_app(market, faults))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    prices = asyncio.create_task(market.run())
+    try:
+        await asyncio.Event().wait()
+    finally:
+        prices.cancel()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--tokens', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.05, help="средняя задержка ответа (сек)")
+    parser.add_argument('--jitter', type=float, default=0.5, help="разброс задержки, доля от средней")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="доля очень медленных ответов")
+    parser.add_argument('--slow-latency', type=float, default=5.0, help="задержка медленного ответа (сек)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="период окон 429 (сек, 0 - без них)")
+    parser.add_argument('--burst-length', type=float, default=5.0, help="длина окна 429 (сек)")
+    parser.add_argument('--impulse-every', type=float, default=30.0, help="импульс случайного токена раз в N сек")
+    parser.add_argument('--impulse-size', type=float, default=0.08)
+    parser.add_argument('--cex-lag', type=float, default=2.0, help="на сколько CEX отстает от DEX (сек)")
+    parser.add_argument('--ws-drop-every', type=float, default=0.0,
+                        help="рвать WebSocket соединения раз в N сек (0 - не рвать)")
+    args = parser.parse_args()
+
+    market = MockMarket(
+        make_tokens(args.tokens), impulse_every=args.impulse_every,
+        impulse_size=args.impulse_size, cex_lag=args.cex_lag, seed=args.seed
+    )
+    faults = FaultProfile(
+        args.latency, args.jitter, args.error_rate, args.burst_every, args.burst_length,
+        args.slow_rate, args.slow_latency, args.ws_drop_every
+    )
+
+    print(f"🧪 Mock биржи на http://{args.host}:{args.port} ({args.tokens} токенов)")
+    try:
+        asyncio.run(serve(market, faults, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
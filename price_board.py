@@ -0,0 +1,174 @@
+"""Табло текущих цен в разделяемой памяти (mmap файл) для внешних процессов.
+
+Бот пишет сюда DexMonitor.current_prices и CEXMonitor.cex_prices, а дашборды, движок
+исполнения или ноутбук отображают файл только на чтение (price_board_reader.py)
+и читают цены прямо из памяти: без копий, без запросов к боту.
+
+Формат (little-endian, все поля выровнены по 8 байт):
+    заголовок, 64 байта:
+        0   magic        4s   b'IMPB' (пишется последним, 0 - табло еще создается)
+        4   version      u32  LAYOUT_VERSION
+        8   capacity     u32  строк (токенов) максимум
+        12  columns      u32  колонок (источников цены)
+        16  count        u32  занятых строк, растет после записи имени
+        20  pid          u32  процесс писателя, 0 - писатель остановлен
+        24  seq          u64  seqlock табло: нечетный - идет публикация
+        32  created_ns   u64  время создания (новое значение - табло пересоздано)
+        40  updated_ns   u64  время последней публикации
+    имена колонок:  columns x 16 байт (utf-8, дополнены нулями)
+    имена токенов:  capacity x 24 байта
+    ячейки:         capacity x columns x 24 байта: seq u64, ts_ns u64, price f64
+
+Ячейка строки row и колонки col: SLOTS + (row * columns + col) * 24. Ячейку пишем так:
+seq = нечетный seq табло, затем ts и цена, затем seq = следующий четный. Читатель
+повторяет чтение, пока seq до и после совпали и четные. Строки не освобождаются:
+у удаленного из списка токена остается последняя цена с ее временем.
+"""
+import mmap
+import os
+import struct
+import time
+
+from logger import file_logger
+
+MAGIC = b'IMPB'
+LAYOUT_VERSION = 1
+
+HEADER = struct.Struct('<4sIIIIIQQQ')
+HEADER_SIZE = 64
+COLUMN_SIZE = 16
+SYMBOL_SIZE = 24
+SLOT = struct.Struct('<QQd')
+
+# смещения полей заголовка
+COUNT_OFFSET = 16
+PID_OFFSET = 20
+SEQ_OFFSET = 24
+UPDATED_OFFSET = 40
+
+COLUMNS = ('dex', 'gateio_futures', 'gateio_spot', 'lbank_spot')
+
+
+def layout(capacity, columns):
+    """-> (смещение имен токенов, смещение ячеек, размер файла)"""
+    symbols = HEADER_SIZE + columns * COLUMN_SIZE
+    symbols += -symbols % 8
+    slots = symbols + capacity * SYMBOL_SIZE
+    return symbols, slots, slots + capacity * columns * SLOT.size
+
+
+class PriceBoard:
+    """Писатель табло. Один на файл, вызывается из event loop (без блокировок)"""
+
+    def __init__(self, path, capacity, columns=COLUMNS):
+        self.path = path
+        self.capacity = capacity
+        self.columns = list(columns)
+        self.column_index = {name: index for index, name in enumerate(self.columns)}
+        self.symbols_offset, self.slots_offset, self.size = layout(capacity, len(self.columns))
+
+        self.rows = {}
+        self.seq = 0
+        self.published = 0  # цен
+        self.overflow = 0  # цен без строки (табло заполнено)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # файл только растет (без O_TRUNC и без уменьшения): читатели, отобразившие
+        # прошлое табло большего размера, не получат SIGBUS, а увидят BoardChanged
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self.mm = mmap.mmap(fd, self.size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        self._init_layout()
+
+    def _init_layout(self):
+        mm = self.mm
+        mm[0:4] = b'\0\0\0\0'
+        mm[4:self.size] = bytes(self.size - 4)
+        for index, name in enumerate(self.columns):
+            offset = HEADER_SIZE + index * COLUMN_SIZE
+            mm[offset:offset + COLUMN_SIZE] = name.encode()[:COLUMN_SIZE].ljust(COLUMN_SIZE, b'\0')
+
+        now = time.time_ns()
+        HEADER.pack_into(
+            mm, 0, b'\0\0\0\0', LAYOUT_VERSION, self.capacity, len(self.columns), 0, os.getpid(), 0, now, now
+        )
+        # magic последним: читатель не увидит табло наполовину созданным
+        mm[0:4] = MAGIC
+
+    def _row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is not None:
+            return row
+
+        row = len(self.rows)
+        if row >= self.capacity:
+            if not self.overflow:
+                file_logger.print_status(
+                    f"⚠️  Табло цен {self.path} заполнено ({self.capacity} токенов), "
+                    f"увеличьте price_board_capacity"
+                )
+            return None
+
+        offset = self.symbols_offset + row * SYMBOL_SIZE
+        self.mm[offset:offset + SYMBOL_SIZE] = symbol.encode()[:SYMBOL_SIZE].ljust(SYMBOL_SIZE, b'\0')
+        self.rows[symbol] = row
+        # счетчик после имени: читатель видит только готовые строки
+        struct.pack_into('<I', self.mm, COUNT_OFFSET, row + 1)
+        return row
+
+    def publish(self, column, prices):
+        """{символ: цена} одного источника -> табло (одна публикация под seqlock табло)"""
+        col = self.column_index.get(column)
+        if col is None or not prices:
+            return
+
+        mm = self.mm
+        columns = len(self.columns)
+        slots = self.slots_offset
+        odd, even = self.seq + 1, self.seq + 2
+        now = time.time_ns()
+
+        struct.pack_into('<Q', mm, SEQ_OFFSET, odd)
+        for symbol, price in prices.items():
+            row = self._row(symbol)
+            if row is None:
+                self.overflow += 1
+                continue
+            self.published += 1
+            offset = slots + (row * columns + col) * SLOT.size
+            struct.pack_into('<Q', mm, offset, odd)
+            struct.pack_into('<Qd', mm, offset + 8, now, price)
+            struct.pack_into('<Q', mm, offset, even)
+        struct.pack_into('<Q', mm, UPDATED_OFFSET, now)
+        struct.pack_into('<Q', mm, SEQ_OFFSET, even)
+
+        self.seq = even
+
+    def publish_symbol(self, symbol, prices):
+        """{источник: цена} одного токена (замер CEX) -> табло"""
+        for column, price in prices.items():
+            if price is not None:
+                self.publish(column, {symbol: price})
+
+    def close(self):
+        """Цены остаются в файле, pid = 0 - писатель остановлен"""
+        if self.mm.closed:
+            return
+        struct.pack_into('<I', self.mm, PID_OFFSET, 0)
+        self.mm.flush()
+        self.mm.close()
+
+    def get_stats(self):
+        return {
+            'symbols': len(self.rows),
+            'capacity': self.capacity,
+            'published': self.published,
+            'overflow': self.overflow,
+            'seq': self.seq,
+        }
@@ -0,0 +1,204 @@
+"""Чтение табло цен бота (price_board.py) из другого процесса.
+
+Только стандартная библиотека: файл можно скопировать в свой проект.
+Табло отображается только на чтение, цены читаются прямо из разделяемой памяти.
+
+    from price_board_reader import PriceBoardReader
+
+    board = PriceBoardReader('/dev/shm/impulse_bot_prices')
+    board.get('BONK')                        # (цена, ts_ns) DEX или None
+    board.get('BONK', 'gateio_spot')
+    prices = board.snapshot()                # {колонка: {символ: (цена, ts_ns)}}, согласованный срез
+    if board.version != last_version: ...    # табло обновилось
+
+    # numpy без копий: np.frombuffer(board.raw_slots(), dtype=[('seq', '<u8'), ('ts_ns', '<u8'),
+    #     ('price', '<f8')]).reshape(board.capacity, len(board.columns))
+
+    python price_board_reader.py /dev/shm/impulse_bot_prices [--watch 1]
+"""
+import argparse
+import mmap
+import struct
+import time
+
+MAGIC = b'IMPB'
+LAYOUT_VERSION = 1
+
+HEADER = struct.Struct('<4sIIIIIQQQ')
+HEADER_SIZE = 64
+COLUMN_SIZE = 16
+SYMBOL_SIZE = 24
+SLOT = struct.Struct('<QQd')
+SEQ = struct.Struct('<Q')
+
+COUNT_OFFSET = 16
+PID_OFFSET = 20
+SEQ_OFFSET = 24
+CREATED_OFFSET = 32
+UPDATED_OFFSET = 40
+
+# сколько раз повторяем чтение, пока писатель публикует
+RETRIES = 1000
+
+
+class BoardChanged(Exception):
+    """Табло пересоздано (перезапуск бота с другим размером) - нужен новый PriceBoardReader"""
+
+
+class PriceBoardReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._load_layout()
+
+    def _load_layout(self):
+        for _ in range(RETRIES):
+            if self.mm[0:4] == MAGIC:
+                break
+            time.sleep(0.001)  # писатель еще создает табло
+        magic, version, capacity, columns, _, _, _, created_ns, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: не табло цен")
+        if version != LAYOUT_VERSION:
+            raise ValueError(f"{self.path}: версия формата {version}, ожидалась {LAYOUT_VERSION}")
+
+        symbols = HEADER_SIZE + columns * COLUMN_SIZE
+        symbols += -symbols % 8
+        slots = symbols + capacity * SYMBOL_SIZE
+        if len(self.mm) < slots + capacity * columns * SLOT.size:
+            raise BoardChanged(self.path)
+
+        self.capacity = capacity
+        self.columns = [
+            self._name(HEADER_SIZE + index * COLUMN_SIZE, COLUMN_SIZE) for index in range(columns)
+        ]
+        self.column_index = {name: index for index, name in enumerate(self.columns)}
+        self.created_ns = created_ns
+        self.symbols_offset = symbols
+        self.slots_offset = slots
+        self.rows = {}
+        self.symbol_list = []
+
+    def _name(self, offset, size):
+        return bytes(self.mm[offset:offset + size]).rstrip(b'\0').decode()
+
+    def _check(self):
+        if struct.unpack_from('<Q', self.mm, CREATED_OFFSET)[0] != self.created_ns or self.mm[0:4] != MAGIC:
+            raise BoardChanged(self.path)
+
+    def _refresh_symbols(self):
+        """Новые строки, появившиеся после прошлого чтения"""
+        count = struct.unpack_from('<I', self.mm, COUNT_OFFSET)[0]
+        for row in range(len(self.symbol_list), min(count, self.capacity)):
+            symbol = self._name(self.symbols_offset + row * SYMBOL_SIZE, SYMBOL_SIZE)
+            self.symbol_list.append(symbol)
+            self.rows[symbol] = row
+
+    # ——————————————————————————————————————————
+    # Состояние
+    # ——————————————————————————————————————————
+
+    @property
+    def version(self):
+        """seq табло: меняется при каждой публикации (нечетный - публикация идет)"""
+        return SEQ.unpack_from(self.mm, SEQ_OFFSET)[0]
+
+    @property
+    def updated_ns(self):
+        return SEQ.unpack_from(self.mm, UPDATED_OFFSET)[0]
+
+    @property
+    def writer_alive(self):
+        return struct.unpack_from('<I', self.mm, PID_OFFSET)[0] != 0
+
+    def symbols(self):
+        self._check()
+        self._refresh_symbols()
+        return list(self.symbol_list)
+
+    # ——————————————————————————————————————————
+    # Цены
+    # ——————————————————————————————————————————
+
+    def _offset(self, row, col):
+        return self.slots_offset + (row * len(self.columns) + col) * SLOT.size
+
+    def get(self, symbol, column='dex'):
+        """(цена, ts_ns) последней публикации или None"""
+        self._check()
+        row = self.rows.get(symbol)
+        if row is None:
+            self._refresh_symbols()
+            row = self.rows.get(symbol)
+            if row is None:
+                return None
+        col = self.column_index.get(column)
+        if col is None:
+            raise KeyError(column)
+
+        offset = self._offset(row, col)
+        for _ in range(RETRIES):
+            seq, ts_ns, price = SLOT.unpack_from(self.mm, offset)
+            if seq & 1 == 0 and SEQ.unpack_from(self.mm, offset)[0] == seq:
+                return (price, ts_ns) if seq else None
+        raise TimeoutError(f"{self.path}: ячейка {symbol}/{column} все время в записи")
+
+    def snapshot(self, columns=None):
+        """{колонка: {символ: (цена, ts_ns)}} из одной версии табло (без цен посреди публикации)"""
+        self._check()
+        names = columns or self.columns
+        cols = [(name, self.column_index[name]) for name in names]
+
+        for _ in range(RETRIES):
+            seq = self.version
+            if seq & 1:
+                time.sleep(0)
+                continue
+            self._refresh_symbols()
+            result = {name: {} for name, _ in cols}
+            for symbol, row in self.rows.items():
+                for name, col in cols:
+                    slot_seq, ts_ns, price = SLOT.unpack_from(self.mm, self._offset(row, col))
+                    if slot_seq:
+                        result[name][symbol] = (price, ts_ns)
+            if self.version == seq:
+                return result
+        raise TimeoutError(f"{self.path}: табло все время в записи")
+
+    def raw_slots(self):
+        """memoryview всех ячеек (capacity x columns x (seq, ts_ns, price)) - без копирования.
+        Согласованность - на стороне вызывающего: сверить version до и после чтения"""
+        return memoryview(self.mm)[self.slots_offset:self.slots_offset + self.capacity * len(self.columns) * SLOT.size]
+
+    def close(self):
+        self.mm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--watch', type=float, help="обновлять каждые N сек")
+    args = parser.parse_args()
+
+    board = PriceBoardReader(args.path)
+    while True:
+        prices = board.snapshot()
+        now = time.time_ns()
+        print(f"\n{'токен':24}" + "".join(f"{name:>18}" for name in board.columns) + f"{'возраст':>10}")
+        for symbol in board.symbols():
+            cells = [prices[name].get(symbol) for name in board.columns]
+            ages = [now - cell[1] for cell in cells if cell]
+            age = f"{min(ages) / 1e9:.1f}s" if ages else "-"
+            print(f"{symbol:24}" + "".join(
+                f"{cell[0]:>18.8g}" if cell else f"{'-':>18}" for cell in cells
+            ) + f"{age:>10}")
+        if not board.writer_alive:
+            print("⚠️  Бот не пишет в табло")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == '__main__':
+    main()
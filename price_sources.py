@@ -0,0 +1,308 @@
+"""Источники цен DEX и хедж-запросы.
+
+Источник умеет одно: пачка [(символ, адрес), ...] -> {символ: цена} или None.
+Сейчас есть DexScreener и Jupiter Price API, порядок задает SETTINGS['dex_sources'].
+
+Хедж: если основной источник не ответил за p95 своей задержки, дублируем запрос
+(следующим источником, а если его нет - тем же через другую прокси) и берем первый
+успешный ответ, проигравший запрос отменяем. Доля хеджей ограничена dex_hedge_budget.
+"""
+import asyncio
+import random
+import time
+
+import aiohttp
+
+import metrics
+from config import SETTINGS
+from logger import file_logger
+from requiest_logger import logger as request_logger, LatencyHistogram
+from scan_scheduler import wait_proxy_slot
+
+DEXSCREENER_HOST = "api.dexscreener.com"
+JUPITER_HOST = "lite-api.jup.ag"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "application/json",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class PriceSource:
+    """Общий GET с лимитером, прокси и логом запросов. Наследники задают url и разбор ответа"""
+
+    name = None
+    host = None
+    batch_size = 1
+
+    def __init__(self, http_client, proxy_pool):
+        self.http_client = http_client
+        self.proxy_pool = proxy_pool
+        self.latency = LatencyHistogram()  # успешные ответы, по ним считаем задержку хеджа
+
+    def url(self, addresses):
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(data, chunk):
+        raise NotImplementedError
+
+    async def fetch(self, session, chunk, attempt=None):
+        """[(символ, адрес), ...] -> {символ: цена} или None при ошибке запроса"""
+        label = chunk[0][0] if len(chunk) == 1 else f"{chunk[0][0]}..{chunk[-1][0]} ({len(chunk)})"
+        addresses = ",".join(address for _, address in chunk)
+        data = await self.request_json(session, self.url(addresses), label, attempt)
+        if data is None:
+            return None
+        return self.parse(data, chunk)
+
+    async def request_json(self, session, url, label, attempt=None):
+        """GET url -> JSON или None. В attempt (если передан) кладем выбранную прокси,
+        чтобы хедж пошел через другую; прокси, уже выбранную в attempt, берем ее"""
+        if attempt and 'proxy' in attempt:
+            proxy_url = attempt['proxy']
+        else:
+            exclude = attempt.get('exclude') if attempt else None
+            proxy_url = self.proxy_pool.acquire(self.host, exclude=exclude)
+            if attempt is not None:
+                attempt['proxy'] = proxy_url
+        rate_limiter = self.http_client.rate_limiter
+
+        # ждем разрешения лимитера, а не получаем 429
+        await rate_limiter.acquire(self.host, proxy_url)
+        start_time = time.time()
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=20)
+
+            async with session.get(
+                url,
+                headers=HEADERS,
+                timeout=timeout,
+                proxy=proxy_url,
+                ssl=False
+            ) as response:
+
+                response_time = time.time() - start_time
+                status_code = int(response.status)
+                self.proxy_pool.report(proxy_url, self.host, status_code, response_time)
+                rate_limiter.feedback(self.host, proxy_url, status_code, response.headers)
+
+                # лог запроса (успех)
+                request_logger.log_request(
+                    url=url,
+                    proxy=proxy_url,
+                    status=status_code,
+                    response_time=response_time
+                )
+
+                if status_code == 200:
+                    return await response.json(content_type=None)
+
+                # Ошибки (403, 429 и т.п.)
+                if status_code == 403 and file_logger.verbose:
+                    file_logger.print_status(f"❌ {self.name} 403 Forbidden - IP не в белом списке")
+
+                return None
+
+        except asyncio.TimeoutError:
+            self._report_error(url, proxy_url, start_time, "TIMEOUT", "Таймаут")
+            if file_logger.verbose:
+                file_logger.print_status(f"⏰ Таймаут {self.name} для {label}")
+            return None
+
+        except aiohttp.ClientProxyConnectionError:
+            self._report_error(url, proxy_url, start_time, "PROXY_ERROR", "Ошибка подключения к прокси")
+            if file_logger.verbose:
+                file_logger.print_status(f"🔌 Ошибка подключения к прокси для {label}")
+            return None
+
+        except Exception as e:
+            self._report_error(url, proxy_url, start_time, "ERROR", str(e))
+            if file_logger.verbose:
+                file_logger.print_status(f"❌ Неизвестная ошибка {self.name} для {label}: {e}")
+            return None
+
+    def _report_error(self, url, proxy_url, start_time, status, error):
+        self.proxy_pool.report(proxy_url, self.host, status)
+        request_logger.log_request(
+            url=url,
+            proxy=proxy_url,
+            status=status,
+            response_time=time.time() - start_time,
+            error=error
+        )
+
+
+class DexScreenerSource(PriceSource):
+    """GET /latest/dex/tokens/{адреса через запятую}"""
+
+    name = 'dexscreener'
+    host = DEXSCREENER_HOST
+    batch_size = 30
+
+    def url(self, addresses):
+        return f"{SETTINGS['api_urls']['dexscreener']}/latest/dex/tokens/{addresses}?r={random.random()}"
+
+    @staticmethod
+    def parse(data, chunk):
+        """Ответ DexScreener на пачку -> {symbol: price}. Пары раскладываем по baseToken.address"""
+        by_address = {address.lower(): symbol for symbol, address in chunk}
+        prices = {}
+
+        # берем первую пару токена
+        for pair in data.get("pairs") or []:
+            base_address = (pair.get("baseToken") or {}).get("address")
+            if not base_address:
+                continue
+
+            symbol = by_address.get(base_address.lower())
+            if symbol is None or symbol in prices:
+                continue
+
+            price_str = pair.get("priceUsd")
+            if price_str:
+                prices[symbol] = float(price_str)
+        return prices
+
+
+class JupiterSource(PriceSource):
+    """GET /price/v2?ids={адреса через запятую} (цена в USDC по маршрутам Jupiter)"""
+
+    name = 'jupiter'
+    host = JUPITER_HOST
+    batch_size = 100
+
+    def url(self, addresses):
+        return f"{SETTINGS['api_urls']['jupiter']}/price/v2?ids={addresses}"
+
+    @staticmethod
+    def parse(data, chunk):
+        items = data.get("data") or {}
+        prices = {}
+        for symbol, address in chunk:
+            price_str = (items.get(address) or {}).get("price")
+            if price_str:
+                prices[symbol] = float(price_str)
+        return prices
+
+
+SOURCES = {source.name: source for source in (DexScreenerSource, JupiterSource)}
+
+
+def create_sources(http_client, proxy_pool, names=None):
+    """Источники по списку имен (по умолчанию SETTINGS['dex_sources']), первый - основной"""
+    names = names or SETTINGS['dex_sources']
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Неизвестные источники цен DEX: {', '.join(unknown)}")
+    return [SOURCES[name](http_client, proxy_pool) for name in names]
+
+
+class HedgedFetcher:
+    """Запрос цен через основной источник с хеджем по p95 его задержки"""
+
+    def __init__(self, sources):
+        self.sources = sources
+        self.primary = sources[0]
+
+        self.requests = 0
+        self.hedged = 0  # сколько раз отправили хедж
+        self.hedge_wins = 0  # хедж ответил первым
+        self.over_budget = 0  # хотели хеджировать, но вышли за бюджет
+        self.effective = LatencyHistogram()  # задержка, которую видит цикл
+        self.wins = {source.name: 0 for source in sources}
+
+    def hedge_delay(self):
+        """Сколько ждем основной источник до хеджа: p95 его ответов, пока замеров мало - стартовое значение"""
+        latency = self.primary.latency
+        if latency.count < SETTINGS['dex_hedge_min_samples']:
+            return SETTINGS['dex_hedge_initial_delay']
+        return max(SETTINGS['dex_hedge_min_delay'], latency.percentile(SETTINGS['dex_hedge_percentile']))
+
+    def _hedge_source(self):
+        # следующий источник, если есть; иначе тот же (с другой прокси)
+        return self.sources[1] if len(self.sources) > 1 else self.primary
+
+    async def _timed(self, source, session, chunk, attempt, censored=False):
+        started = time.monotonic()
+        try:
+            prices = await source.fetch(session, chunk, attempt)
+        except asyncio.CancelledError:
+            # основной запрос отменили (хедж успел раньше или дедлайн цикла): настоящая задержка
+            # не меньше прошедшей - берем ее как оценку снизу, иначе p95 видит только быстрые
+            # ответы, ползет вниз и хедж разгоняет сам себя
+            if censored:
+                source.latency.add(time.monotonic() - started)
+            raise
+        if prices is not None:
+            source.latency.add(time.monotonic() - started)
+        return prices
+
+    async def fetch(self, session, chunk):
+        """[(символ, адрес), ...] -> {символ: цена} или None"""
+        # прокси основного запроса выбираем заранее и ждем ее слот в цикле (scan_start_jitter)
+        # до замеров времени: ожидание слота - не задержка источника и не повод для хеджа
+        proxy = self.primary.proxy_pool.acquire(self.primary.host)
+        await wait_proxy_slot(proxy)
+
+        self.requests += 1
+        started = time.monotonic()
+        attempt = {'proxy': proxy}
+        primary = asyncio.create_task(self._timed(self.primary, session, chunk, attempt, censored=True))
+        tasks = {primary: self.primary}
+
+        try:
+            if SETTINGS['dex_hedge']:
+                done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+                if not done:
+                    if self.hedged < SETTINGS['dex_hedge_budget'] * self.requests:
+                        source = self._hedge_source()
+                        self.hedged += 1
+                        metrics.DEX_HEDGES.inc('fired')
+                        hedge_attempt = {'exclude': attempt.get('proxy')}
+                        hedge = asyncio.create_task(self._timed(source, session, chunk, hedge_attempt))
+                        tasks[hedge] = source
+                    else:
+                        self.over_budget += 1
+
+            # первый успешный ответ; неудачный не считается, ждем оставшийся
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    prices = None if task.exception() else task.result()
+                    if prices is None:
+                        continue
+                    if task is not primary:
+                        self.hedge_wins += 1
+                        metrics.DEX_HEDGES.inc('won')
+                    self.wins[tasks[task].name] += 1
+                    self.effective.add(time.monotonic() - started)
+                    return prices
+            return None
+        finally:
+            # проигравший (или все при отмене снаружи) отменяем
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self):
+        primary_p99 = self.primary.latency.percentile(0.99)
+        effective_p99 = self.effective.percentile(0.99)
+        return {
+            'sources': [source.name for source in self.sources],
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+            'hedge_wins': self.hedge_wins,
+            'over_budget': self.over_budget,
+            'wins': dict(self.wins),
+            'hedge_delay': self.hedge_delay(),
+            'primary_p99': primary_p99,
+            'effective_p50': self.effective.percentile(0.5),
+            'effective_p99': effective_p99,
+            # оценка снизу: медленные ответы основного источника, отмененные хеджем, в p99 не попали
+            'saved_p99': max(0.0, primary_p99 - effective_p99) if primary_p99 and effective_p99 else None,
+        }
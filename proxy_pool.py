@@ -0,0 +1,181 @@
+import random
+import time
+from collections import deque
+
+from config import PROXIES, USE_PROXIES, SETTINGS
+from logger import file_logger
+
+# статусы, после которых прокси сразу уходит в карантин для хоста
+BLOCK_STATUSES = (403, 429)
+# ошибки самой прокси - карантин для всех хостов
+PROXY_ERRORS = ('PROXY_ERROR',)
+# сколько случайных прокси смотрим при выборе
+SAMPLE_SIZE = 8
+
+
+class ProxyHealth:
+    """Здоровье прокси (в целом или для одного хоста)"""
+
+    def __init__(self):
+        self.success = 0
+        self.fail = 0
+        self.ewma_latency = None
+        self.consecutive_failures = 0
+        self.strikes = 0  # сколько раз подряд уходила в карантин
+        self.quarantined_until = 0.0
+        self.recent_blocks = deque()  # время последних 403/429
+
+    def record(self, ok, latency):
+        if ok:
+            self.success += 1
+            self.consecutive_failures = 0
+            self.strikes = 0
+        else:
+            self.fail += 1
+            self.consecutive_failures += 1
+
+        if latency is not None:
+            alpha = SETTINGS['proxy_ewma_alpha']
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+
+    def record_block(self, now):
+        self.recent_blocks.append(now)
+        self._trim_blocks(now)
+
+    def _trim_blocks(self, now):
+        horizon = now - SETTINGS['proxy_block_window']
+        while self.recent_blocks and self.recent_blocks[0] < horizon:
+            self.recent_blocks.popleft()
+
+    def quarantine(self, now):
+        """Экспоненциальный карантин: base, 2*base, 4*base ... до max"""
+        self.strikes += 1
+        cooldown = min(
+            SETTINGS['proxy_cooldown_base'] * 2 ** (self.strikes - 1),
+            SETTINGS['proxy_cooldown_max']
+        )
+        self.quarantined_until = now + cooldown
+        self.consecutive_failures = 0
+        return cooldown
+
+    def is_quarantined(self, now):
+        return now < self.quarantined_until
+
+    def success_rate(self):
+        # сглаживание Лапласа: у новой прокси 50%, а не 0 или 100
+        return (self.success + 1) / (self.success + self.fail + 2)
+
+    def score(self):
+        """Чем меньше, тем лучше: ожидаемая задержка с поправкой на неудачи"""
+        latency = self.ewma_latency if self.ewma_latency is not None else SETTINGS['proxy_default_latency']
+        return latency / self.success_rate()
+
+
+class ProxyPool:
+    """Общий пул прокси для DEX и CEX мониторов.
+    Учитывает успешность, EWMA задержки и 403/429 по каждой прокси и хосту,
+    выбирает быстрые и здоровые, плохие отправляет в карантин"""
+
+    def __init__(self, proxies=None):
+        self.proxies = list(PROXIES if proxies is None else proxies)
+        self.enabled = USE_PROXIES and bool(self.proxies)
+
+        self.health = {proxy: ProxyHealth() for proxy in self.proxies}
+        self.host_health = {}
+
+    def _host(self, proxy, host):
+        key = (proxy, host)
+        health = self.host_health.get(key)
+        if health is None:
+            health = ProxyHealth()
+            self.host_health[key] = health
+        return health
+
+    def _available(self, proxy, host, now):
+        if self.health[proxy].is_quarantined(now):
+            return False
+        return not self._host(proxy, host).is_quarantined(now)
+
+    def _score(self, proxy, host):
+        host_health = self._host(proxy, host)
+        if host_health.success + host_health.fail:
+            return host_health.score()
+        return self.health[proxy].score()
+
+    def acquire(self, host, exclude=None):
+        """Прокси для запроса к host (None - без прокси).
+        exclude - прокси, которую не берем, если есть другие (хедж-запрос)"""
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+
+        # смотрим несколько случайных прокси, а не весь список: O(1) на запрос
+        sample = random.sample(self.proxies, min(SAMPLE_SIZE, len(self.proxies)))
+        candidates = [proxy for proxy in sample if proxy != exclude and self._available(proxy, host, now)]
+
+        if not candidates:
+            candidates = [
+                proxy for proxy in self.proxies if proxy != exclude and self._available(proxy, host, now)
+            ]
+            candidates = random.sample(candidates, min(SAMPLE_SIZE, len(candidates)))
+
+        if not candidates:
+            # все в карантине - берем ту, что выйдет раньше всех
+            return min(
+                self.proxies,
+                key=lambda p: max(self.health[p].quarantined_until, self._host(p, host).quarantined_until)
+            )
+
+        # лучшая из случайной выборки: быстрые в приоритете, но нагрузка не липнет к одной
+        return min(candidates, key=lambda proxy: self._score(proxy, host))
+
+    def report(self, proxy, host, status, latency=None):
+        """Результат запроса через прокси: статус HTTP или строка ошибки (TIMEOUT/ERROR/PROXY_ERROR)"""
+        if not proxy or proxy not in self.health:
+            return
+
+        now = time.monotonic()
+        ok = isinstance(status, int) and status < 400
+        health = self.health[proxy]
+        host_health = self._host(proxy, host)
+
+        health.record(ok, latency if ok else None)
+        host_health.record(ok, latency if ok else None)
+
+        if ok:
+            return
+
+        if status in PROXY_ERRORS:
+            cooldown = health.quarantine(now)
+            file_logger.print_status(f"🚫 Прокси в карантине на {cooldown:.0f} сек (ошибка подключения)")
+        elif status in BLOCK_STATUSES:
+            host_health.record_block(now)
+            cooldown = host_health.quarantine(now)
+            file_logger.print_status(f"🚫 Прокси в карантине для {host} на {cooldown:.0f} сек ({status})")
+        elif host_health.consecutive_failures >= SETTINGS['proxy_max_failures']:
+            host_health.quarantine(now)
+
+    def get_stats(self):
+        """Сводка по пулу"""
+        now = time.monotonic()
+        quarantined = sum(1 for h in self.health.values() if h.is_quarantined(now))
+        host_quarantined = sum(1 for h in self.host_health.values() if h.is_quarantined(now))
+        latencies = sorted(h.ewma_latency for h in self.health.values() if h.ewma_latency is not None)
+
+        for h in self.host_health.values():
+            h._trim_blocks(now)
+
+        return {
+            'total': len(self.proxies),
+            'quarantined': quarantined,
+            'quarantined_for_host': host_quarantined,
+            'recent_blocks': sum(len(h.recent_blocks) for h in self.host_health.values()),
+            'success': sum(h.success for h in self.health.values()),
+            'fail': sum(h.fail for h in self.health.values()),
+            'median_latency': latencies[len(latencies) // 2] if latencies else None,
+            'best_latency': latencies[0] if latencies else None,
+        }
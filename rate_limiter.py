@@ -0,0 +1,157 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+
+from config import SETTINGS
+from logger import file_logger
+
+# заголовки "сколько осталось" и "когда сброс" (общий вид и Gate.io)
+REMAINING_HEADERS = ('X-RateLimit-Remaining', 'X-Gate-RateLimit-Requests-Remain')
+RESET_HEADERS = ('X-RateLimit-Reset', 'X-Gate-RateLimit-Reset-Timestamp')
+
+
+def parse_retry_after(value):
+    """Retry-After: секунды или HTTP дата -> секунды ожидания"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset(value):
+    """Сброс лимита: unix время в мс/сек или секунды до сброса -> секунды ожидания"""
+    try:
+        reset = float(value)
+    except (TypeError, ValueError):
+        return None
+    if reset > 1e12:
+        return max(0.0, reset / 1000 - time.time())
+    if reset > 1e9:
+        return max(0.0, reset - time.time())
+    return reset
+
+
+class TokenBucket:
+    """Ведро токенов с AIMD: на успехах скорость плавно растет, на 429 - падает вдвое.
+    Запросы встают в очередь за разрешением, а не падают"""
+
+    def __init__(self, name, rate, burst, min_rate, max_rate):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        # asyncio.Lock отдает разрешения по очереди (FIFO)
+        self._lock = asyncio.Lock()
+
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+    def on_success(self):
+        # аддитивный рост: примерно +rate_limit_increase запрос/сек за секунду трафика
+        self.rate = min(self.max_rate, self.rate + SETTINGS['rate_limit_increase'] / self.rate)
+
+    def on_throttle(self, wait=None):
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate * SETTINGS['rate_limit_decrease'])
+        self.tokens = 0
+        if wait:
+            self.block_for(wait)
+
+    def block_for(self, wait):
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + min(wait, SETTINGS['rate_limit_max_wait']))
+        self.updated = max(self.updated, self.blocked_until)
+
+
+class RateLimiter:
+    """Лимитеры по хостам (DexScreener, Gate.io, LBank) и, опционально, по прокси"""
+
+    def __init__(self):
+        self.buckets = {}
+
+    def _bucket(self, host, proxy=None):
+        key = (host, proxy if SETTINGS['rate_limit_per_proxy'] else None)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            limits = SETTINGS['rate_limits'].get(host, SETTINGS['rate_limits']['default'])
+            bucket = TokenBucket(
+                host,
+                rate=limits['rate'],
+                burst=limits['burst'],
+                min_rate=limits.get('min_rate', limits['rate'] / 10),
+                max_rate=limits.get('max_rate', limits['rate'] * 2)
+            )
+            self.buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, host, proxy=None):
+        """Ждем разрешения на запрос к host"""
+        await self._bucket(host, proxy).acquire()
+
+    def feedback(self, host, proxy, status, headers=None):
+        """Подстройка по ответу: 429 и заголовки лимитов"""
+        bucket = self._bucket(host, proxy)
+        headers = headers or {}
+
+        if status == 429:
+            wait = parse_retry_after(headers.get('Retry-After'))
+            if wait is None:
+                wait = SETTINGS['rate_limit_default_wait']
+            bucket.on_throttle(wait)
+            file_logger.print_status(
+                f"⏳ Rate Limit {host}: пауза {wait:.1f} сек, скорость {bucket.rate:.2f} запр/сек"
+            )
+            return
+
+        if isinstance(status, int) and status < 400:
+            bucket.on_success()
+
+        # лимит исчерпан, но 429 еще не пришел - ждем сброса заранее
+        for remaining_header, reset_header in zip(REMAINING_HEADERS, RESET_HEADERS):
+            remaining = headers.get(remaining_header)
+            if remaining is not None and remaining.strip() == '0':
+                wait = parse_reset(headers.get(reset_header))
+                if wait:
+                    bucket.block_for(wait)
+
+    def get_stats(self):
+        """Сводка по хостам (лимитеры по прокси складываем в хост)"""
+        stats = {}
+        for (host, _), bucket in self.buckets.items():
+            host_stats = stats.setdefault(host, {'buckets': 0, 'rate': 0.0, 'throttled': 0, 'waited': 0.0})
+            host_stats['buckets'] += 1
+            host_stats['rate'] += bucket.rate
+            host_stats['throttled'] += bucket.throttled
+            host_stats['waited'] += bucket.waited
+        return stats
@@ -0,0 +1,258 @@
+"""Replay / бэктест по записанным ценам: logs/ticks.jsonl (SETTINGS['record_ticks'])
+или база тиков (SETTINGS['tick_store'], файл .sqlite).
+
+Тики DEX идут через детектор импульсов, тики бирж - в таблицу цен, из которой
+трекинг CEX делает замеры. Все на виртуальных часах (clock.SimClock): sleep не ждет,
+прогон идет с максимальной скоростью. Результат - те же impulses.jsonl / cex_comparison.jsonl
+(и колоночные партиции) в отдельной папке.
+
+    python replay.py run logs/ticks.jsonl [--threshold 0.05] [--intervals 5,10,30,60] [--out logs/replay/run]
+    python replay.py run logs/ticks.sqlite
+    python replay.py sweep logs/ticks.jsonl --thresholds 0.02,0.05,0.1 --intervals 5,10,30,60 --intervals 10,60 [--workers 4]
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import clock
+from config import SETTINGS
+from logger import LOGS_DIR, file_logger
+
+REPLAY_DIR = os.path.join(LOGS_DIR, 'replay')
+
+
+def load_ticks(path):
+    """ticks.jsonl или база тиков -> [(ts, source, {token: price}), ...] по времени"""
+    if path.lower().endswith(('.sqlite', '.sqlite3', '.db')):
+        import tick_store
+        store = tick_store.TickStore(path)
+        try:
+            return store.load_replay_ticks()
+        finally:
+            store.close()
+
+    ticks = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                tick = json.loads(line)
+                ticks.append((float(tick['ts']), tick['source'], tick['prices']))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+    ticks.sort(key=lambda tick: tick[0])
+    return ticks
+
+
+def _replay_monitors(ticks):
+    # импорт здесь: модули мониторов читают SETTINGS при создании объектов
+    from cex_monitor import CEXMonitor
+    from dex_monitor import DexMonitor
+    from main import CryptoMonitor
+
+    class ReplayCEXMonitor(CEXMonitor):
+        """CEX монитор без сети: цены из записанных тиков бирж"""
+
+        def __init__(self, listed):
+            super().__init__(None, None)
+            self.stream = None
+            self.listed = listed  # {exchange: токены, встречавшиеся в записи}
+            self.book = {}  # {exchange: {token: последняя цена}}
+
+        async def check_symbol_availability(self, symbol):
+            return {exchange: symbol in tokens for exchange, tokens in self.listed.items()}
+
+        async def sample_cex_prices(self, symbol, available):
+            result = {}
+            for exchange in available:
+                price = self.book.get(exchange, {}).get(symbol)
+                if price:
+                    result[exchange] = price
+            self.cex_prices[symbol] = result
+            return result
+
+    listed = {}
+    for _, source, prices in ticks:
+        if source != 'dex':
+            listed.setdefault(source, set()).update(prices)
+
+    cex_monitor = ReplayCEXMonitor(listed)
+    dex_monitor = DexMonitor(CryptoMonitor._create_detector(), cex_monitor, None, None)
+    return dex_monitor, cex_monitor
+
+
+async def _replay(ticks):
+    dex_monitor, cex_monitor = _replay_monitors(ticks)
+    tracking = []
+    impulses = 0
+
+    for ts, source, prices in ticks:
+        delay = ts - clock.time()
+        if delay > 0:
+            await asyncio.sleep(delay)  # виртуально: часы прыгают к тику, попутно срабатывают замеры CEX
+
+        if source != 'dex':
+            cex_monitor.book.setdefault(source, {}).update(prices)
+            continue
+
+        for symbol, (change, base_price, impulse_price) in dex_monitor._detect_impulses(prices).items():
+            impulses += 1
+            tracking.append(dex_monitor._on_impulse(symbol, change, prices[symbol], base_price, impulse_price))
+
+    # дожидаемся замеров после последних импульсов
+    await asyncio.gather(*tracking, return_exceptions=True)
+    await cex_monitor.close()
+    return impulses
+
+
+def run_replay(ticks_path, out_dir, threshold=None, intervals=None):
+    """Один прогон. Возвращает сводку по результатам в out_dir"""
+    if threshold is not None:
+        SETTINGS['impulse_threshold'] = threshold
+    if intervals is not None:
+        SETTINGS['cex_check_intervals'] = list(intervals)
+    # прогон не пишет в боевую базу тиков и не читает ее в отчете
+    SETTINGS['tick_store'] = None
+    file_logger.set_tick_store(None)
+
+    ticks = load_ticks(ticks_path)
+    if not ticks:
+        raise ValueError(f"Нет тиков в {ticks_path}")
+
+    # папка прогона - только его результаты
+    shutil.rmtree(out_dir, ignore_errors=True)
+    # виртуальные часы не ждут диск: без блокировки очередь логов переполнится и прогон потеряет записи
+    file_logger.set_logs_dir(out_dir, block=True)
+
+    sim_clock = clock.SimClock(ticks[0][0])
+    clock.install(sim_clock)
+    loop = clock.SimEventLoop(sim_clock)
+    try:
+        impulses = loop.run_until_complete(_replay(ticks))
+    finally:
+        loop.close()
+        clock.install(None)
+        file_logger.close()
+
+    return _summarize(out_dir, impulses, ticks, file_logger.writer.dropped)
+
+
+def _summarize(out_dir, impulses, ticks, log_dropped):
+    from stats_analyzer import StatsAnalyzer
+
+    with StatsAnalyzer(out_dir) as analyzer:
+        analyzer.load_impulse_data()
+        analyzer.load_cex_data()
+        opportunities = analyzer.analyze_arbitrage_opportunities()
+
+    return {
+        'threshold': SETTINGS['impulse_threshold'],
+        'intervals': SETTINGS['cex_check_intervals'],
+        'out_dir': out_dir,
+        'ticks': len(ticks),
+        'sim_seconds': ticks[-1][0] - ticks[0][0],
+        'impulses': impulses,
+        'cex_records': len(analyzer.cex_data),
+        'opportunities': sum(len(opps) for opps in opportunities.values()),
+        'opportunity_tokens': len(opportunities),
+        'delays': analyzer.calculate_average_delays(),
+        'log_dropped': log_dropped,  # записей логов потеряно (с block=True всегда 0)
+    }
+
+
+def _run_dir(out_root, threshold, intervals):
+    return os.path.join(out_root, f"t{threshold:g}_i{'-'.join(str(i) for i in intervals)}")
+
+
+def _sweep_worker(ticks_path, out_dir, threshold, intervals):
+    # в воркерах консоль не нужна - только сводка
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return run_replay(ticks_path, out_dir, threshold, intervals)
+
+
+def sweep(ticks_path, thresholds, interval_sets, out_root=REPLAY_DIR, workers=None):
+    """Сетка параметров в отдельных процессах. Сводка по всем прогонам -> out_root/sweep.jsonl"""
+    grid = list(itertools.product(thresholds, interval_sets))
+    results = []
+
+    # spawn: у родителя уже работает поток логгера, fork с потоками небезопасен
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(_sweep_worker, ticks_path, _run_dir(out_root, t, iv), t, iv): (t, iv)
+            for t, iv in grid
+        }
+        for future in as_completed(futures):
+            threshold, intervals = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                file_logger.print_status(f"❌ Прогон {threshold} / {intervals}: {e}")
+                continue
+            results.append(summary)
+            file_logger.print_status(
+                f"✅ порог {threshold:g}, интервалы {intervals}: импульсов {summary['impulses']}, "
+                f"замеров CEX {summary['cex_records']}, возможностей {summary['opportunities']}"
+            )
+            if summary['log_dropped']:
+                file_logger.print_status(
+                    f"⚠️  Прогон {threshold} / {intervals}: потеряно записей логов {summary['log_dropped']}"
+                )
+
+    results.sort(key=lambda r: (r['threshold'], r['intervals']))
+    os.makedirs(out_root, exist_ok=True)
+    with open(os.path.join(out_root, 'sweep.jsonl'), 'w', encoding='utf-8') as f:
+        for summary in results:
+            f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+    return results
+
+
+def _parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay записанных цен на виртуальных часах")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="один прогон")
+    run_parser.add_argument('ticks')
+    run_parser.add_argument('--threshold', type=float)
+    run_parser.add_argument('--intervals', type=lambda v: _parse_list(v, int))
+    run_parser.add_argument('--out', default=os.path.join(REPLAY_DIR, 'run'))
+
+    sweep_parser = commands.add_parser('sweep', help="сетка параметров в нескольких процессах")
+    sweep_parser.add_argument('ticks')
+    sweep_parser.add_argument('--thresholds', type=lambda v: _parse_list(v, float), required=True)
+    sweep_parser.add_argument('--intervals', type=lambda v: _parse_list(v, int), action='append')
+    sweep_parser.add_argument('--out', default=REPLAY_DIR)
+    sweep_parser.add_argument('--workers', type=int)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        summary = run_replay(args.ticks, args.out, args.threshold, args.intervals)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    interval_sets = args.intervals or [SETTINGS['cex_check_intervals']]
+    results = sweep(args.ticks, args.thresholds, interval_sets, args.out, args.workers)
+
+    print(f"\n{'порог':>8} {'интервалы':>16} {'импульсы':>9} {'замеры':>8} {'возможности':>12}")
+    for r in results:
+        intervals = ','.join(str(i) for i in r['intervals'])
+        print(
+            f"{r['threshold']:>8g} {intervals:>16} {r['impulses']:>9} "
+            f"{r['cex_records']:>8} {r['opportunities']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
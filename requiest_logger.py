@@ -1,12 +1,96 @@
 import time
 import json
+import math
+from collections import deque
 from datetime import datetime
+from urllib.parse import urlsplit
+
+from config import SETTINGS
+from logger import file_logger
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с логарифмическими корзинами.
+    Память и расчет перцентилей не зависят от числа запросов"""
+
+    MIN_LATENCY = 0.001  # 1 мс - нижняя граница первой корзины
+    GROWTH = 2 ** 0.25  # шаг корзин ~19%
+    BUCKETS = 72  # до ~4 минут, дальше все в последнюю корзину
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        if latency <= self.MIN_LATENCY:
+            bucket = 0
+        else:
+            bucket = int(math.log(latency / self.MIN_LATENCY, self.GROWTH)) + 1
+            bucket = min(bucket, self.BUCKETS - 1)
+
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def upper_bound(self, bucket):
+        return self.MIN_LATENCY * self.GROWTH ** bucket
+
+    def percentile(self, q):
+        """Верхняя граница корзины, в которую попадает q-й перцентиль (0..1)"""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class RequestStats:
+    """Счетчики и задержки по одному хосту или прокси"""
+
+    def __init__(self):
+        self.success = 0
+        self.fail = 0
+        self.statuses = {}
+        self.latency = LatencyHistogram()
+
+    def add(self, status, response_time, success):
+        if success:
+            self.success += 1
+        else:
+            self.fail += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if response_time is not None:
+            self.latency.add(response_time)
+
+    @property
+    def total(self):
+        return self.success + self.fail
+
 
 class RequestLogger:
     def __init__(self):
-        self.requests = []
+        # только последние запросы, старые вытесняются
+        self.requests = deque(maxlen=SETTINGS['request_log_size'])
         self.success_count = 0
         self.fail_count = 0
+        self.total_count = 0
+
+        self.latency = LatencyHistogram()
+        self.by_host = {}
+        self.by_proxy = {}
         
     def log_request(self, url, proxy, method="GET", status=None, response_time=None, error=None):
         """Логируем детали запроса"""
@@ -24,25 +108,44 @@ class RequestLogger:
         
         self.requests.append(request_info)
         
-        # Выводим в консоль
-        self._print_request(request_info)
+        # Выводим в консоль (только в подробном режиме)
+        if file_logger.verbose:
+            self._print_request(request_info)
         
-        # Обновляем счетчики (ФИКС: обрабатываем строковые статусы)
-        if status == 200 or status == '200' or status == 'success':
+        # Обновляем счетчики
+        success = self._is_success(status)
+        self.total_count += 1
+        if success:
             self.success_count += 1
-        elif status is not None and status != 'TIMEOUT' and status != 'ERROR' and status != 'PROXY_ERROR':
-            # Если статус не None и не строковая ошибка, считаем неудачей
+        else:
+            self.fail_count += 1
+
+        if response_time is not None:
+            self.latency.add(response_time)
+
+        host = urlsplit(url).hostname or url
+        if host not in self.by_host:
+            self.by_host[host] = RequestStats()
+        self.by_host[host].add(status, response_time, success)
+
+        proxy_key = request_info['proxy']
+        if proxy_key not in self.by_proxy:
+            self.by_proxy[proxy_key] = RequestStats()
+        self.by_proxy[proxy_key].add(status, response_time, success)
+
+    @staticmethod
+    def _is_success(status):
+        """Успех/неудача по статусу (ФИКС: обрабатываем строковые статусы)"""
+        if status == 200 or status == '200' or status == 'success':
+            return True
+        if status is not None and status != 'TIMEOUT' and status != 'ERROR' and status != 'PROXY_ERROR':
+            # Если статус не None и не строковая ошибка, смотрим на код
             try:
-                status_int = int(status)
-                if status_int >= 400:
-                    self.fail_count += 1
-                else:
-                    self.success_count += 1
+                return int(status) < 400
             except (ValueError, TypeError):
                 # Если не можем преобразовать в число, считаем неудачей
-                self.fail_count += 1
-        else:
-            self.fail_count += 1
+                return False
+        return False
             
     def _safe_proxy_display(self, proxy):
         """Безопасное отображение прокси (скрываем пароль)"""
@@ -132,11 +235,30 @@ class RequestLogger:
         print(f"\n📊 СТАТИСТИКА ЗАПРОСОВ:")
         print(f"   Успешных: {self.success_count}")
         print(f"   Неудачных: {self.fail_count}")
-        print(f"   Всего: {len(self.requests)}")
+        print(f"   Всего: {self.total_count}")
         
-        if self.requests:
-            success_rate = (self.success_count / len(self.requests)) * 100
+        if self.total_count:
+            success_rate = (self.success_count / self.total_count) * 100
             print(f"   Успешность: {success_rate:.1f}%")
 
+        if self.latency.count:
+            print(f"   Задержка: {self._format_latency(self.latency)}")
+            for host, stats in self.by_host.items():
+                print(
+                    f"   {host:25} {stats.success}/{stats.total} | "
+                    f"{self._format_latency(stats.latency)}"
+                )
+
+    @staticmethod
+    def _format_latency(histogram):
+        if not histogram.count:
+            return "нет данных"
+        return (
+            f"p50 {histogram.percentile(0.5):.2f}s | "
+            f"p90 {histogram.percentile(0.9):.2f}s | "
+            f"p99 {histogram.percentile(0.99):.2f}s | "
+            f"max {histogram.max:.2f}s"
+        )
+
 # Глобальный логгер
 logger = RequestLogger()
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import random
+import time
+
+import metrics
+from requiest_logger import LatencyHistogram
+
+# что делать, если цикл не уложился в период
+OVERRUN_POLICIES = ('skip', 'catch_up', 'overlap')
+
+# (планировщик, время тика) идущего цикла: задачи цикла получают его из контекста
+_current_tick = contextvars.ContextVar('scan_tick', default=None)
+
+
+async def wait_proxy_slot(proxy):
+    """Запрос цикла через proxy стартует не раньше тика + сдвига этой прокси (jitter).
+    Вне цикла планировщика (replay, хедж, CEX) не ждем"""
+    tick = _current_tick.get()
+    if tick is None:
+        return
+    scheduler, due = tick
+    delay = due + scheduler.proxy_offset(proxy) - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+class ScanScheduler:
+    """Запуск циклов сканирования по сетке monotonic времени: origin + N * period.
+    Медленный цикл не сдвигает следующие тики, а пропущенные тики считаются.
+    skip - пропущенные тики выкидываем, ждем следующий по сетке;
+    catch_up - пропущенные тики прогоняем подряд (не больше overrun_cap);
+    overlap - цикл стартует на каждом тике, даже если прошлый не закончился (не больше overrun_cap одновременно).
+    jitter - у каждой прокси свой случайный сдвиг от тика (один на весь запуск): ее запросы цикла ждут
+    его в wait_proxy_slot, и прокси не бьют в API синхронно"""
+
+    def __init__(self, period, policy='skip', overrun_cap=1, jitter=0.0):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Неизвестная политика перегрузки: {policy}")
+        self.period = period
+        self.policy = policy
+        self.overrun_cap = max(1, overrun_cap)
+        self.jitter = jitter  # максимальный сдвиг слотов прокси от тика (сек)
+        self.proxy_offsets = {}  # прокси (None - без прокси) -> сдвиг
+
+        self.running = False
+        self.origin = None
+        self.started = None
+        self._inflight = set()
+        self._error = None
+
+        self.durations = LatencyHistogram()
+        self.lateness = LatencyHistogram()
+        self.ticks = 0
+        self.runs = 0
+        self.skipped = 0
+
+    def _due(self, tick):
+        return self.origin + tick * self.period
+
+    def proxy_offset(self, proxy):
+        """Сдвиг слотов прокси от тика: случайный, но постоянный, не больше периода"""
+        offset = self.proxy_offsets.get(proxy)
+        if offset is None:
+            offset = random.uniform(0, min(self.jitter, self.period)) if self.jitter else 0.0
+            self.proxy_offsets[proxy] = offset
+        return offset
+
+    async def run(self, cycle):
+        """Гоняем cycle() по сетке до stop()"""
+        self.running = True
+        self.started = time.monotonic()
+        self.origin = self.started
+        tick = 0
+
+        while self.running:
+            due = self._due(tick)
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not self.running:
+                break
+
+            self.ticks += 1
+            self._reap()
+
+            if self.policy == 'overlap':
+                if len(self._inflight) >= self.overrun_cap:
+                    self.skipped += 1
+                    metrics.SCAN_SKIPPED_TICKS.inc()
+                else:
+                    self.lateness.add(time.monotonic() - due)
+                    task = asyncio.create_task(self._run_cycle(cycle, due))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._cycle_done)
+                tick += 1
+                continue
+
+            self.lateness.add(time.monotonic() - due)
+            await self._run_cycle(cycle, due)
+            tick += 1
+
+            # сколько тиков сетки уже прошло, пока шел цикл
+            behind = time.monotonic() - self._due(tick)
+            if behind > 0:
+                missed = int(behind // self.period) + 1
+                allowed = 0 if self.policy == 'skip' else min(missed, self.overrun_cap)
+                self.skipped += missed - allowed
+                metrics.SCAN_SKIPPED_TICKS.inc(amount=missed - allowed)
+                self.ticks += missed - allowed
+                tick += missed - allowed
+
+    async def _run_cycle(self, cycle, due):
+        start = time.monotonic()
+        token = _current_tick.set((self, due))
+        try:
+            await cycle()
+        finally:
+            _current_tick.reset(token)
+            duration = time.monotonic() - start
+            self.runs += 1
+            self.durations.add(duration)
+            metrics.SCAN_CYCLE_SECONDS.observe(duration)
+
+    def _cycle_done(self, task):
+        self._inflight.discard(task)
+        if not task.cancelled() and task.exception() is not None and self._error is None:
+            self._error = task.exception()
+
+    def _reap(self):
+        # ошибку параллельного цикла поднимаем в основной цикл, как и в последовательном режиме
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def stop(self):
+        self.running = False
+
+    async def close(self):
+        self.stop()
+        for task in self._inflight:
+            task.cancel()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def get_stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return {
+            'ticks': self.ticks,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'rate': self.runs / elapsed if elapsed else 0.0,  # фактических циклов в секунду
+            'target_rate': 1 / self.period,
+            'duration_p50': self.durations.percentile(0.5),
+            'duration_p99': self.durations.percentile(0.99),
+            'duration_max': self.durations.max,
+            'lateness_p50': self.lateness.percentile(0.5),
+            'lateness_p99': self.lateness.percentile(0.99),
+        }
+
@@ -0,0 +1,350 @@
+"""Шардированное сканирование DEX: TOKENS делится между процессами.
+
+Каждый шард - отдельный процесс со своим event loop, DexMonitor, детектором и срезом прокси,
+так что разбор JSON и детектор грузят разные ядра. Импульсы, сводки циклов и цены для replay
+уходят по pipe координатору (CryptoMonitor в главном процессе), которому принадлежат
+CEXMonitor, логи и консоль. Включается SETTINGS['shards'] > 1.
+
+Лимиты запросов по хостам (rate_limits) делятся между шардами поровну, так что вместе
+они не превышают настроенный бюджет. HTTP метрики шардов (задержка и статусы запросов,
+хеджи) приходят приращениями в сводке цикла и попадают в /metrics координатора.
+
+Сообщения - короткие кортежи (pickle через multiprocessing.Connection):
+    шард -> координатор: ('impulse', ...), ('ticks', ...), ('cycle', ...), ('error', ...), ('final', ...)
+    координатор -> шард: ('tokens', TokenChanges), ('stop',)
+"""
+import asyncio
+import multiprocessing
+import signal
+import time
+
+import metrics
+from config import TOKENS, SETTINGS, PROXIES
+from dex_monitor import DexMonitor
+from http_client import HttpClient
+from logger import file_logger
+from proxy_pool import ProxyPool
+from requiest_logger import logger as request_logger
+from scan_scheduler import ScanScheduler
+from token_universe import TokenChanges
+
+# сколько ждем финальную статистику шардов после stop (сек)
+STOP_TIMEOUT = 15
+
+
+def partition_tokens(tokens, count):
+    """{символ: адрес} -> count словарей, токены раскладываем по кругу (шарды равные по размеру)"""
+    items = list(tokens.items())
+    return [dict(items[index::count]) for index in range(count)]
+
+
+def partition_proxies(proxies, count):
+    """Срез прокси на шард. Если прокси меньше, чем шардов, шарды делят общий список"""
+    proxies = list(proxies)
+    if len(proxies) < count:
+        return [list(proxies) for _ in range(count)]
+    return [proxies[index::count] for index in range(count)]
+
+
+def shard_rate_limits(rate_limits, count, shared_proxies):
+    """Лимиты на шард: общий бюджет хоста / count. Лимиты на прокси не трогаем,
+    если у каждого шарда свои прокси (rate_limit_per_proxy и прокси не делятся)"""
+    if SETTINGS['rate_limit_per_proxy'] and not shared_proxies:
+        return rate_limits
+    scaled = {}
+    for host, limits in rate_limits.items():
+        limits = dict(limits)
+        for key in ('rate', 'max_rate', 'min_rate'):
+            if key in limits:
+                limits[key] = limits[key] / count
+        # меньше одного токена ведро не выдаст ни одного запроса
+        limits['burst'] = max(1, limits['burst'] / count)
+        scaled[host] = limits
+    return scaled
+
+
+def merge_rate_limits(*stats):
+    """Складывает сводки RateLimiter.get_stats() из нескольких процессов"""
+    merged = {}
+    for host_stats in stats:
+        for host, limits in host_stats.items():
+            total = merged.setdefault(host, {'buckets': 0, 'rate': 0.0, 'throttled': 0, 'waited': 0.0})
+            for key in total:
+                total[key] += limits[key]
+    return merged
+
+
+class ShardDexMonitor(DexMonitor):
+    """DexMonitor шарда: вместо логов и трекинга CEX шлет события координатору"""
+
+    def __init__(self, index, connection, impulse_detector, http_client, proxy_pool):
+        super().__init__(impulse_detector, None, http_client, proxy_pool)
+        self.index = index
+        self.connection = connection
+        self.total_impulses = 0
+
+    def _publish_prices(self, prices, cex=True):
+        # табло и запись тиков у координатора
+        if SETTINGS['price_board'] or SETTINGS['record_ticks'] or SETTINGS['tick_store']:
+            self.connection.send(('ticks', self.index, prices))
+
+    def _on_impulse(self, symbol, impulse, price, base_price, impulse_price, window=None):
+        if window is None and hasattr(self.impulse_detector, 'get_impulse_window'):
+            window = self.impulse_detector.get_impulse_window(symbol)
+        self.total_impulses += 1
+        self.connection.send(('impulse', symbol, impulse, price, base_price, impulse_price, window))
+
+
+def _shard_stats(dex_monitor, scheduler, http_client, proxy_pool):
+    return {
+        'tokens': len(TOKENS),
+        'impulses': dex_monitor.total_impulses,
+        'scan': scheduler.get_stats(),
+        'requests': {
+            'total': request_logger.total_count,
+            'success': request_logger.success_count,
+            'fail': request_logger.fail_count,
+            'p50': request_logger.latency.percentile(0.5),
+            'p99': request_logger.latency.percentile(0.99),
+        },
+        'rate_limits': http_client.rate_limiter.get_stats(),
+        'hedge': dex_monitor.price_fetcher.get_stats(),
+        'proxies': proxy_pool.get_stats() if proxy_pool.enabled else None,
+        'metrics': metrics.drain(),
+    }
+
+
+async def _run_shard(index, proxies, connection):
+    from main import CryptoMonitor
+
+    http_client = HttpClient()
+    proxy_pool = ProxyPool(proxies)
+    dex_monitor = ShardDexMonitor(
+        index, connection, CryptoMonitor._create_detector(), http_client, proxy_pool
+    )
+    scheduler = ScanScheduler(
+        SETTINGS['scan_frequency'],
+        policy=SETTINGS['scan_overrun_policy'],
+        overrun_cap=SETTINGS['scan_overrun_cap'],
+        jitter=SETTINGS['scan_start_jitter']
+    )
+
+    pending_changes = []
+
+    async def cycle():
+        # изменения списка токенов применяем только между циклами
+        for changes in pending_changes:
+            changes.apply_to(TOKENS)
+            dex_monitor.update_tokens(changes)
+        pending_changes.clear()
+
+        start = time.monotonic()
+        await dex_monitor.monitor_all_tokens()
+        summary = dict(dex_monitor.last_cycle)
+        summary['duration'] = time.monotonic() - start
+        summary['tokens'] = len(TOKENS)
+        summary['skipped'] = scheduler.skipped
+        summary['requests_ok'] = request_logger.success_count
+        summary['requests_fail'] = request_logger.fail_count
+        summary['metrics'] = metrics.drain()
+        connection.send(('cycle', index, summary))
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(scheduler.run(cycle))
+
+    def on_message():
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            message = ('stop',)  # координатор пропал - тоже останавливаемся
+        if message[0] == 'tokens':
+            pending_changes.append(message[1])
+        elif message[0] == 'stop':
+            loop.remove_reader(connection.fileno())
+            task.cancel()
+
+    loop.add_reader(connection.fileno(), on_message)
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        connection.send(('error', index, f"{type(e).__name__}: {e}"))
+    finally:
+        await scheduler.close()
+        await http_client.close()
+
+    connection.send(('final', index, _shard_stats(dex_monitor, scheduler, http_client, proxy_pool)))
+
+
+def _shard_main(index, tokens, proxies, settings, connection):
+    """Точка входа процесса шарда"""
+    # Ctrl+C ловит координатор и присылает stop, иначе шарды не успеют отдать статистику
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    SETTINGS.update(settings)
+    TOKENS.clear()
+    TOKENS.update(tokens)
+    # консоль и логи у координатора
+    file_logger.set_console_mode('silent')
+
+    try:
+        asyncio.run(_run_shard(index, proxies, connection))
+    except (BrokenPipeError, EOFError):
+        pass
+    finally:
+        connection.close()
+        file_logger.close()
+
+
+class ShardPool:
+    """Процессы-шарды со стороны координатора: запуск, прием событий, остановка, сводка"""
+
+    def __init__(self, count, on_impulse, on_cycle, on_ticks):
+        self.count = count
+        self.on_impulse = on_impulse  # (symbol, impulse, price, base_price, impulse_price, window)
+        self.on_cycle = on_cycle  # (index, сводка цикла)
+        self.on_ticks = on_ticks  # (index, {symbol: price})
+
+        self.processes = []
+        self.connections = []
+        self.tokens = []
+        self.cycles = [0] * count
+        self.final = {}
+        self.errors = []
+        self._done = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._done = loop.create_future()
+        self.tokens = partition_tokens(TOKENS, self.count)
+        proxies = partition_proxies(PROXIES, self.count)
+        settings = dict(SETTINGS)
+        settings['rate_limits'] = shard_rate_limits(
+            SETTINGS['rate_limits'], self.count, shared_proxies=len(PROXIES) < self.count
+        )
+
+        # spawn: у координатора уже работает поток логгера, fork с потоками небезопасен
+        context = multiprocessing.get_context('spawn')
+        for index in range(self.count):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_shard_main,
+                args=(index, self.tokens[index], proxies[index], settings, child),
+                name=f"shard-{index}",
+                daemon=True
+            )
+            process.start()
+            child.close()
+            self.processes.append(process)
+            self.connections.append(parent)
+            loop.add_reader(parent.fileno(), self._on_readable, index)
+
+    async def run(self):
+        """Запускает шарды и ждет, пока все не отдадут финальную статистику (после stop)"""
+        if self._done is None:
+            self.start()
+        await asyncio.shield(self._done)
+
+    def _on_readable(self, index):
+        connection = self.connections[index]
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            # процесс шарда умер, не прислав final
+            self._finish(index, None)
+            return
+
+        kind = message[0]
+        if kind == 'impulse':
+            self.on_impulse(*message[1:])
+        elif kind == 'cycle':
+            self.cycles[index] += 1
+            metrics.merge(message[2].pop('metrics', {}))
+            self.on_cycle(index, message[2])
+        elif kind == 'ticks':
+            self.on_ticks(index, message[2])
+        elif kind == 'error':
+            self.errors.append((index, message[2]))
+            file_logger.print_status(f"❌ Шард {index}: {message[2]}")
+        elif kind == 'final':
+            metrics.merge(message[2].pop('metrics', {}))
+            self._finish(index, message[2])
+
+    def _finish(self, index, stats):
+        if index in self.final:
+            return
+        asyncio.get_running_loop().remove_reader(self.connections[index].fileno())
+        self.final[index] = stats
+        if stats is None:
+            file_logger.print_status(f"❌ Шард {index} завершился без статистики")
+        if len(self.final) == self.count and not self._done.done():
+            self._done.set_result(None)
+
+    def update_tokens(self, changes):
+        """Раскладываем изменения списка токенов: удаленные - шарду-владельцу, новые - самому маленькому шарду"""
+        per_shard = [TokenChanges() for _ in range(self.count)]
+        for symbol in changes.removed:
+            for index, tokens in enumerate(self.tokens):
+                if symbol in tokens:
+                    del tokens[symbol]
+                    per_shard[index].removed.append(symbol)
+                    break
+        for symbol, address in changes.added.items():
+            index = min(range(self.count), key=lambda i: len(self.tokens[i]))
+            self.tokens[index][symbol] = address
+            per_shard[index].added[symbol] = address
+
+        for index, shard_changes in enumerate(per_shard):
+            if not shard_changes or index in self.final:
+                continue
+            try:
+                self.connections[index].send(('tokens', shard_changes))
+            except (BrokenPipeError, OSError):
+                self._finish(index, None)
+
+    def stop(self):
+        for index, connection in enumerate(self.connections):
+            if index in self.final:
+                continue
+            try:
+                connection.send(('stop',))
+            except (BrokenPipeError, OSError):
+                self._finish(index, None)
+
+    async def close(self):
+        """stop + ждем финальную статистику, зависшие шарды снимаем"""
+        if self._done is None:
+            return
+        self.stop()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._done), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            for index in range(self.count):
+                self._finish(index, None)
+
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for connection in self.connections:
+            connection.close()
+
+    def get_stats(self):
+        """Сводка по шардам + общие суммы"""
+        shards = {index: stats for index, stats in self.final.items() if stats is not None}
+        requests = [stats['requests'] for stats in shards.values()]
+        return {
+            'shards': shards,
+            'tokens': sum(len(tokens) for tokens in self.tokens),
+            'impulses': sum(stats['impulses'] for stats in shards.values()),
+            'requests': sum(r['total'] for r in requests),
+            'requests_success': sum(r['success'] for r in requests),
+            'requests_fail': sum(r['fail'] for r in requests),
+            'rate_limits': merge_rate_limits(*(stats['rate_limits'] for stats in shards.values())),
+            'hedged': sum(stats['hedge']['hedged'] for stats in shards.values()),
+            'hedge_wins': sum(stats['hedge']['hedge_wins'] for stats in shards.values()),
+            'errors': list(self.errors),
+        }
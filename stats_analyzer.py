@@ -1,122 +1,184 @@
-import json
-from collections import defaultdict
 import os
 
+import numpy as np
+
+import columnar
+from config import SETTINGS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+
+
 class StatsAnalyzer:
-    def __init__(self):
-        self.impulse_data = []
-        self.cex_data = []
-    
-    def load_impulse_data(self, filename='logs/impulses.jsonl'):
+    """Отчет по колоночным партициям logs/columnar (схема в columnar.py).
+    Строки JSONL, которых нет в партициях (логи до конвертации), читаем через конвертер.
+    С базой тиков (SETTINGS['tick_store']) - еще и что было с ценой DEX после импульса"""
+
+    def __init__(self, logs_dir=LOGS_DIR, tick_store_path=None):
+        self.logs_dir = logs_dir
+        self.impulse_data = np.zeros(0, dtype=columnar.IMPULSE_DTYPE)
+        self.cex_data = np.zeros(0, dtype=columnar.CEX_DTYPE)
+
+        self.tick_store = None
+        tick_store_path = tick_store_path or SETTINGS['tick_store']
+        if tick_store_path and os.path.exists(tick_store_path):
+            import tick_store
+            self.tick_store = tick_store.TickStore(tick_store_path)
+
+    def close(self):
+        """Закрывает соединение с базой тиков"""
+        if self.tick_store is not None:
+            self.tick_store.close()
+            self.tick_store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_table(self, table):
+        """Партиции + строки JSONL, которых в партициях нет"""
+        rows = columnar.load_table(self.logs_dir, table)
+        pending = columnar.pending_rows(self.logs_dir, table)
+        if len(rows) and len(pending):
+            print(
+                f"⚠️  {columnar.JSONL_FILES[table]}: {len(pending)} строк нет в партициях, "
+                f"перенесите их: python columnar.py convert"
+            )
+        return np.concatenate([rows, pending])
+
+    def load_impulse_data(self):
         try:
-            if not os.path.exists(filename):
-                print("Файл с импульсами не найден")
-                return
-                
-            with open(filename, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        data = json.loads(line)
-                        self.impulse_data.append(data)
+            self.impulse_data = self._load_table('impulses')
             print(f"📈 Загружено импульсов: {len(self.impulse_data)}")
         except Exception as e:
             print(f"Ошибка загрузки импульсов: {e}")
-    
-    def load_cex_data(self, filename='logs/cex_comparison.jsonl'):
+
+    def load_cex_data(self):
         try:
-            if not os.path.exists(filename):
-                print("Файл с CEX данными не найден")
-                return
-                
-            with open(filename, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        data = json.loads(line)
-                        self.cex_data.append(data)
+            self.cex_data = self._load_table('cex')
             print(f"📊 Загружено CEX записей: {len(self.cex_data)}")
         except Exception as e:
             print(f"Ошибка загрузки CEX данных: {e}")
-    
-    def analyze_arbitrage_opportunities(self):
-        opportunities = defaultdict(list)
-        
-        for cex_record in self.cex_data:
-            token = cex_record['token']
-            
-            if 'cex_data' in cex_record:
-                for exchange, data in cex_record['cex_data'].items():
-                    if abs(data['change_from_base']) >= 0.02:  # 2% порог
-                        opportunities[token].append({
-                            'exchange': exchange,
-                            'interval': cex_record['interval_sec'],
-                            'difference': data['change_from_base'],
-                            'cex_price': data['price'],
-                            'dex_price': cex_record['base_price'],
-                            'timestamp': cex_record['time']
-                        })
-        
+
+    def analyze_arbitrage_opportunities(self, threshold=0.02):
+        """{token: записи CEX, где отклонение от базовой цены >= threshold}"""
+        data = self.cex_data
+        hits = data[np.abs(data['change_from_base']) >= threshold]
+
+        opportunities = {}
+        if not len(hits):
+            return opportunities
+
+        # сортировка по токену и разрезание на группы без цикла по строкам
+        hits = hits[np.argsort(hits['token'], kind='stable')]
+        tokens, starts = np.unique(hits['token'], return_index=True)
+        for token, group in zip(tokens, np.split(hits, starts[1:])):
+            opportunities[token.decode()] = group
         return opportunities
-    
-    def calculate_average_delays(self):
-        delays = defaultdict(list)
-        
-        for cex_record in self.cex_data:
-            token = cex_record['token']
-            interval = cex_record['interval_sec']
-            
-            if 'cex_data' in cex_record:
-                for exchange, data in cex_record['cex_data'].items():
-                    if abs(data['change_from_base']) >= 0.01:
-                        delays[exchange].append(interval)
-        
+
+    def calculate_average_delays(self, threshold=0.01):
+        """Медианный интервал (сек), на котором биржа отклонилась от базы на >= threshold"""
+        data = self.cex_data
+        moved = data[np.abs(data['change_from_base']) >= threshold]
+
         avg_delays = {}
-        for exchange, delay_list in delays.items():
-            if delay_list:
-                sorted_delays = sorted(delay_list)
-                avg_delays[exchange] = sorted_delays[len(sorted_delays) // 2]
-        
+        for exchange in np.unique(moved['exchange']):
+            intervals = np.sort(moved['interval'][moved['exchange'] == exchange])
+            avg_delays[exchange.decode()] = int(intervals[len(intervals) // 2])
         return avg_delays
-    
+
+    def count_cex_checks(self):
+        """Число замеров CEX (строк на биржу может быть несколько на один замер)"""
+        data = self.cex_data
+        if not len(data):
+            return 0
+        checks = np.unique(data[['ts', 'token', 'interval']])
+        return len(checks)
+
+    def impulse_follow_through(self, horizons=(10, 60, 300)):
+        """Цена DEX через horizon сек после импульса (по базе тиков):
+        {horizon: {'count', 'median_change', 'continued'}}, continued - доля, где движение продолжилось"""
+        if self.tick_store is None or not len(self.impulse_data):
+            return {}
+
+        result = {}
+        for horizon in horizons:
+            changes, directions = [], []
+            for impulse in self.impulse_data:
+                if impulse['impulse_price'] <= 0:
+                    continue
+                price = self.tick_store.price_at(impulse['token'].decode(), impulse['ts'] + horizon)
+                if price is None:
+                    continue
+                changes.append(price / impulse['impulse_price'] - 1)
+                directions.append(np.sign(impulse['change']))
+            if not changes:
+                continue
+            changes = np.array(changes)
+            result[horizon] = {
+                'count': len(changes),
+                'median_change': float(np.median(changes)),
+                'continued': float(np.mean(np.sign(changes) == np.array(directions))),
+            }
+        return result
+
     def generate_report(self):
         self.load_impulse_data()
         self.load_cex_data()
-        
+
         print("\n" + "="*60)
         print("ОТЧЕТ ПО СТАТИСТИКЕ АРБИТРАЖА")
         print("="*60)
-        
+
         print(f"📈 Всего импульсов: {len(self.impulse_data)}")
         print(f"📊 Всего CEX записей: {len(self.cex_data)}")
-        
+
         # Анализ CEX данных
-        if self.cex_data:
-            total_cex_checks = sum(1 for record in self.cex_data if 'cex_data' in record)
-            print(f"🔍 Всего проверок CEX: {total_cex_checks}")
-        
+        if len(self.cex_data):
+            print(f"🔍 Всего проверок CEX: {self.count_cex_checks()}")
+
         delays = self.calculate_average_delays()
         if delays:
             print("\n⏱️ СРЕДНИЕ ЗАДЕРЖКИ DEX → CEX:")
             for exchange, delay in delays.items():
                 print(f"   {exchange:15}: {delay} сек")
-        
+
         opportunities = self.analyze_arbitrage_opportunities()
         if opportunities:
             print(f"\n💰 АРБИТРАЖНЫЕ ВОЗМОЖНОСТИ (>2%):")
             profitable_count = 0
             total_opportunities = 0
-            
+
             for token, opps in opportunities.items():
-                if opps:
-                    profitable_count += 1
-                    total_opportunities += len(opps)
-                    print(f"   {token}: {len(opps)} случаев")
-                    for opp in opps[:2]:  # Показываем первые 2 случая
-                        print(f"     - {opp['exchange']} ({opp['interval']}сек): {opp['difference']:+.2%}")
-            
+                profitable_count += 1
+                total_opportunities += len(opps)
+                print(f"   {token}: {len(opps)} случаев")
+                for opp in opps[:2]:  # Показываем первые 2 случая
+                    print(
+                        f"     - {opp['exchange'].decode()} ({opp['interval']}сек): "
+                        f"{opp['change_from_base']:+.2%}"
+                    )
+
             print(f"\n🎯 ИТОГО: {profitable_count} токенов, {total_opportunities} арбитражных случаев")
-            
+
             if delays:
                 fastest_exchange = min(delays, key=delays.get)
                 print(f"⚡ Самая быстрая биржа: {fastest_exchange} ({delays[fastest_exchange]}сек)")
         else:
-            print(f"\n❌ Арбитражные возможности не обнаружены")
\ No newline at end of file
+            print(f"\n❌ Арбитражные возможности не обнаружены")
+
+        if self.tick_store is not None:
+            summary = self.tick_store.summary()
+            print(f"\n🗄️ БАЗА ТИКОВ: {summary['ticks']} цен, {summary['tokens']} токенов, "
+                  f"источники: {', '.join(summary['sources']) or '-'}")
+
+            follow_through = self.impulse_follow_through()
+            if follow_through:
+                print("📉 ЦЕНА DEX ПОСЛЕ ИМПУЛЬСА:")
+                for horizon, stats in follow_through.items():
+                    print(
+                        f"   через {horizon:>3} сек: медиана {stats['median_change']:+.2%}, "
+                        f"продолжение {stats['continued']:.0%} ({stats['count']} импульсов)"
+                    )
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+from config import TOKENS, SETTINGS
+from logger import file_logger
+
+
+class SymbolSet:
+    """Список символов одной биржи: хеш-множество с TTL.
+    Одновременные вызовы делят одну загрузку (single-flight)"""
+
+    def __init__(self, name, fetcher, on_loaded=None):
+        self.name = name
+        self.fetcher = fetcher  # async () -> iterable символов или None при ошибке
+        self.on_loaded = on_loaded
+        self.symbols = None
+        self.loaded_at = 0.0
+        self.failed_at = None
+        self._inflight = None
+
+    @property
+    def loaded(self):
+        return self.symbols is not None
+
+    def is_stale(self):
+        return not self.loaded or time.monotonic() - self.loaded_at >= SETTINGS['symbol_index_ttl']
+
+    async def get(self):
+        # после неудачной загрузки не долбим биржу на каждом вызове
+        recently_failed = (
+            self.failed_at is not None
+            and time.monotonic() - self.failed_at < SETTINGS['symbol_index_retry']
+        )
+        if self.is_stale() and not recently_failed:
+            await self.refresh()
+        return self.symbols
+
+    async def refresh(self):
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._load())
+        # shield: отмена одного ожидающего не отменяет общую загрузку
+        return await asyncio.shield(self._inflight)
+
+    async def _load(self):
+        try:
+            symbols = await self.fetcher()
+            if symbols:
+                self.symbols = frozenset(symbols)
+                self.loaded_at = time.monotonic()
+                self.failed_at = None
+                file_logger.print_status(f"✅ Получено {len(self.symbols)} символов {self.name}")
+                if self.on_loaded:
+                    self.on_loaded()
+            else:
+                self.failed_at = time.monotonic()
+            return self.symbols
+        except Exception as e:
+            self.failed_at = time.monotonic()
+            file_logger.print_status(f"❌ Ошибка получения символов {self.name}: {e}")
+            return self.symbols
+        finally:
+            self._inflight = None
+
+
+class SymbolIndex:
+    """Разрешение наших символов в символы бирж.
+    Для всех отслеживаемых токенов таблица считается заранее и обновляется в фоне,
+    так что поиск после импульса - это просто словарь"""
+
+    def __init__(self, fetchers, lbank_symbol_mapping):
+        self.sets = {
+            exchange: SymbolSet(exchange, fetcher, on_loaded=self._invalidate)
+            for exchange, fetcher in fetchers.items()
+        }
+        self.lbank_symbol_mapping = lbank_symbol_mapping
+
+        # token -> {exchange: символ биржи или None}
+        self.resolution = {}
+        self._task = None
+
+    def _invalidate(self):
+        # списки обновились - старая таблица больше не верна
+        self.resolution = {}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(SETTINGS['symbol_index_ttl'])
+
+    async def refresh(self):
+        """Перезагружаем списки бирж и пересчитываем таблицу для всех токенов"""
+        await asyncio.gather(*(s.refresh() for s in self.sets.values()))
+        self.resolution = {token: self._resolve_token(token) for token in TOKENS}
+
+    def update_tokens(self, added, removed):
+        """Список токенов изменился: новые считаем сразу (если списки бирж уже есть), удаленные забываем"""
+        for token in removed:
+            self.resolution.pop(token, None)
+        if all(symbol_set.loaded for symbol_set in self.sets.values()):
+            for token in added:
+                self.resolution[token] = self._resolve_token(token)
+
+    def _resolve_token(self, token):
+        return {exchange: self._resolve(token, exchange) for exchange in self.sets}
+
+    def _resolve(self, token, exchange):
+        symbols = self.sets[exchange].symbols
+        if symbols is None:
+            return None
+
+        if exchange == 'lbank_spot':
+            return self.find_lbank_symbol(token, symbols)
+
+        gate_symbol = f"{token}_USDT"
+        return gate_symbol if gate_symbol in symbols else None
+
+    def find_lbank_symbol(self, token, symbols):
+        # сначала маппинг из конфига, потом автоматические варианты
+        mapped = self.lbank_symbol_mapping.get(token)
+        if mapped and mapped in symbols:
+            return mapped
+
+        for variant in (f"{token.lower()}_usdt", f"{token.lower()}usdt", token.lower()):
+            if variant in symbols:
+                return variant
+        return None
+
+    def is_loaded(self, exchange):
+        return self.sets[exchange].loaded
+
+    async def resolve(self, token, exchange):
+        """Символ биржи для токена или None (нет на бирже / список не загружен)"""
+        self.start()
+        await self.sets[exchange].get()
+
+        resolved = self.resolution.get(token)
+        if resolved is None:
+            # токена нет в таблице (новый или таблицу сбросило обновление списков)
+            resolved = self._resolve_token(token)
+            self.resolution[token] = resolved
+        return resolved[exchange]
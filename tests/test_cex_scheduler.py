@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+import clock
+from cex_scheduler import CEXSampleScheduler, TimingWheel
+
+
+@pytest.fixture
+def sim_loop():
+    """Виртуальные часы: секунды ожидания проходят мгновенно"""
+    sim_clock = clock.SimClock(1_700_000_000)
+    clock.install(sim_clock)
+    loop = clock.SimEventLoop(sim_clock)
+    yield loop
+    loop.close()
+    clock.install(None)
+
+
+def test_wheel_pops_each_item_once_on_its_tick(sim_loop):
+    wheel = TimingWheel(0.1, 8)
+    wheel.add(0.25, 'a')
+    wheel.add(0.95, 'b')  # тик 10: следующий оборот колеса, слот 2 - как у 'c'
+    wheel.add(0.3, 'c')
+
+    assert wheel.next_due_time() == pytest.approx(0.3)
+    assert wheel.pop_due(0.29) == []
+    assert sorted(wheel.pop_due(0.3)) == ['a', 'c']
+    assert wheel.next_due_time() == pytest.approx(1.0)
+    assert wheel.pop_due(0.99) == []
+    assert wheel.pop_due(1.0) == ['b']
+    assert wheel.size == 0
+    assert wheel.next_due_time() is None
+
+
+def test_wheel_catches_up_after_long_idle_in_one_sweep(sim_loop):
+    wheel = TimingWheel(0.1, 8)
+    wheel.add(0.5, 'near')
+    wheel.add(5.0, 'far')  # через несколько оборотов
+
+    assert sorted(wheel.pop_due(86400.0)) == ['far', 'near']
+    assert wheel.size == 0
+    assert wheel.cursor == 864001
+
+    # элемент из прошлого встает на ближайший тик, а не теряется за курсором
+    wheel.add(10.0, 'late')
+    assert wheel.next_due_time() == pytest.approx(86400.1)
+    assert wheel.pop_due(86400.1) == ['late']
+
+
+def test_scheduler_sleeps_until_next_sample(sim_loop):
+    """Между замерами планировщик не просыпается на каждом тике колеса"""
+    samples = []
+
+    async def sample_round(batch):
+        samples.extend((clock.monotonic(), sample.interval) for sample in batch)
+
+    scheduler = CEXSampleScheduler(sample_round)
+    pops = []
+    pop_due = scheduler.wheel.pop_due
+    scheduler.wheel.pop_due = lambda now: pops.append(now) or pop_due(now)
+
+    async def run():
+        await scheduler.schedule('BONK', 1.0, 1.1, [5, 30], {}, clock.monotonic())
+        await scheduler.close()
+
+    sim_loop.run_until_complete(run())
+
+    assert [interval for _, interval in samples] == [5, 30]
+    assert samples[0][0] == pytest.approx(5.0, abs=0.1)
+    assert samples[1][0] == pytest.approx(30.0, abs=0.1)
+    assert len(pops) <= 4
+
+
+def test_scheduler_wakes_early_for_nearer_sample(sim_loop):
+    samples = []
+
+    async def sample_round(batch):
+        samples.extend((clock.monotonic(), sample.symbol) for sample in batch)
+
+    scheduler = CEXSampleScheduler(sample_round)
+
+    async def run():
+        far = scheduler.schedule('FAR', 1.0, 1.1, [60], {}, clock.monotonic())
+        await asyncio.sleep(1)
+        near = scheduler.schedule('NEAR', 1.0, 1.1, [2], {}, clock.monotonic())
+        await asyncio.gather(far, near)
+        await scheduler.close()
+
+    sim_loop.run_until_complete(run())
+
+    assert [symbol for _, symbol in samples] == ['NEAR', 'FAR']
+    assert samples[0][0] == pytest.approx(3.0, abs=0.1)
+    assert samples[1][0] == pytest.approx(60.0, abs=0.1)
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+import columnar
+from logger import Logger
+from stats_analyzer import StatsAnalyzer
+
+
+def _write_jsonl(path, records, mode='w'):
+    with open(path, mode, encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def _legacy_impulses(count, start=(10, 0, 0)):
+    h, m, s = start
+    return [
+        {'time': f"{h:02d}:{m + i // 60:02d}:{s + i % 60:02d}", 'token': f"T{i}",
+         'base_price': 1.0, 'impulse_price': 1.1, 'change_percent': 10.0}
+        for i in range(count)
+    ]
+
+
+def _legacy_cex(count):
+    return [
+        {'time_after_impulse': "5сек", 'token': f"T{i}", 'dex_price': 1.1,
+         'cex_prices': {'gateio_spot': {'price': 1.05, 'vs_base_percent': 5.0, 'vs_impulse_percent': -4.55}}}
+        for i in range(count)
+    ]
+
+
+def _live_logger(logs_dir):
+    logger = Logger(str(logs_dir))
+    logger.columnar = columnar
+    logger.set_console_mode('silent')
+    return logger
+
+
+def test_convert_after_live_partition_of_same_day(tmp_path):
+    """Логгер уже записал сегодняшнюю партицию - старые строки все равно переносятся, живые не дублируются"""
+    _write_jsonl(tmp_path / 'impulses.jsonl', _legacy_impulses(41))
+    _write_jsonl(tmp_path / 'cex_comparison.jsonl', _legacy_cex(7))
+
+    logger = _live_logger(tmp_path)
+    logger.log_impulse('LIVE', 0.1, 1.1, 1.0, 1.1)
+    logger.log_cex_data('LIVE', 1.0, 1.1, {
+        'gateio_spot': {'price': 1.05, 'change_from_base': 0.05, 'change_from_impulse': -0.045},
+    }, 5)
+    logger.close()
+    assert len(columnar.load_table(str(tmp_path), 'impulses')) == 1
+
+    assert columnar.convert_jsonl(str(tmp_path)) == (41, 7)
+
+    impulses = columnar.load_table(str(tmp_path), 'impulses')
+    cex = columnar.load_table(str(tmp_path), 'cex')
+    assert len(impulses) == 42
+    assert len(cex) == 8
+    assert sorted(impulses['token'].tolist()).count(b'LIVE') == 1
+
+    # повторный запуск ничего не дублирует
+    assert columnar.convert_jsonl(str(tmp_path)) == (0, 0)
+    assert len(columnar.load_table(str(tmp_path), 'impulses')) == 42
+
+
+def test_convert_takes_day_from_row_ts(tmp_path):
+    """День партиции - из ts строки, а не из времени изменения файла"""
+    old = datetime(2024, 3, 5, 12, 30).timestamp()
+    _write_jsonl(tmp_path / 'impulses.jsonl', [
+        {'time': "12:30:00", 'ts': old, 'token': 'OLD', 'base_price': 1.0, 'impulse_price': 1.1,
+         'change_percent': 10.0},
+    ])
+
+    columnar.convert_jsonl(str(tmp_path))
+
+    assert os.path.exists(tmp_path / columnar.partition_name('impulses', old))
+    assert columnar.load_table(str(tmp_path), 'impulses', '2024-03-05', '2024-03-05')['ts'].tolist() == [old]
+
+
+def test_legacy_rows_dated_from_next_row_across_midnight(tmp_path):
+    """Строки без ts получают день следующей строки с ts, с отступом через полночь"""
+    live = datetime(2024, 3, 6, 0, 10).timestamp()
+    records = _legacy_impulses(1, start=(23, 50, 0)) + [
+        {'time': "00:05:00", 'token': 'A', 'base_price': 1.0, 'impulse_price': 1.1, 'change_percent': 10.0},
+        {'time': "00:10:00", 'ts': live, 'token': 'B', 'base_price': 1.0, 'impulse_price': 1.1,
+         'change_percent': 10.0},
+    ]
+    _write_jsonl(tmp_path / 'impulses.jsonl', records)
+
+    columnar.convert_jsonl(str(tmp_path))
+
+    rows = columnar.load_table(str(tmp_path), 'impulses')
+    times = dict(zip(rows['token'].tolist(), rows['ts'].tolist()))
+    assert times[b'T0'] == datetime(2024, 3, 5, 23, 50).timestamp()
+    assert times[b'A'] == datetime(2024, 3, 6, 0, 5).timestamp()
+    assert times[b'B'] == live
+
+
+def test_convert_reads_only_new_complete_lines(tmp_path):
+    """Второй запуск читает хвост после прошлого; недописанная строка ждет следующего раза"""
+    path = tmp_path / 'impulses.jsonl'
+    _write_jsonl(path, _legacy_impulses(3))
+    assert columnar.convert_jsonl(str(tmp_path)) == (3, 0)
+
+    _write_jsonl(path, _legacy_impulses(2, start=(11, 0, 0)), mode='a')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"time": "11:0')
+    assert columnar.convert_jsonl(str(tmp_path)) == (2, 0)
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('0:05", "token": "TAIL", "base_price": 1.0, "impulse_price": 1.1, "change_percent": 10.0}\n')
+    assert columnar.convert_jsonl(str(tmp_path)) == (1, 0)
+    assert len(columnar.load_table(str(tmp_path), 'impulses')) == 6
+
+
+def test_convert_restarts_on_recreated_file(tmp_path):
+    """clear_old_logs пересоздал файл - читаем его с начала"""
+    path = tmp_path / 'impulses.jsonl'
+    _write_jsonl(path, _legacy_impulses(5))
+    columnar.convert_jsonl(str(tmp_path))
+
+    os.remove(path)
+    _write_jsonl(path, _legacy_impulses(2, start=(12, 0, 0)))
+    assert columnar.convert_jsonl(str(tmp_path)) == (2, 0)
+
+
+def test_analyzer_reads_unconverted_rows_next_to_partitions(tmp_path, capsys):
+    """Старые строки JSONL не пропадают из отчета, пока их не сконвертировали"""
+    _write_jsonl(tmp_path / 'impulses.jsonl', _legacy_impulses(41))
+    logger = _live_logger(tmp_path)
+    logger.log_impulse('LIVE', 0.1, 1.1, 1.0, 1.1)
+    logger.close()
+
+    with StatsAnalyzer(str(tmp_path)) as analyzer:
+        analyzer.load_impulse_data()
+    assert len(analyzer.impulse_data) == 42
+    assert 'python columnar.py convert' in capsys.readouterr().out
+
+
+def test_open_partition_trims_torn_tail(tmp_path):
+    path = tmp_path / columnar.partition_name('impulses', 0)
+    os.makedirs(path.parent)
+    rows = columnar.impulse_rows(1.0, 'A', 1.0, 1.1, 0.1)
+    path.write_bytes(rows.tobytes() + rows.tobytes()[:10])
+
+    with columnar.open_partition(str(path)) as f:
+        f.write(columnar.impulse_rows(2.0, 'B', 1.0, 1.1, 0.1).tobytes())
+
+    assert np.fromfile(path, dtype=columnar.IMPULSE_DTYPE)['ts'].tolist() == [1.0, 2.0]
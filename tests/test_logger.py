@@ -0,0 +1,44 @@
+import json
+
+from config import SETTINGS
+from logger import Logger, LogWriter
+
+
+def test_live_writer_drops_when_queue_full(tmp_path, monkeypatch):
+    """Боевой цикл не ждет диск: лишние записи теряются и считаются"""
+    monkeypatch.setitem(SETTINGS, 'log_queue_size', 2)
+    writer = LogWriter(str(tmp_path))  # поток не запущен - очередь никто не разбирает
+
+    for i in range(5):
+        writer.put('a.jsonl', f"{i}\n")
+
+    assert writer.queue.qsize() == 2
+    assert writer.dropped == 3
+
+
+def test_blocking_writer_keeps_every_record(tmp_path, monkeypatch):
+    """replay: при полной очереди ждем писателя, ни одна запись не теряется"""
+    monkeypatch.setitem(SETTINGS, 'log_queue_size', 2)
+    writer = LogWriter(str(tmp_path), block=True)
+    writer.start()
+
+    for i in range(500):
+        writer.put('a.jsonl', json.dumps({'i': i}) + '\n')
+    writer.stop()
+
+    assert writer.dropped == 0
+    with open(tmp_path / 'a.jsonl', encoding='utf-8') as f:
+        assert [json.loads(line)['i'] for line in f] == list(range(500))
+
+
+def test_set_logs_dir_keeps_tick_store(tmp_path):
+    logger = Logger(str(tmp_path / 'a'))
+    logger.set_tick_store(str(tmp_path / 'ticks.sqlite'))
+    store = logger.tick_store
+
+    logger.set_logs_dir(str(tmp_path / 'b'))
+    logger.log_ticks('dex', {'BONK': 1.0})
+    logger.close()
+
+    assert store.get_stats()['written'] == 1
+    assert logger.tick_store is None
@@ -0,0 +1,81 @@
+import os
+import threading
+
+import pytest
+
+from price_board import PriceBoard
+from price_board_reader import BoardChanged, PriceBoardReader
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'board')
+
+
+def test_publish_and_read(path):
+    board = PriceBoard(path, 8)
+    reader = PriceBoardReader(path)
+
+    board.publish('dex', {'BONK': 1.5, 'WIF': 2.5})
+    board.publish_symbol('BONK', {'gateio_spot': 1.6, 'lbank_spot': None})
+
+    assert reader.get('BONK')[0] == 1.5
+    assert reader.get('BONK', 'gateio_spot')[0] == 1.6
+    assert reader.get('BONK', 'lbank_spot') is None
+    assert reader.get('NOPE') is None
+    assert reader.symbols() == ['BONK', 'WIF']
+    assert {symbol: cell[0] for symbol, cell in reader.snapshot(['dex'])['dex'].items()} == {'BONK': 1.5, 'WIF': 2.5}
+    assert reader.writer_alive
+
+    board.close()
+    assert not reader.writer_alive
+    assert reader.get('WIF')[0] == 2.5  # цены остаются после остановки писателя
+
+
+def test_overflow_counts_prices_without_row(path):
+    board = PriceBoard(path, 2)
+    board.publish('dex', {'A': 1.0, 'B': 2.0, 'C': 3.0})
+
+    assert board.get_stats()['published'] == 2
+    assert board.get_stats()['overflow'] == 1
+
+
+def test_recreated_smaller_board_never_shrinks_file(path):
+    big = PriceBoard(path, 1000)
+    big.publish('dex', {'A': 1.0})
+    big.close()
+    reader = PriceBoardReader(path)
+    size = os.path.getsize(path)
+
+    small = PriceBoard(path, 10)
+    small.publish('dex', {'B': 2.0})
+
+    assert os.path.getsize(path) == size  # старый читатель не получит SIGBUS
+    with pytest.raises(BoardChanged):
+        reader.get('A')
+    assert PriceBoardReader(path).get('B')[0] == 2.0
+
+
+def test_snapshot_never_sees_half_published_round(path):
+    """seqlock: срез всегда из одной публикации (все цены раунда одинаковые)"""
+    board = PriceBoard(path, 64)
+    symbols = [f"T{i}" for i in range(64)]
+    board.publish('dex', {symbol: 0.0 for symbol in symbols})
+    reader = PriceBoardReader(path)
+    stop = threading.Event()
+
+    def write():
+        value = 0.0
+        while not stop.is_set():
+            value += 1
+            board.publish('dex', {symbol: value for symbol in symbols})
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(300):
+            prices = {cell[0] for cell in reader.snapshot(['dex'])['dex'].values()}
+            assert len(prices) == 1
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from config import SETTINGS
+from rate_limiter import RateLimiter, TokenBucket, parse_reset, parse_retry_after
+
+
+def _bucket(rate=10.0, burst=2):
+    return TokenBucket('host', rate=rate, burst=burst, min_rate=1.0, max_rate=20.0)
+
+
+def test_burst_then_paced():
+    bucket = _bucket(rate=20.0, burst=2)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 2 из всплеска сразу, остальные 4 - по 1/20 сек
+    assert asyncio.run(run()) == pytest.approx(4 / 20, abs=0.05)
+
+
+def test_aimd_halves_on_throttle_and_grows_slowly(monkeypatch):
+    monkeypatch.setitem(SETTINGS, 'rate_limit_decrease', 0.5)
+    monkeypatch.setitem(SETTINGS, 'rate_limit_increase', 0.1)
+    bucket = _bucket(rate=10.0)
+
+    bucket.on_throttle()
+    assert bucket.rate == 5.0
+    assert bucket.tokens == 0
+
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(5.02)
+
+    for _ in range(10):
+        bucket.on_throttle()
+    assert bucket.rate == 1.0  # не ниже min_rate
+
+    for _ in range(100000):
+        bucket.on_success()
+    assert bucket.rate == 20.0  # не выше max_rate
+
+
+def test_retry_after_blocks_bucket(monkeypatch):
+    monkeypatch.setitem(SETTINGS, 'rate_limits', {'default': {'rate': 100.0, 'burst': 1}})
+    monkeypatch.setitem(SETTINGS, 'rate_limit_max_wait', 60)
+    limiter = RateLimiter()
+
+    async def run():
+        await limiter.acquire('host')
+        limiter.feedback('host', None, 429, {'Retry-After': '0.2'})
+        started = time.monotonic()
+        await limiter.acquire('host')
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.2
+    assert limiter.get_stats()['host']['throttled'] == 1
+
+
+def test_parse_limit_headers():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('garbage') is None
+    assert parse_reset('5') == 5.0
+    assert parse_reset(str(time.time() + 10)) == pytest.approx(10, abs=1)
+    assert parse_reset(str((time.time() + 10) * 1000)) == pytest.approx(10, abs=1)
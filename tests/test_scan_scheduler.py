@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from scan_scheduler import ScanScheduler, wait_proxy_slot
+
+PROXIES = ('http://p1', 'http://p2', 'http://p3', None)
+
+
+def test_proxy_offsets_are_fixed_per_proxy_and_bounded():
+    scheduler = ScanScheduler(0.5, jitter=2.0)
+
+    offsets = [scheduler.proxy_offset(proxy) for proxy in PROXIES]
+
+    assert [scheduler.proxy_offset(proxy) for proxy in PROXIES] == offsets
+    assert all(0 <= offset <= 0.5 for offset in offsets)  # не больше периода
+    assert len(set(offsets)) == len(offsets)
+
+
+def test_no_jitter_no_offset():
+    scheduler = ScanScheduler(0.5)
+    assert scheduler.proxy_offset('http://p1') == 0.0
+
+
+def test_cycle_requests_start_in_their_proxy_slot():
+    """Каждая прокси стартует на тике + своем сдвиге, в каждом цикле одинаково"""
+    scheduler = ScanScheduler(0.3, jitter=0.2)
+    starts = []
+
+    async def request(proxy):
+        await wait_proxy_slot(proxy)
+        starts.append((proxy, time.monotonic()))
+
+    async def cycle():
+        tick = len(starts) // len(PROXIES)
+        await asyncio.gather(*(request(proxy) for proxy in PROXIES))
+        if tick == 2:
+            scheduler.stop()
+
+    asyncio.run(scheduler.run(cycle))
+
+    assert len(starts) == 3 * len(PROXIES)
+    for index, (proxy, started) in enumerate(starts):
+        due = scheduler.origin + (index // len(PROXIES)) * scheduler.period
+        assert started - due == pytest.approx(scheduler.proxy_offset(proxy), abs=0.05)
+
+
+def test_wait_outside_cycle_returns_immediately():
+    async def run():
+        started = time.monotonic()
+        await wait_proxy_slot('http://p1')
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.01
@@ -0,0 +1,59 @@
+import pytest
+
+from tick_store import TickStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TickStore(str(tmp_path / 'ticks.sqlite'))
+    yield store
+    store.close()
+
+
+def _put(store, ticks, source='dex'):
+    for ts, price in ticks:
+        store.put(source, {'BONK': price}, ts=ts, block=True)
+    store.writer.stop()  # дописываем очередь до запросов
+
+
+def test_downsample_last_is_latest_tick_despite_insert_order(store):
+    """last - цена с наибольшим ts в свече, даже если тики записаны не по порядку"""
+    _put(store, [
+        (100.9, 2.0),  # последняя в секунде 100, но не min и не max
+        (100.0, 1.0),
+        (100.5, 3.0),
+        (161.0, 7.0),
+        (160.0, 5.0),
+        (165.0, 4.0),  # последняя в свече 120
+        (101.0, 9.0),
+    ])
+
+    assert store.downsample('BONK', 60) == [
+        (60.0, 1.0, 9.0, 15.0 / 4, 9.0, 4),
+        (120.0, 4.0, 7.0, 16.0 / 3, 4.0, 3),
+    ]
+    assert [row[4] for row in store.downsample('BONK', 1)] == [2.0, 9.0, 5.0, 7.0, 4.0]
+
+
+def test_downsample_same_ts_takes_later_write(store):
+    _put(store, [(10.0, 1.0), (10.0, 2.0), (10.0, 0.5)])
+
+    assert store.downsample('BONK', 5) == [(10.0, 0.5, 2.0, 3.5 / 3, 0.5, 3)]
+
+
+def test_downsample_range_and_source(store):
+    _put(store, [(10.0, 1.0), (70.0, 2.0), (130.0, 3.0)])
+    store.put('gateio_spot', {'BONK': 100.0}, ts=70.0, block=True)
+    store.writer.stop()
+
+    assert store.downsample('BONK', 60, start=60, end=119) == [(60.0, 2.0, 2.0, 2.0, 2.0, 1)]
+    assert store.downsample('BONK', 60, source='gateio_spot') == [(60.0, 100.0, 100.0, 100.0, 100.0, 1)]
+    assert store.downsample('NOPE', 60) == []
+
+
+def test_price_at_and_range(store):
+    _put(store, [(20.0, 2.0), (10.0, 1.0), (30.0, 3.0)])
+
+    assert store.price_at('BONK', 25.0) == 2.0
+    assert store.price_at('BONK', 5.0) is None
+    assert store.range('BONK', 10.0, 20.0) == [(10.0, 1.0), (20.0, 2.0)]
@@ -0,0 +1,338 @@
+"""Хранилище всех цен (DEX цикла и CEX) в SQLite для ретроспективы и replay.
+
+Схема: справочники tokens и sources (целые id вместо строк), ticks(token_id, source_id, ts, price)
+с ts в миллисекундах unix времени и индексом (token_id, ts). База в WAL режиме: пишет
+фоновый поток пачками (одна транзакция на пачку), читатели не блокируют писателя.
+
+    python tick_store.py stats logs/ticks.sqlite
+    python tick_store.py series logs/ticks.sqlite BONK --source dex --step 60
+    python tick_store.py import logs/ticks.sqlite logs/ticks.jsonl   # старые записи record_ticks
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import clock
+from config import SETTINGS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS ticks (
+    token_id INTEGER NOT NULL,
+    source_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ticks_token_ts ON ticks (token_id, ts);
+"""
+
+_STOP = object()
+
+
+def to_ms(ts):
+    return int(ts * 1000)
+
+
+def connect(path):
+    """Соединение с базой тиков (схема создается при первом открытии)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # в WAL synchronous=NORMAL не портит базу при сбое, теряются только последние транзакции
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class TickWriter(threading.Thread):
+    """Фоновый писатель: цены копятся в очереди, пишутся пачками в одной транзакции"""
+
+    def __init__(self, path):
+        super().__init__(name="tick-writer", daemon=True)
+        self.path = path
+        self.queue = queue.Queue(maxsize=SETTINGS['tick_store_queue_size'])
+        self.token_ids = {}
+        self.source_ids = {}
+
+        self.written = 0  # тиков
+        self.dropped = 0  # тиков, потерянных при полной очереди
+        self.batches = 0
+
+    def put(self, ts, source, prices, block=False):
+        """Из event loop не ждем: при полной очереди тики теряются (block - для импорта)"""
+        try:
+            self.queue.put((ts, source, prices), block=block)
+        except queue.Full:
+            self.dropped += len(prices)
+
+    def stop(self):
+        self.queue.put(_STOP)
+        self.join()
+
+    def _load_ids(self, connection):
+        self.token_ids = dict(connection.execute("SELECT symbol, id FROM tokens"))
+        self.source_ids = dict(connection.execute("SELECT name, id FROM sources"))
+
+    def _id(self, connection, table, ids, name):
+        value = ids.get(name)
+        if value is None:
+            column = 'symbol' if table == 'tokens' else 'name'
+            value = connection.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (name,)).lastrowid
+            ids[name] = value
+        return value
+
+    def run(self):
+        connection = connect(self.path)
+        self._load_ids(connection)
+        batch_size = SETTINGS['tick_store_batch_size']
+        flush_interval = SETTINGS['tick_store_flush_interval']
+
+        while True:
+            try:
+                items = [self.queue.get(timeout=flush_interval)]
+            except queue.Empty:
+                continue
+
+            # добираем все, что накопилось (пачка по числу тиков, а не сообщений)
+            ticks = len(items[0][2]) if items[0] is not _STOP else 0
+            while ticks < batch_size and items[-1] is not _STOP:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+                if item is not _STOP:
+                    ticks += len(item[2])
+
+            stop = items[-1] is _STOP
+            if stop:
+                items.pop()
+            if items:
+                self._write(connection, items)
+            if stop:
+                connection.close()
+                return
+
+    def _write(self, connection, items):
+        try:
+            with connection:
+                rows = []
+                for ts, source, prices in items:
+                    source_id = self._id(connection, 'sources', self.source_ids, source)
+                    for token, price in prices.items():
+                        token_id = self._id(connection, 'tokens', self.token_ids, token)
+                        rows.append((token_id, source_id, ts, price))
+                connection.executemany(
+                    "INSERT INTO ticks (token_id, source_id, ts, price) VALUES (?, ?, ?, ?)", rows
+                )
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            # транзакция откатилась - id из нее в кэше больше не верны
+            self._load_ids(connection)
+            self.dropped += sum(len(prices) for _, _, prices in items)
+            print(f"❌ Ошибка записи тиков в {self.path}: {e}")
+
+
+class TickStore:
+    """Запись тиков (без ожидания диска) и запросы к базе"""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+        self._reader = None
+
+    def put(self, source, prices, ts=None, block=False):
+        """Цены за цикл {token: price} от источника (dex или биржа)"""
+        if not prices:
+            return
+        if self.writer is None or not self.writer.is_alive():
+            self.writer = TickWriter(self.path)
+            self.writer.start()
+        self.writer.put(to_ms(clock.time() if ts is None else ts), source, prices, block)
+
+    def close(self):
+        """Дописываем очередь (вызывается из Logger.close)"""
+        if self.writer is not None and self.writer.is_alive():
+            self.writer.stop()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def get_stats(self):
+        writer = self.writer
+        return {
+            'written': writer.written if writer else 0,
+            'dropped': writer.dropped if writer else 0,
+            'batches': writer.batches if writer else 0,
+            'queue_depth': writer.queue.qsize() if writer else 0,
+        }
+
+    # ——————————————————————————————————————————
+    # Запросы
+    # ——————————————————————————————————————————
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = connect(self.path)
+        return self._reader
+
+    def _ids(self, token, source):
+        token_row = self.reader.execute("SELECT id FROM tokens WHERE symbol = ?", (token,)).fetchone()
+        source_row = self.reader.execute("SELECT id FROM sources WHERE name = ?", (source,)).fetchone()
+        if token_row is None or source_row is None:
+            return None, None
+        return token_row[0], source_row[0]
+
+    def tokens(self):
+        return [row[0] for row in self.reader.execute("SELECT symbol FROM tokens ORDER BY symbol")]
+
+    def sources(self):
+        return [row[0] for row in self.reader.execute("SELECT name FROM sources ORDER BY name")]
+
+    def range(self, token, start=None, end=None, source='dex'):
+        """[(ts сек, price), ...] токена за [start, end] (unix сек, None - без границы)"""
+        token_id, source_id = self._ids(token, source)
+        if token_id is None:
+            return []
+        rows = self.reader.execute(
+            "SELECT ts, price FROM ticks WHERE token_id = ? AND ts BETWEEN ? AND ? AND source_id = ? "
+            "ORDER BY ts",
+            (token_id, _bound(start, 0), _bound(end, 2 ** 62), source_id)
+        )
+        return [(ts / 1000, price) for ts, price in rows]
+
+    def price_at(self, token, ts, source='dex'):
+        """Последняя цена токена не позже ts или None"""
+        token_id, source_id = self._ids(token, source)
+        if token_id is None:
+            return None
+        row = self.reader.execute(
+            "SELECT price FROM ticks WHERE token_id = ? AND ts <= ? AND source_id = ? "
+            "ORDER BY ts DESC LIMIT 1",
+            (token_id, to_ms(ts), source_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def downsample(self, token, step, start=None, end=None, source='dex'):
+        """Свечи по step сек: [(начало сек, min, max, avg, last, count), ...]"""
+        token_id, source_id = self._ids(token, source)
+        if token_id is None:
+            return []
+        step_ms = max(1, to_ms(step))
+        # last - оконной функцией: голая колонка рядом с несколькими MIN/MAX берется из
+        # произвольной строки группы. Тики с одним ts - по порядку записи (rowid)
+        rows = self.reader.execute(
+            "SELECT bucket, MIN(price), MAX(price), AVG(price), MAX(last), COUNT(*) FROM ("
+            "  SELECT (ts / ?) * ? AS bucket, price,"
+            "    FIRST_VALUE(price) OVER (PARTITION BY ts / ? ORDER BY ts DESC, rowid DESC) AS last"
+            "  FROM ticks WHERE token_id = ? AND ts BETWEEN ? AND ? AND source_id = ?"
+            ") GROUP BY bucket ORDER BY bucket",
+            (step_ms, step_ms, step_ms, token_id, _bound(start, 0), _bound(end, 2 ** 62), source_id)
+        )
+        return [
+            (bucket / 1000, low, high, avg, last, count)
+            for bucket, low, high, avg, last, count in rows
+        ]
+
+    def load_replay_ticks(self, start=None, end=None):
+        """Все тики в формате replay: [(ts, source, {token: price}), ...] по времени"""
+        rows = self.reader.execute(
+            "SELECT t.ts, s.name, k.symbol, t.price FROM ticks t "
+            "JOIN sources s ON s.id = t.source_id JOIN tokens k ON k.id = t.token_id "
+            "WHERE t.ts BETWEEN ? AND ? ORDER BY t.ts, t.source_id",
+            (_bound(start, 0), _bound(end, 2 ** 62))
+        )
+        ticks = []
+        for ts, source, token, price in rows:
+            if not ticks or ticks[-1][0] != ts / 1000 or ticks[-1][1] != source:
+                ticks.append((ts / 1000, source, {}))
+            ticks[-1][2][token] = price
+        return ticks
+
+    def summary(self):
+        row = self.reader.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM ticks").fetchone()
+        count, first, last = row
+        return {
+            'ticks': count,
+            'tokens': self.reader.execute("SELECT COUNT(*) FROM tokens").fetchone()[0],
+            'sources': self.sources(),
+            'first_ts': first / 1000 if first is not None else None,
+            'last_ts': last / 1000 if last is not None else None,
+        }
+
+
+def _bound(ts, default):
+    return default if ts is None else to_ms(ts)
+
+
+def import_jsonl(store, path):
+    """ticks.jsonl (SETTINGS['record_ticks']) -> база"""
+    count = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                tick = json.loads(line)
+                store.put(tick['source'], tick['prices'], ts=float(tick['ts']), block=True)
+                count += len(tick['prices'])
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+    store.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    stats_parser = commands.add_parser('stats', help="сколько тиков, токенов и за какой период")
+    stats_parser.add_argument('db')
+
+    series_parser = commands.add_parser('series', help="ряд цен токена (или свечи с --step)")
+    series_parser.add_argument('db')
+    series_parser.add_argument('token')
+    series_parser.add_argument('--source', default='dex')
+    series_parser.add_argument('--step', type=float, help="шаг свечей (сек)")
+    series_parser.add_argument('--start', type=float, help="unix время начала")
+    series_parser.add_argument('--end', type=float, help="unix время конца")
+
+    import_parser = commands.add_parser('import', help="перенести ticks.jsonl в базу")
+    import_parser.add_argument('db')
+    import_parser.add_argument('jsonl')
+
+    args = parser.parse_args()
+    store = TickStore(args.db)
+
+    if args.command == 'import':
+        started = time.monotonic()
+        count = import_jsonl(store, args.jsonl)
+        print(f"✅ {count} тиков за {time.monotonic() - started:.1f} сек -> {args.db}")
+        return
+
+    if args.command == 'stats':
+        print(json.dumps(store.summary(), ensure_ascii=False, indent=2))
+    elif args.step:
+        for row in store.downsample(args.token, args.step, args.start, args.end, args.source):
+            print("\t".join(str(value) for value in row))
+    else:
+        for ts, price in store.range(args.token, args.start, args.end, args.source):
+            print(f"{ts}\t{price}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Список токенов из внешнего файла: меняется без перезапуска бота.
+
+Источник - SETTINGS['token_universe']:
+    tokens.json    - {"BONK": "адрес", ...} или {"tokens": {...}, "lbank_mapping": {"BONK": "bonk_usdt"}}
+    tokens.sqlite  - таблица tokens(symbol, address, lbank_symbol)
+
+JSON отслеживаем по mtime и размеру, SQLite - по PRAGMA data_version (меняется после
+коммита из другого соединения, в том числе в WAL режиме). Изменения применяются к
+config.TOKENS и LBANK_SYMBOL_MAPPING на месте между циклами, так что все модули,
+импортировавшие эти словари, видят новый список.
+
+    python token_universe.py export tokens.json   # текущие TOKENS из config -> файл
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from config import TOKENS, LBANK_SYMBOL_MAPPING, SETTINGS
+from logger import file_logger
+
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    symbol TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    lbank_symbol TEXT
+)
+"""
+
+
+def is_sqlite(path):
+    return path.lower().endswith(SQLITE_SUFFIXES)
+
+
+def read_json(path):
+    """-> ({символ: адрес}, {символ: символ LBank})"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data.get('tokens'), dict):
+        return dict(data['tokens']), dict(data.get('lbank_mapping') or {})
+    return dict(data), {}
+
+
+def read_sqlite(connection):
+    tokens, lbank_mapping = {}, {}
+    for symbol, address, lbank_symbol in connection.execute(
+        "SELECT symbol, address, lbank_symbol FROM tokens"
+    ):
+        tokens[symbol] = address
+        if lbank_symbol:
+            lbank_mapping[symbol] = lbank_symbol
+    return tokens, lbank_mapping
+
+
+def export(path, tokens=TOKENS, lbank_mapping=LBANK_SYMBOL_MAPPING):
+    """Записывает список токенов в файл (формат по расширению)"""
+    if not is_sqlite(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'tokens': tokens, 'lbank_mapping': lbank_mapping}, f, ensure_ascii=False, indent=2)
+        return
+
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.execute(SCHEMA)
+            connection.execute("DELETE FROM tokens")
+            connection.executemany(
+                "INSERT INTO tokens (symbol, address, lbank_symbol) VALUES (?, ?, ?)",
+                [(symbol, address, lbank_mapping.get(symbol)) for symbol, address in tokens.items()]
+            )
+    finally:
+        connection.close()
+
+
+class TokenChanges:
+    """Разница между старым и новым списком.
+    Токен со сменившимся адресом попадает и в removed, и в added (история детектора уже не про него)"""
+
+    __slots__ = ('added', 'removed', 'remapped')
+
+    def __init__(self, added=None, removed=None, remapped=None):
+        self.added = added or {}  # {символ: адрес}
+        self.removed = removed or []
+        self.remapped = remapped or []  # поменялся только символ LBank
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.remapped)
+
+    def apply_to(self, tokens):
+        """Меняет словарь {символ: адрес} на месте"""
+        for symbol in self.removed:
+            tokens.pop(symbol, None)
+        tokens.update(self.added)
+
+    def __repr__(self):
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.remapped)}"
+
+
+class TokenUniverse:
+    """Следит за файлом со списком токенов и отдает изменения"""
+
+    def __init__(self, path, tokens=TOKENS, lbank_mapping=LBANK_SYMBOL_MAPPING):
+        self.path = path
+        self.tokens = tokens
+        self.lbank_mapping = lbank_mapping
+        self.version = None  # (mtime, размер) для JSON, data_version для SQLite
+        self.checked_at = 0.0
+        self.reloads = 0
+        self._connection = None
+
+    def _current_version(self):
+        if not is_sqlite(self.path):
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+
+        if self._connection is None:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(self.path)
+            # соединение держим открытым: data_version считается относительно него
+            self._connection = sqlite3.connect(self.path)
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _read(self):
+        if is_sqlite(self.path):
+            return read_sqlite(self._connection)
+        return read_json(self.path)
+
+    def check(self, force=False):
+        """Перечитывает файл, если он изменился (не чаще token_universe_check сек).
+        -> TokenChanges или None, если менять нечего"""
+        now = time.monotonic()
+        if not force and now - self.checked_at < SETTINGS['token_universe_check']:
+            return None
+        self.checked_at = now
+
+        try:
+            version = self._current_version()
+            if version == self.version and not force:
+                return None
+            tokens, lbank_mapping = self._read()
+        except Exception as e:
+            file_logger.print_status(f"❌ Ошибка чтения списка токенов {self.path}: {e}")
+            return None
+
+        # эту версию уже видели, даже если она битая - ждем следующего изменения
+        self.version = version
+        if not tokens:
+            # пустой список скорее всего значит, что файл еще пишется
+            file_logger.print_status(f"⚠️  Пустой список токенов в {self.path}, оставляем текущий")
+            return None
+
+        changes = self._diff(tokens, lbank_mapping)
+        if changes:
+            changes.apply_to(self.tokens)
+            self.lbank_mapping.clear()
+            self.lbank_mapping.update(lbank_mapping)
+            self.reloads += 1
+        return changes
+
+    def _diff(self, tokens, lbank_mapping):
+        removed = [symbol for symbol in self.tokens if self.tokens[symbol] != tokens.get(symbol)]
+        added = {symbol: address for symbol, address in tokens.items() if self.tokens.get(symbol) != address}
+        remapped = [
+            symbol for symbol in tokens
+            if symbol not in added and self.lbank_mapping.get(symbol) != lbank_mapping.get(symbol)
+        ]
+        return TokenChanges(added, removed, remapped)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help="TOKENS и LBANK_SYMBOL_MAPPING из config -> файл")
+    export_parser.add_argument('path', help="tokens.json или tokens.sqlite")
+    args = parser.parse_args()
+
+    export(args.path)
+    print(f"✅ {len(TOKENS)} токенов -> {args.path}")
+
+
+if __name__ == '__main__':
+    main()
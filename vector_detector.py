@@ -0,0 +1,129 @@
+import clock
+from datetime import datetime
+
+import numpy as np
+
+
+class VectorImpulseDetector:
+    """Детектор импульсов на предвыделенных NumPy кольцевых буферах (токен × окно).
+    Вся пачка цен за цикл проверяется одним векторным проходом.
+    Интерфейс совместим с ImpulseDetector (update_price / get_base_price / get_recent_prices)"""
+
+    def __init__(self, threshold=0.15, window=10, capacity=1024):
+        self.threshold = threshold
+        self.window = window
+
+        self.token_index = {}  # token -> строка буфера
+        self.tokens = []  # строка -> token (None - строка свободна)
+        self.free_rows = []  # строки удаленных токенов, занимаются первыми
+
+        self.prices = np.zeros((capacity, window), dtype=np.float64)
+        self.timestamps = np.zeros((capacity, window), dtype=np.float64)
+        self.heads = np.zeros(capacity, dtype=np.int64)  # куда пишем следующую цену
+        self.counts = np.zeros(capacity, dtype=np.int64)  # сколько цен в окне
+
+        self.base_prices = {}
+
+    def _grow(self):
+        capacity = len(self.prices) * 2
+        for name in ('prices', 'timestamps'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, self.window), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for name in ('heads', 'counts'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _row(self, token):
+        row = self.token_index.get(token)
+        if row is None:
+            if self.free_rows:
+                row = self.free_rows.pop()
+                self.tokens[row] = token
+            else:
+                row = len(self.tokens)
+                if row >= len(self.prices):
+                    self._grow()
+                self.tokens.append(token)
+            self.token_index[token] = row
+        return row
+
+    def add_token(self, token):
+        """Строка буфера под новый токен заранее"""
+        self._row(token)
+
+    def remove_token(self, token):
+        """Освобождаем строку: окно обнуляем, строку займет следующий новый токен"""
+        row = self.token_index.pop(token, None)
+        if row is None:
+            return
+        self.heads[row] = 0
+        self.counts[row] = 0
+        self.tokens[row] = None
+        self.free_rows.append(row)
+        self.base_prices.pop(token, None)
+
+    def update_prices(self, symbols, prices, ts=None):
+        """Пачка цен за цикл (символы без повторов).
+        Возвращает только сработавшие токены: [(token, change, base_price, impulse_price), ...]"""
+        if ts is None:
+            ts = clock.time()
+        if not len(symbols):
+            return []
+
+        rows = np.fromiter((self._row(s) for s in symbols), dtype=np.int64, count=len(symbols))
+        prices = np.asarray(prices, dtype=np.float64)
+
+        heads = self.heads[rows]
+        self.prices[rows, heads] = prices
+        self.timestamps[rows, heads] = ts
+
+        counts = np.minimum(self.counts[rows] + 1, self.window)
+        self.counts[rows] = counts
+        self.heads[rows] = (heads + 1) % self.window
+
+        # самая старая цена окна (как history[0] у deque)
+        oldest = self.prices[rows, (heads - counts + 1) % self.window]
+
+        valid = (counts >= 2) & (oldest > 0)
+        change = np.zeros_like(prices)
+        np.divide(prices - oldest, oldest, out=change, where=valid)
+
+        hits = np.flatnonzero(valid & (np.abs(change) >= self.threshold))
+
+        impulses = []
+        for i in hits:
+            token = symbols[i]
+            base_price = float(oldest[i])
+            self.base_prices[token] = base_price
+            impulses.append((token, float(change[i]), base_price, float(prices[i])))
+        return impulses
+
+    def update_price(self, token, new_price):
+        impulses = self.update_prices([token], [new_price])
+        if impulses:
+            _, change, base_price, impulse_price = impulses[0]
+            return change, base_price, impulse_price
+        return None, None, None
+
+    def get_base_price(self, token):
+        return self.base_prices.get(token)
+
+    def get_recent_prices(self, token):
+        row = self.token_index.get(token)
+        if row is None:
+            return []
+
+        count = self.counts[row]
+        start = self.heads[row] - count
+        recent = []
+        for i in range(start, start + count):
+            pos = i % self.window
+            recent.append({
+                'timestamp': datetime.fromtimestamp(self.timestamps[row, pos]),
+                'price': float(self.prices[row, pos])
+            })
+        return recent